@@ -1,6 +1,6 @@
 from __future__ import annotations
-from typing import Dict, Any, List, Tuple, Optional
-from dataclasses import dataclass
+from typing import Dict, Any, List, Sequence, Tuple, Optional
+from dataclasses import dataclass, field
 import math
 
 @dataclass
@@ -64,37 +64,225 @@ def _age_score(age_secs: Optional[float]) -> float:
         return 0.6
     return 0.4
 
-def tradeability_score(contract: Dict[str, Any], horizon: str = "intraday", weights: ScoreWeights = ScoreWeights()) -> Tuple[int, Dict[str, float]]:
-    delta = _safe(contract.get("delta"))
-    spread_pct = _safe(contract.get("spread_pct"))
-    oi = _safe(contract.get("oi"), 0)
-    vol = _safe(contract.get("volume"), 0)
-    iv  = _safe(contract.get("iv"))
-    vol_oi_ratio = None
+def _num(v) -> Optional[float]:
+    if v is None:
+        return None
     try:
-        if oi and vol is not None:
-            vol_oi_ratio = (vol / float(oi)) if oi else None
-    except Exception:
-        vol_oi_ratio = None
-    # If you pass last_trade time into the contract later, compute age here. For now, neutral.
-    age = None
-
-    comps = {
-        "delta_fit": _delta_fit(delta, horizon),
-        "spread_stability": _spread_quality(spread_pct),
-        "liquidity": _liquidity(oi, vol, vol_oi_ratio),
-        # Prefer provided iv_percentile if present, else fall back to absolute IV bucket
-        "iv_percentile": _iv_percentile_score(contract.get("iv_percentile")) if contract.get("iv_percentile") is not None else _iv_bucket(iv),
-        "age": _age_score(age)
-    }
-    score = (
-        comps["delta_fit"]*weights.delta_fit +
-        comps["spread_stability"]*weights.spread_stability +
-        comps["liquidity"]*weights.liquidity +
-        comps["iv_percentile"]*weights.iv_percentile +
-        comps["age"]*weights.age
+        return float(v)
+    except (TypeError, ValueError):
+        return None
+
+@dataclass
+class ChainArrays:
+    """Column view of a chain (one list per field, aligned by contract index).
+
+    Built once per chain so scoring can run over every contract without
+    per-row dict lookups / try-except.
+    """
+    delta: List[Optional[float]] = field(default_factory=list)
+    spread_pct: List[Optional[float]] = field(default_factory=list)
+    spread_stability: List[Optional[float]] = field(default_factory=list)
+    oi: List[Optional[float]] = field(default_factory=list)
+    volume: List[Optional[float]] = field(default_factory=list)
+    iv: List[Optional[float]] = field(default_factory=list)
+    iv_percentile: List[Optional[float]] = field(default_factory=list)
+    bid: List[Optional[float]] = field(default_factory=list)
+    ask: List[Optional[float]] = field(default_factory=list)
+    last: List[Optional[float]] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.delta)
+
+    @classmethod
+    def from_rows(cls, rows: List[Dict[str, Any]]) -> "ChainArrays":
+        """Extract normalized contract rows (assistant picks / Tradier chain shape)."""
+        out = cls()
+        for r in rows or []:
+            # spread_pct stays None when the row has none: each scorer applies its own
+            # default for it (neutral for tradeability), bid/ask only feed EV
+            out.delta.append(_num(r.get("delta")))
+            out.spread_pct.append(_num(r.get("spread_pct")))
+            out.spread_stability.append(_num(r.get("spread_stability")))
+            out.oi.append(_num(r.get("oi")))
+            out.volume.append(_num(r.get("volume")))
+            out.iv.append(_num(r.get("iv")))
+            out.iv_percentile.append(_num(r.get("iv_percentile")))
+            out.bid.append(_num(r.get("bid")))
+            out.ask.append(_num(r.get("ask")))
+            out.last.append(_num(r.get("last")))
+        return out
+
+@dataclass
+class CompositeProfile:
+    """Weights/knobs for the quote-quality composite used by the scanner and ODTE ranking."""
+    stability: float = 0.30
+    spread: float = 0.20
+    delta_fit: float = 0.25
+    iv_percentile: float = 0.10
+    liquidity: float = 0.15
+    delta_target: float = 0.45
+    delta_default: float = 0.45
+    spread_default: float = 12.0
+    oi_scale: float = 1500.0
+    vol_scale: float = 6000.0
+
+# Setup scanner: rank a full expiry before NBBO sampling.
+SCANNER_PROFILE = CompositeProfile()
+
+def odte_profile(horizon: str) -> CompositeProfile:
+    """Assistant ODTE/scalp composite (delta target depends on horizon)."""
+    return CompositeProfile(
+        stability=0.30, spread=0.10, delta_fit=0.30, iv_percentile=0.15, liquidity=0.15,
+        delta_target=0.50 if horizon in ("scalp", "intraday") else 0.35,
+        delta_default=0.0, spread_default=0.0, oi_scale=2000.0, vol_scale=5000.0,
     )
-    return int(round(score*100)), comps
+
+def composite_scores(chain: ChainArrays, profile: CompositeProfile = SCANNER_PROFILE) -> List[float]:
+    """Quote-quality composite in 0..1 for every contract in `chain`."""
+    p = profile
+    out: List[float] = []
+    for st, sp, d, ivp, oi, vol in zip(chain.spread_stability, chain.spread_pct, chain.delta,
+                                       chain.iv_percentile, chain.oi, chain.volume):
+        st_s = 0.5 if st is None else st
+        sp_s = 1.0 - min(1.0, (p.spread_default if sp is None else sp) / 12.0)
+        d_s = 1.0 - min(1.0, abs(abs(p.delta_default if d is None else d) - p.delta_target))
+        iv_s = 1.0 - min(1.0, abs((50.0 if ivp is None else ivp) - 50.0) / 50.0)
+        liq_s = min(1.0, (oi or 0.0) / p.oi_scale + (vol or 0.0) / p.vol_scale)
+        score = st_s*p.stability + sp_s*p.spread + d_s*p.delta_fit + iv_s*p.iv_percentile + liq_s*p.liquidity
+        out.append(max(0.0, min(1.0, score)))
+    return out
+
+def score_chain(
+    chain: ChainArrays,
+    horizon: str = "intraday",
+    weights: ScoreWeights = ScoreWeights(),
+    em_abs: Optional[float] = None,
+    slippage_mult: float = 0.35,
+) -> Dict[str, Any]:
+    """
+    Batch tradeability + EV over a whole chain.
+    Returns {'score': [int], 'components': {name: [float]}, 'ev': [float|None],
+             'ev_reason': [str|None], 'mid', 'slip_round', and scalar 'p_tp'/'p_sl'/'p_tp_eff'}.
+    Touch probabilities only depend on EM so they are computed once per call.
+    """
+    n = len(chain)
+    comps: Dict[str, List[float]] = {k: [] for k in ("delta_fit", "spread_stability", "liquidity", "iv_percentile", "age")}
+    scores: List[int] = []
+    age_s = _age_score(None)  # no per-contract print age yet → neutral
+    for i in range(n):
+        oi = chain.oi[i] or 0.0
+        vol = chain.volume[i] or 0.0
+        vol_oi_ratio = (vol / oi) if oi else None
+        ivp = chain.iv_percentile[i]
+        c_delta = _delta_fit(chain.delta[i], horizon)
+        c_spread = _spread_quality(chain.spread_pct[i])
+        c_liq = _liquidity(oi, vol, vol_oi_ratio)
+        c_iv = _iv_percentile_score(ivp) if ivp is not None else _iv_bucket(chain.iv[i])
+        comps["delta_fit"].append(c_delta)
+        comps["spread_stability"].append(c_spread)
+        comps["liquidity"].append(c_liq)
+        comps["iv_percentile"].append(c_iv)
+        comps["age"].append(age_s)
+        score = (
+            c_delta*weights.delta_fit +
+            c_spread*weights.spread_stability +
+            c_liq*weights.liquidity +
+            c_iv*weights.iv_percentile +
+            age_s*weights.age
+        )
+        scores.append(int(round(score*100)))
+
+    out: Dict[str, Any] = {"score": scores, "components": comps,
+                           "ev": [None]*n, "ev_reason": ["no_em"]*n, "mid": [None]*n, "slip_round": [None]*n,
+                           "p_tp": None, "p_sl": None, "p_tp_eff": None}
+    if em_abs is None or em_abs <= 0:
+        return out
+    tp_dS = 0.5 * em_abs
+    sl_dS = 0.25 * em_abs
+    grid = ev_grid(chain, em_abs, [tp_dS], [sl_dS], slippage_mult=slippage_mult)
+    out.update({"tp_dS": tp_dS, "sl_dS": sl_dS, "p_tp": grid["p_tp"][0], "p_sl": grid["p_sl"][0],
+                "p_tp_eff": grid["p_tp_eff"][0][0]})
+    out["ev"] = [None if e is None else e[0][0] for e in grid["ev"]]
+    out["ev_reason"] = grid["reason"]
+    out["mid"] = grid["mid"]
+    out["slip_round"] = grid["slip_round"]
+    return out
+
+def touch_probabilities(distances: Sequence[Optional[float]], sigma_abs: Optional[float]) -> List[Optional[float]]:
+    """probability_of_touch over many distances sharing one sigma."""
+    if sigma_abs is None or sigma_abs <= 0:
+        return [None] * len(distances)
+    k = 1.0 / (sigma_abs * math.sqrt(2))
+    return [None if d is None else max(0.0, min(1.0, 1.0 - math.erf(d * k))) for d in distances]
+
+def ev_grid(
+    chain: ChainArrays,
+    em_abs: Optional[float],
+    tp_distances: Sequence[float],
+    sl_distances: Sequence[float],
+    slippage_mult: float = 0.35,
+) -> Dict[str, Any]:
+    """
+    EV for every contract × target distance × stop distance in one call.
+    Touch probabilities are computed once per distance and shared across the
+    chain; EV per cell uses the same model as expected_value_intraday.
+    Returns {'tp', 'sl', 'p_tp': [T], 'p_sl': [S], 'p_tp_eff': [T][S],
+             'ev': [n] of [T][S] (None when unpriced), 'reason', 'mid', 'slip_round',
+             'best': [n] of (tp_index, sl_index, ev) | None}.
+    """
+    n = len(chain)
+    tps = list(tp_distances); sls = list(sl_distances)
+    out: Dict[str, Any] = {"tp": tps, "sl": sls, "p_tp": [], "p_sl": [], "p_tp_eff": [],
+                           "ev": [None]*n, "reason": ["no_em"]*n, "mid": [None]*n,
+                           "slip_round": [None]*n, "best": [None]*n}
+    if em_abs is None or em_abs <= 0:
+        return out
+    p_tp = [p or 0.0 for p in touch_probabilities(tps, em_abs)]
+    p_sl = [p or 0.0 for p in touch_probabilities(sls, em_abs)]
+    p_eff = [[max(0.0, min(1.0, pt - 0.5*ps)) for ps in p_sl] for pt in p_tp]
+    out.update({"p_tp": p_tp, "p_sl": p_sl, "p_tp_eff": p_eff})
+    slip_k = slippage_mult * 2.0
+    for i in range(n):
+        d = chain.delta[i]
+        if d is None:
+            out["reason"][i] = "no_delta"
+            continue
+        bid = chain.bid[i]; ask = chain.ask[i]
+        if bid is not None and ask is not None and ask > 0:
+            mid = (bid + ask)/2.0
+        else:
+            mid = chain.last[i]
+        if mid is None or mid <= 0:
+            out["reason"][i] = "no_mid"
+            continue
+        ad = abs(d)
+        spread = (ask - bid) if (bid is not None and ask is not None) else 0.0
+        slip = max(0.0, spread * slip_k)
+        gains = [max(0.0, ad*t - slip) for t in tps]
+        losses = [ps * max(0.0, ad*s + slip) for s, ps in zip(sls, p_sl)]
+        cells = [[pe * g - l for pe, l in zip(row, losses)] for row, g in zip(p_eff, gains)]
+        best = None
+        for ti, row in enumerate(cells):
+            for si, v in enumerate(row):
+                if best is None or v > best[2]:
+                    best = (ti, si, v)
+        out["ev"][i] = cells
+        out["best"][i] = best
+        out["mid"][i] = mid
+        out["slip_round"][i] = slip
+        out["reason"][i] = None
+    return out
+
+def tradeability_score(contract: Dict[str, Any], horizon: str = "intraday", weights: ScoreWeights = ScoreWeights()) -> Tuple[int, Dict[str, float]]:
+    res = score_chain(ChainArrays.from_rows([contract]), horizon=horizon, weights=weights)
+    return res["score"][0], {k: v[0] for k, v in res["components"].items()}
+
+def _straddle_mid(x: Dict[str, Any]) -> Optional[float]:
+    b, a = x.get("bid"), x.get("ask")
+    if b is None or a is None or a <= 0:
+        # fallback to last if quotes are missing off-hours
+        return x.get("last")
+    return (b + a)/2.0
 
 def expected_move_from_straddle(last_price: float, candidates: List[Dict[str, Any]]) -> Tuple[Optional[float], Optional[float]]:
     """
@@ -105,22 +293,16 @@ def expected_move_from_straddle(last_price: float, candidates: List[Dict[str, An
     if not candidates or last_price is None:
         return None, None
 
-    # Find nearest call and put by |strike - spot|
-    calls = sorted([c for c in candidates if (c.get("type") or "").lower() == "call"], key=lambda r: abs((r.get("strike") or 0) - last_price))
-    puts  = sorted([p for p in candidates if (p.get("type") or "").lower() == "put"],  key=lambda r: abs((r.get("strike") or 0) - last_price))
+    # Find nearest call and put by |strike - spot| (only the nearest is needed)
+    dist = lambda r: abs((r.get("strike") or 0) - last_price)
+    calls = [c for c in candidates if (c.get("type") or "").lower() == "call"]
+    puts  = [p for p in candidates if (p.get("type") or "").lower() == "put"]
 
     if not calls or not puts:
         return None, None
 
-    def _mid(x):
-        b, a = x.get("bid"), x.get("ask")
-        if b is None or a is None or a <= 0:
-            # fallback to last if quotes are missing off-hours
-            return x.get("last")
-        return (b + a)/2.0
-
-    c = calls[0]; p = puts[0]
-    c_mid = _mid(c); p_mid = _mid(p)
+    c = min(calls, key=dist); p = min(puts, key=dist)
+    c_mid = _straddle_mid(c); p_mid = _straddle_mid(p)
     if c_mid is None or p_mid is None:
         return None, None
 
@@ -149,46 +331,177 @@ def expected_value_intraday(contract: Dict[str, Any], last_price: Optional[float
     - Approx option move via delta: dP ≈ delta * dS.
     - Roundtrip slippage ≈ slippage_mult * spread per side (2x).
     Returns (ev_dollars, breakdown), ev_dollars is None if insufficient fields.
+    Single-contract view of `score_chain`.
     """
     try:
         if em_abs is None:
             return None, {"reason": "no_em"}
-        d = contract.get("delta")
-        bid = contract.get("bid"); ask = contract.get("ask"); last_q = contract.get("last")
-        if d is None:
-            return None, {"reason": "no_delta"}
-        mid = None
-        if bid is not None and ask is not None and ask > 0:
-            mid = (bid + ask)/2.0
-        elif last_q is not None:
-            mid = float(last_q)
-        if mid is None or mid <= 0:
-            return None, {"reason": "no_mid"}
+        chain = ChainArrays.from_rows([contract])
+        res = score_chain(chain, horizon=horizon, em_abs=em_abs, slippage_mult=slippage_mult)
+        if res["ev"][0] is None:
+            return None, {"reason": res["ev_reason"][0]}
+        return res["ev"][0], ev_breakdown(res, chain, 0)
+    except Exception as e:
+        return None, {"error": f"{type(e).__name__}: {e}"}
+
+def ev_breakdown(res: Dict[str, Any], chain: ChainArrays, i: int) -> Dict[str, Any]:
+    """Per-contract EV breakdown (same keys as expected_value_intraday) from a score_chain result."""
+    if res.get("ev", [None])[i] is None:
+        return {"reason": res["ev_reason"][i]}
+    d = abs(chain.delta[i])
+    return {
+        "tp_dS": res["tp_dS"], "sl_dS": res["sl_dS"],
+        "p_tp": round(res["p_tp"],4), "p_sl": round(res["p_sl"],4),
+        "p_tp_eff": round(res["p_tp_eff"],4),
+        "gain": round(d*res["tp_dS"],4), "loss": round(d*res["sl_dS"],4),
+        "slip_round": round(res["slip_round"][i],4),
+        "mid": round(res["mid"][i],4)
+    }
 
-        # Distances on underlying
-        tp_dS = 0.5 * em_abs
-        sl_dS = 0.25 * em_abs
-        p_tp = probability_of_touch(tp_dS, em_abs) or 0.0
-        p_sl = probability_of_touch(sl_dS, em_abs) or 0.0
-        # crude dependency adjust to avoid overcounting
-        p_tp_eff = max(0.0, min(1.0, p_tp - 0.5*p_sl))
+# ---------- Expected-move term structure ----------
+SESSION_HOURS = 6.5
 
-        # Dollar moves on option via delta (ignore curvature)
-        gain = max(0.0, abs(d) * tp_dS)
-        loss = max(0.0, abs(d) * sl_dS)
+@dataclass
+class EMPoint:
+    expiry: str
+    dte: int
+    hours: float          # session hours to expiry (0DTE floored at a quarter session)
+    em_abs: float
+    em_rel: Optional[float]
+    strike_call: Optional[float] = None
+    strike_put: Optional[float] = None
 
-        spread = (ask - bid) if (bid is not None and ask is not None) else 0.0
-        slip_round = max(0.0, (spread or 0.0) * (slippage_mult * 2.0))
-
-        ev = p_tp_eff * max(0.0, gain - slip_round) - p_sl * max(0.0, loss + slip_round)
-        bd = {
-            "tp_dS": tp_dS, "sl_dS": sl_dS,
-            "p_tp": round(p_tp,4), "p_sl": round(p_sl,4),
-            "p_tp_eff": round(p_tp_eff,4),
-            "gain": round(gain,4), "loss": round(loss,4),
-            "slip_round": round(slip_round,4),
-            "mid": round(mid,4)
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "expiry": self.expiry, "dte": self.dte,
+            "em_abs": round(self.em_abs, 4),
+            "em_rel": round(self.em_rel, 6) if self.em_rel is not None else None,
         }
-        return ev, bd
-    except Exception as e:
-        return None, {"error": f"{type(e).__name__}: {e}"}
+
+@dataclass
+class EMTermStructure:
+    """Straddle-implied moves for every listed expiry, sorted by time to expiry.
+
+    Queries interpolate total variance (em_abs**2) linearly in session hours,
+    so a horizon between two expiries blends them and a horizon shorter than
+    the front expiry scales the front EM by sqrt(time).
+    """
+    last_price: Optional[float]
+    points: List[EMPoint] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.points)
+
+    def at_expiry(self, expiry: Any) -> Optional[EMPoint]:
+        exp = str(expiry or "")
+        for p in self.points:
+            if p.expiry == exp:
+                return p
+        return None
+
+    def at_hours(self, hours: float) -> Optional[float]:
+        """EM (absolute) over `hours` session hours from now."""
+        pts = self.points
+        if not pts or hours is None or hours <= 0:
+            return None
+        first = pts[0]
+        if hours <= first.hours:
+            return first.em_abs * math.sqrt(hours / first.hours)
+        for lo, hi in zip(pts, pts[1:]):
+            if hours <= hi.hours:
+                span = hi.hours - lo.hours
+                w = (hours - lo.hours) / span if span > 0 else 1.0
+                var = (1.0 - w) * lo.em_abs ** 2 + w * hi.em_abs ** 2
+                return math.sqrt(max(0.0, var))
+        last = pts[-1]
+        return last.em_abs * math.sqrt(hours / last.hours)
+
+    def at_days(self, days: float) -> Optional[float]:
+        return self.at_hours(max(0.25, float(days)) * SESSION_HOURS) if days is not None else None
+
+    def for_horizon(self, horizon_hours: Optional[float] = None, expiry: Any = None) -> Tuple[Optional[float], Optional[float]]:
+        """(em_abs, em_rel) over a holding horizon; without one, the EM to `expiry` (or the front expiry)."""
+        if horizon_hours:
+            em = self.at_hours(horizon_hours)
+        else:
+            p = self.at_expiry(expiry) if expiry else None
+            if p is None and self.points:
+                p = self.points[0]
+            em = p.em_abs if p is not None else None
+        if em is None:
+            return None, None
+        return em, (em / self.last_price if self.last_price else None)
+
+    def touch(self, distance: float, horizon_hours: Optional[float] = None, expiry: Any = None) -> Optional[float]:
+        """probability_of_touch for `distance` over a horizon or to an expiry."""
+        em, _ = self.for_horizon(horizon_hours, expiry)
+        return probability_of_touch(distance, em) if em else None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"last_price": self.last_price, "points": [p.as_dict() for p in self.points]}
+
+def _row_field(r: Dict[str, Any], *keys: str) -> Any:
+    srcs = (r, r.get("_occ") or {}, r.get("options") or {}, r.get("details") or {})
+    for k in keys:
+        for src in srcs:
+            v = src.get(k)
+            if v is not None:
+                return v
+    return None
+
+def _row_quote(r: Dict[str, Any]) -> Dict[str, Any]:
+    q = r.get("last_quote") or {}
+    t = r.get("last_trade") or {}
+    return {
+        "bid": _num(r.get("bid") if r.get("bid") is not None else q.get("bid")),
+        "ask": _num(r.get("ask") if r.get("ask") is not None else q.get("ask")),
+        "last": _num(r.get("last") if r.get("last") is not None else (t.get("price") or (r.get("day") or {}).get("close"))),
+    }
+
+def em_term_structure(last_price: Optional[float], rows: List[Dict[str, Any]], today: Optional[Any] = None) -> EMTermStructure:
+    """Build the EM term structure from a full chain in one pass.
+
+    Keeps the call and put nearest to spot per expiry and prices the straddle
+    the same way as expected_move_from_straddle. Accepts normalized rows
+    (type/strike/expiry/bid/ask) as well as raw Polygon snapshot rows.
+    """
+    from datetime import date as _date
+    if not rows or last_price is None or last_price <= 0:
+        return EMTermStructure(last_price=last_price)
+    td = today or _date.today()
+    best: Dict[str, List[Optional[Tuple[float, Dict[str, Any]]]]] = {}
+    for r in rows:
+        if not isinstance(r, dict):
+            continue
+        exp = _row_field(r, "expiry", "expiration", "expiration_date")
+        st = _num(_row_field(r, "strike", "strike_price"))
+        typ = str(_row_field(r, "type", "option_type", "contract_type") or "").lower()[:1]
+        if not exp or st is None or typ not in ("c", "p"):
+            continue
+        slot = best.setdefault(str(exp), [None, None])
+        i = 0 if typ == "c" else 1
+        d = abs(st - last_price)
+        if slot[i] is None or d < slot[i][0]:
+            slot[i] = (d, r)
+    points: List[EMPoint] = []
+    for exp, (c, p) in best.items():
+        if c is None or p is None:
+            continue
+        try:
+            dte = max(0, (_date.fromisoformat(exp[:10]) - td).days)
+        except ValueError:
+            continue
+        c_mid = _straddle_mid(_row_quote(c[1])); p_mid = _straddle_mid(_row_quote(p[1]))
+        if c_mid is None or p_mid is None:
+            continue
+        em = max(0.0, c_mid + p_mid)
+        if em <= 0:
+            continue
+        points.append(EMPoint(
+            expiry=exp, dte=dte, hours=max(0.25, float(dte)) * SESSION_HOURS,
+            em_abs=em, em_rel=em / last_price,
+            strike_call=_num(_row_field(c[1], "strike", "strike_price")),
+            strike_put=_num(_row_field(p[1], "strike", "strike_price")),
+        ))
+    points.sort(key=lambda x: (x.hours, x.expiry))
+    return EMTermStructure(last_price=last_price, points=points)
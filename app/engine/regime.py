@@ -1,43 +1,165 @@
 from __future__ import annotations
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Deque
+from collections import deque
+from dataclasses import dataclass, field
+import copy
 import math
-import statistics as stats
 
-def _rvol(bars: List[Dict[str, Any]], lookback: int = 60) -> Optional[float]:
-    """Relative volume: current session avg 1m vol vs trailing avg (fallback inside session)."""
-    vols = [b.get("v") or 0 for b in bars]
-    if not vols:
-        return None
-    cur = sum(vols[:min(len(vols), lookback)]) / max(1, min(len(vols), lookback))
-    base = sum(vols[-min(len(vols), lookback):]) / max(1, min(len(vols), lookback))
-    if base <= 0:
-        return None
-    return cur / base
+# Windows shared by the tracker and analyze()
+ORB_WINDOW = 30       # opening range: first 30 1m bars
+SIGMA_WINDOW = 60     # return sigma over the session's first 60 closes
+RVOL_LOOKBACK = 60    # opening vs latest 60-bar average volume
+DRIFT_WINDOW = 20     # up/down count over the last 20 bars
 
-def _orb_metrics(bars: List[Dict[str, Any]], window: int = 30) -> Dict[str, float]:
-    """Opening range breakout metrics from first N 1m bars."""
-    w = min(window, len(bars))
-    if w == 0:
-        return {"orb_high": None, "orb_low": None, "orb_range": None}
-    highs = [b.get("h") for b in bars[:w] if b.get("h") is not None]
-    lows  = [b.get("l") for b in bars[:w] if b.get("l") is not None]
-    if not highs or not lows:
-        return {"orb_high": None, "orb_low": None, "orb_range": None}
-    hi, lo = max(highs), min(lows)
-    return {"orb_high": hi, "orb_low": lo, "orb_range": (hi - lo)}
+@dataclass
+class RegimeTracker:
+    """
+    Streaming version of analyze(): O(1) per bar and per read.
+    Keeps the running opening range, Welford variance of early log returns,
+    opening/trailing volume sums and a short close window for drift.
+    feed() follows the same rules as indicators.BarStream: only newer bars
+    are applied, the forming bar stays a revisable tail, and a series whose
+    first bar changed (new session) is replayed from scratch.
+    """
+    n: int = 0                                  # bars applied
+    first_c: Optional[float] = None             # bars[0].c (None if missing)
+    orb_high: Optional[float] = None
+    orb_low: Optional[float] = None
+    n_closes: int = 0
+    prev_c: Optional[float] = None
+    ret_n: int = 0                              # Welford over log returns
+    ret_mean: float = 0.0
+    ret_m2: float = 0.0
+    open_vol: float = 0.0                       # sum of first RVOL_LOOKBACK volumes
+    tail_vols: Deque[float] = field(default_factory=lambda: deque(maxlen=RVOL_LOOKBACK))
+    tail_vol_sum: float = 0.0
+    drift: Deque[Optional[float]] = field(default_factory=lambda: deque(maxlen=DRIFT_WINDOW))
+    first_t: Any = None
+    last_t: Any = None
+    tail: Optional[Dict[str, Any]] = None
+
+    def reset(self) -> None:
+        self.__init__()
+
+    def update(self, bar: Dict[str, Any]) -> None:
+        """Apply one completed 1m bar."""
+        if self.n == 0:
+            self.first_c = bar.get("c")
+        self.n += 1
+        h, l, c = bar.get("h"), bar.get("l"), bar.get("c")
+        if self.n <= ORB_WINDOW:
+            if h is not None:
+                self.orb_high = h if self.orb_high is None else max(self.orb_high, h)
+            if l is not None:
+                self.orb_low = l if self.orb_low is None else min(self.orb_low, l)
+        if c is not None:
+            i = self.n_closes
+            if 1 <= i < SIGMA_WINDOW and self.prev_c and c:
+                r = math.log(c / self.prev_c)
+                self.ret_n += 1
+                d = r - self.ret_mean
+                self.ret_mean += d / self.ret_n
+                self.ret_m2 += d * (r - self.ret_mean)
+            self.prev_c = c
+            self.n_closes += 1
+        v = bar.get("v") or 0
+        if self.n <= RVOL_LOOKBACK:
+            self.open_vol += v
+        if len(self.tail_vols) == RVOL_LOOKBACK:
+            self.tail_vol_sum -= self.tail_vols[0]
+        self.tail_vols.append(v)
+        self.tail_vol_sum += v
+        self.drift.append(c)
+
+    def feed(self, bars: List[Dict[str, Any]]) -> "RegimeTracker":
+        if not bars:
+            return self
+        if self.first_t is not None and bars[0].get("t") != self.first_t:
+            self.reset()
+        for b in bars:
+            t = b.get("t")
+            if self.last_t is not None and t is not None and t <= self.last_t:
+                continue
+            if self.tail is not None and t is not None and t == self.tail.get("t"):
+                self.tail = b
+                continue
+            if self.tail is not None:
+                self.update(self.tail)
+                self.last_t = self.tail.get("t")
+            if self.first_t is None:
+                self.first_t = t
+            self.tail = b
+        if self.tail is not None:
+            self.tail = dict(self.tail)   # detach from the source series
+        return self
+
+    # ---- reads ----
+    def rvol(self) -> Optional[float]:
+        if self.n == 0:
+            return None
+        w = min(self.n, RVOL_LOOKBACK)
+        cur = self.open_vol / w
+        base = self.tail_vol_sum / w
+        if base <= 0:
+            return None
+        return cur / base
+
+    def sigma(self) -> Optional[float]:
+        if self.n_closes < 3 or self.ret_n < 3:
+            return None
+        return math.sqrt(self.ret_m2 / self.ret_n)
+
+    def result(self) -> Dict[str, Any]:
+        """Same payload as analyze() over every bar applied so far (tail included)."""
+        if self.tail is not None:
+            snap = copy.deepcopy(self)
+            snap.tail = None
+            snap.update(self.tail)
+            return snap.result()
+        if self.n == 0:
+            return {"opening_type": None, "regime": None, "metrics": {}}
+        orb_range = (self.orb_high - self.orb_low) if (self.orb_high is not None and self.orb_low is not None) else None
+        sigma = self.sigma() or 0.0
+        rvol = self.rvol()
+        ref = self.first_c or 1
+        opening_type = None
+        if orb_range is not None and rvol is not None:
+            # Large ORB + >1.2 rVOL -> opening drive
+            if orb_range > (0.0025 * ref) and rvol >= 1.2:
+                opening_type = "opening_drive"
+            # Small ORB + ~1.0 rVOL -> balanced
+            elif orb_range < (0.0015 * ref) and 0.8 <= rvol <= 1.2:
+                opening_type = "balanced"
+            else:
+                opening_type = "reversal_risk"
+        # Regime heuristic using sigma (vol expansion), and simple drift
+        if sigma > 0.003:
+            regime = "expansion"
+        else:
+            closes = [c for c in self.drift if c is not None]
+            if len(closes) >= 3:
+                up = sum(1 for i in range(1, len(closes)) if closes[i] > closes[i-1])
+                dn = len(closes) - 1 - up
+                regime = "trend" if abs(up - dn) >= len(closes)*0.35 else "balance"
+            else:
+                regime = "balance"
+        return {"opening_type": opening_type, "regime": regime, "metrics": {"rvol": rvol, "orb_range": orb_range, "sigma": sigma}}
+
+    def to_dict(self) -> Dict[str, Any]:
+        d = {k: getattr(self, k) for k in self.__dataclass_fields__}
+        d["tail_vols"] = list(self.tail_vols)
+        d["drift"] = list(self.drift)
+        return d
 
-def _sigma_of_returns(bars: List[Dict[str, Any]], window: int = 60) -> Optional[float]:
-    """Std dev of 1m log returns (lightweight)."""
-    closes = [b.get("c") for b in bars if b.get("c") is not None]
-    if len(closes) < 3:
-        return None
-    rets = []
-    for i in range(1, min(len(closes), window)):
-        if closes[i-1] and closes[i]:
-            rets.append(math.log(closes[i]/closes[i-1]))
-    if len(rets) < 3:
-        return None
-    return stats.pstdev(rets)
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "RegimeTracker":
+        d = dict(d)
+        tv = d.pop("tail_vols", []) or []
+        dr = d.pop("drift", []) or []
+        tr = cls(**d)
+        tr.tail_vols = deque(tv, maxlen=RVOL_LOOKBACK)
+        tr.drift = deque(dr, maxlen=DRIFT_WINDOW)
+        return tr
 
 def analyze(bars_1m: List[Dict[str, Any]]) -> Dict[str, Any]:
     """
@@ -45,39 +167,9 @@ def analyze(bars_1m: List[Dict[str, Any]]) -> Dict[str, Any]:
     - opening_type: 'opening_drive' | 'balanced' | 'reversal_risk' | None
     - regime: 'trend' | 'balance' | 'expansion' | None
     Returns metrics used downstream (rvol, orb_range, sigma).
+    Full-series fold of RegimeTracker; keep a tracker per symbol to avoid rescans.
     """
-    if not bars_1m:
-        return {"opening_type": None, "regime": None, "metrics": {}}
-
-    m = _orb_metrics(bars_1m, window=30)  # first 30m
-    sigma = _sigma_of_returns(bars_1m, window=60) or 0.0
-    rvol = _rvol(bars_1m, lookback=60)
-
-    # Opening type heuristic
-    opening_type = None
-    if m["orb_range"] is not None and rvol is not None:
-        # Large ORB + >1.2 rVOL -> opening drive
-        if m["orb_range"] > (0.0025 * (bars_1m[0].get("c") or 1)) and rvol >= 1.2:
-            opening_type = "opening_drive"
-        # Small ORB + ~1.0 rVOL -> balanced
-        elif m["orb_range"] < (0.0015 * (bars_1m[0].get("c") or 1)) and 0.8 <= rvol <= 1.2:
-            opening_type = "balanced"
-        else:
-            opening_type = "reversal_risk"
-
-    # Regime heuristic using sigma (vol expansion), and simple drift
-    regime = None
-    if sigma > 0.003:
-        regime = "expansion"
-    else:
-        # slope over last 20 bars
-        last = bars_1m[-20:] if len(bars_1m) >= 20 else bars_1m
-        closes = [b.get("c") for b in last if b.get("c") is not None]
-        if len(closes) >= 3:
-            up = sum(1 for i in range(1, len(closes)) if closes[i] > closes[i-1])
-            dn = len(closes) - 1 - up
-            regime = "trend" if abs(up - dn) >= len(closes)*0.35 else "balance"
-        else:
-            regime = "balance"
-
-    return {"opening_type": opening_type, "regime": regime, "metrics": {"rvol": rvol, "orb_range": m["orb_range"], "sigma": sigma}}
+    tr = RegimeTracker()
+    for b in bars_1m or []:
+        tr.update(b)
+    return tr.result()
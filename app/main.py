@@ -13,6 +13,8 @@ from app.routers.setups import router as setups_router
 from app.routers.storage import router as storage_router
 from app.services.premarket_ingest import run_on_startup as premarket_ingest_start
 from app.services.premarket_ingest import run_scheduler_on_startup as premarket_schedule_start
+from app.services.setup_scanner import run_scheduler_on_startup as setup_scan_schedule_start
+from app.services.expirations import run_scheduler_on_startup as expirations_warm_start
 
 app = FastAPI(title="Trading Assistant – Stable Exec Layer")
 
@@ -29,6 +31,10 @@ async def on_startup() -> None:
     await premarket_ingest_start()
     # Optional daily scheduler (runs around 09:10 ET by default)
     await premarket_schedule_start()
+    # Background setup scans (default universe, market-phase cadence)
+    await setup_scan_schedule_start()
+    # Option expirations per underlying, warmed at startup and 08:00 ET
+    await expirations_warm_start()
 
 
 @app.get("/api/v1/diag/health")
@@ -2,9 +2,17 @@ from __future__ import annotations
 
 import asyncio, inspect, math
 from typing import Any, Dict, List, Optional, Tuple, Literal
-from app.services.indicators import spread_stability as _spread_stability
+from app.services.indicators import spread_stability as _spread_stability, bar_stream, rvol_5min
 from app.services.iv_surface import get_iv_surface, percentile_rank as _pct_rank_surface
 from app.services.state_store import record_chain_aggregates
+from app.services.em_term import update_em_term, get_em_term
+from app.services import market_calendar as _mcal
+from app.services import expirations as _exps
+from app.utils.request_memo import memoized as _memoized, request_memo as _request_memo, request_scope as _request_scope
+from app.utils.disconnect import cancel_on_disconnect as _cancel_on_disconnect
+from app.services.admission import admitted as _admitted
+from app.utils.deadline import deadline_scope as _deadline_scope, remaining as _deadline_left, mark_timed_out as _mark_timed_out, within as _within
+from app.utils.topk import top_k_by as _top_k_by, strike_distance as _strike_distance
 from app.services.providers.polygon_market import INTERNALS_ENABLED as _POLY_INTERNALS_ENABLED
 from fastapi import APIRouter, Body, HTTPException
 from pydantic import BaseModel, Field, ValidationError
@@ -12,9 +20,9 @@ from pydantic import BaseModel, Field, ValidationError
 from app.routers.diag import providers as diag_providers
 from app.routers.market import market_overview as market_overview_route
 try:
-    from app.services.setup_scanner import scan_top_setups as _scan_top_setups
+    from app.services.setup_scanner import get_setups as _get_setups
 except Exception:
-    _scan_top_setups = None  # type: ignore
+    _get_setups = None  # type: ignore
 from app.routers.hedge import HedgeRequest, hedge_plan
 from app.routers.market_data import compute_levels as market_compute_levels
 from sqlalchemy import select, desc
@@ -27,8 +35,7 @@ router = APIRouter(prefix="/api/v1")
 from importlib import import_module as _im
 import os, re, time
 from urllib.parse import urlencode
-from datetime import datetime, time as _time
-from zoneinfo import ZoneInfo as _ZoneInfo
+from datetime import datetime
 from app.engine.risk_flags import compute_risk_flags
 
 PolygonMarket = None
@@ -63,19 +70,41 @@ for mod, cls in [
 # ---------- Optional engine imports (safe fallbacks) ----------
 expected_move_from_straddle = None
 probability_of_touch = None
-tradeability_score = None
-expected_value_intraday = None
+touch_probabilities = None
+score_chain = None
+ChainArrays = None
+composite_scores = None
+odte_profile = None
+ev_breakdown = None
+ev_grid = None
 
 try:
     em_mod = _im("app.engine.options_scoring")
     expected_move_from_straddle = getattr(em_mod, "expected_move_from_straddle", None)
     probability_of_touch = getattr(em_mod, "probability_of_touch", None)
-    tradeability_score = getattr(em_mod, "tradeability_score", None)
-    expected_value_intraday = getattr(em_mod, "expected_value_intraday", None)
+    touch_probabilities = getattr(em_mod, "touch_probabilities", None)
+    score_chain = getattr(em_mod, "score_chain", None)
+    ChainArrays = getattr(em_mod, "ChainArrays", None)
+    composite_scores = getattr(em_mod, "composite_scores", None)
+    odte_profile = getattr(em_mod, "odte_profile", None)
+    ev_breakdown = getattr(em_mod, "ev_breakdown", None)
+    ev_grid = getattr(em_mod, "ev_grid", None)
 except Exception as e:
     _prov_err.append(f"engine.options_scoring: {type(e).__name__}: {e}")
 
+# Process-wide cap on in-flight data.snapshot provider stages (price, chain, bars, levels, ...)
+_SNAPSHOT_SEM = asyncio.Semaphore(int(os.getenv("SNAPSHOT_MAX_CONCURRENCY", "12")))
+
 # ---------- Helpers ----------
+def _has_time(label: str, needed: float) -> bool:
+    """False (and the stage recorded as timed out) when the request deadline leaves less than `needed` seconds."""
+    left = _deadline_left()
+    if left is not None and left < needed:
+        _mark_timed_out(label)
+        return False
+    return True
+
+
 async def _maybe_await(v):
     if inspect.isawaitable(v):
         return await v
@@ -112,66 +141,32 @@ async def _atr14_daily(poly, symbol: str) -> Optional[float]:
     except Exception:
         return None
 
-def _market_is_open_now() -> bool:
-    try:
-        tz = _ZoneInfo("America/New_York")
-        now = datetime.now(tz)
-        if now.weekday() >= 5:
-            return False
-        t = now.time()
-        return (_time(9,30) <= t <= _time(16,0))
-    except Exception:
-        return True
-
-
 def _intraday_remaining_factor() -> float:
-    """Sqrt(time factor for remaining regular session (Eastern). 1 outside RTH."""
-    try:
-        tz = _ZoneInfo("America/New_York")
-        now = datetime.now(tz)
-        start = now.replace(hour=9, minute=30, second=0, microsecond=0)
-        end = now.replace(hour=16, minute=0, second=0, microsecond=0)
-        total = (end - start).total_seconds()
-        if now < start or now > end:
-            return 1.0
-        rem = max(0.0, (end - now).total_seconds())
-        frac = rem / max(1.0, total)
-        f = math.sqrt(max(0.0, min(1.0, frac)))
-        return float(min(1.0, max(0.4, f)))
-    except Exception:
+    """Sqrt of the share of today's regular session left (early closes included). 1 outside RTH."""
+    frac = _mcal.rth_remaining_fraction()
+    if frac is None:
         return 1.0
+    return float(min(1.0, max(0.4, math.sqrt(max(0.0, min(1.0, frac))))))
 
 
-_EM_CACHE_TTL = 120.0
-_EM_CACHE: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
-
-
-def _em_cache_key(sym: str, expiry: Any, horizon: str) -> Tuple[str, str, str]:
-    return (str(sym or '').upper(), str(expiry or ''), horizon)
-
-
-def _em_cache_get(sym: str, expiry: Any, horizon: str, last_price: Optional[float]) -> Optional[Tuple[float, Optional[float]]]:
-    key = _em_cache_key(sym, expiry, horizon)
-    entry = _EM_CACHE.get(key)
-    if not entry:
-        return None
-    if time.time() - entry.get('t', 0.0) > _EM_CACHE_TTL:
-        _EM_CACHE.pop(key, None)
-        return None
-    cache_lp = entry.get('lp')
-    if cache_lp is not None and last_price is not None and last_price > 0:
-        if abs(cache_lp - last_price)/last_price > 0.01:
-            return None
-    return entry.get('value')
-
-
-def _em_cache_put(sym: str, expiry: Any, horizon: str, last_price: Optional[float], em_abs: float, em_rel: Optional[float]) -> None:
-    key = _em_cache_key(sym, expiry, horizon)
-    _EM_CACHE[key] = {
-        't': time.time(),
-        'lp': last_price,
-        'value': (em_abs, em_rel)
-    }
+def _em_from_term(term: Any, expiry: Any, lo_dte: int, hi_dte: int, horizon_hours: Optional[float] = None) -> Tuple[Optional[float], Optional[float]]:
+    """EM lookup on a cached term structure: the requested expiry, else the first
+    listed expiry inside the horizon's DTE window, else interpolated at its start.
+    With horizon_hours the move is interpolated over that holding window instead."""
+    if not term:
+        return None, None
+    try:
+        if horizon_hours:
+            return term.for_horizon(horizon_hours)
+        pt = term.at_expiry(expiry)
+        if pt is None:
+            pt = next((p for p in term.points if lo_dte <= p.dte <= hi_dte), None)
+        if pt is not None:
+            return pt.em_abs, pt.em_rel
+        em = term.at_days(lo_dte)
+        return (em, em / term.last_price if em and term.last_price else None)
+    except Exception:
+        return None, None
 
 _OCC_RE = re.compile(r"^([A-Z]+)(\d{2})(\d{2})(\d{2})([CP])(\d{8})$")
 
@@ -222,11 +217,8 @@ def _near_atm_pairs(chain_rows: List[Dict[str, Any]], last_price: float, topK: i
     """Pick a few near-ATM call & put rows from a generic chain list; normalize fields."""
     if not chain_rows or last_price is None:
         return []
-    def keyer(r):
-        try:
-            return abs(float(r.get("strike", 0.0)) - float(last_price))
-        except Exception:
-            return 1e9
+    # Nearest strike first; at equal distance (several expiries in one list) the deeper OI
+    order = ((_strike_distance(last_price), False), (lambda r: r.get("open_interest") or r.get("oi"), True))
     def norm(r):
         g = r.get("greeks") or {}
         iv = r.get("iv") or r.get("implied_volatility") or g.get("iv")
@@ -255,8 +247,8 @@ def _near_atm_pairs(chain_rows: List[Dict[str, Any]], last_price: float, topK: i
 
     calls = [r for r in chain_rows if (r.get("type") or r.get("option_type","")).lower().startswith("c")]
     puts  = [r for r in chain_rows if (r.get("type") or r.get("option_type","")).lower().startswith("p")]
-    calls = list(map(norm, sorted(calls, key=keyer)[:max(1, topK//2)]))
-    puts  = list(map(norm, sorted(puts,  key=keyer)[:max(1, topK//2)]))
+    calls = list(map(norm, _top_k_by(calls, max(1, topK//2), *order)))
+    puts  = list(map(norm, _top_k_by(puts,  max(1, topK//2), *order)))
     return calls + puts
 
 def _simple_em_from_straddle(last_price: float, picks: List[Dict[str, Any]]) -> Tuple[Optional[float], Optional[float]]:
@@ -299,6 +291,42 @@ def _p_touch(distance: float, sigma_abs: float) -> Optional[float]:
     except Exception:
         return None
 
+def _hit_probs(em_abs: Optional[float], tiers: Tuple[float, ...] = (0.25, 0.50)) -> Dict[str, Optional[float]]:
+    """Touch probabilities for EM-multiple targets (tp1, tp2, ...) in one batch call."""
+    keys = [f"tp{i+1}" for i in range(len(tiers))]
+    if not em_abs:
+        return {k: None for k in keys}
+    dists = [em_abs * t for t in tiers]
+    probs: Optional[List[Optional[float]]] = None
+    if touch_probabilities:
+        try:
+            probs = touch_probabilities(dists, em_abs)
+        except Exception:
+            probs = None
+    if probs is None:
+        probs = [_p_touch(d, em_abs) for d in dists]
+    return dict(zip(keys, probs))
+
+def _score_picks(picks: List[Dict[str, Any]], horizon: str, em_abs: Optional[float], with_ev: bool = True) -> None:
+    """Batch tradeability/EV/ODTE composite for all picks in one pass (engine `score_chain`)."""
+    if not picks or score_chain is None or ChainArrays is None:
+        return
+    chain = ChainArrays.from_rows(picks)
+    res = score_chain(chain, horizon=horizon, em_abs=em_abs if with_ev else None)
+    odte = composite_scores(chain, odte_profile(horizon)) if composite_scores and odte_profile else None
+    comps = res["components"]
+    for i, r in enumerate(picks):
+        r["tradeability"] = res["score"][i]
+        r["components"] = {k: round(v[i], 4) for k, v in comps.items()}
+        if odte is not None:
+            r["odte_score"] = round(odte[i]*100.0, 1)
+        if with_ev and em_abs:
+            ev = res["ev"][i]
+            mid = res["mid"][i]
+            r["ev"] = {"dollars": ev, "pct": (ev/max(1e-6, mid)) if (ev is not None and mid) else None}
+            if ev_breakdown:
+                r["ev_detail"] = ev_breakdown(res, chain, i)
+
 # ---------- Chart link helper ----------
 _PUBLIC_BASE = os.getenv("PUBLIC_BASE_URL", "") or "https://web-production-a9084.up.railway.app"
 
@@ -413,15 +441,16 @@ def _chart_url(
             level_candidates = _collect_level_candidates(key_levels, fibs)
             window = max(0.15, em_abs * (0.20 if hz in ("scalp",) else 0.25 if hz in ("intraday",) else 0.35))
             if level_candidates:
-                near1 = _nearest_level(tp1, entry, direction, level_candidates, window)
-                if near1:
-                    tp1 = near1[1]
-                near2 = _nearest_level(tp2, entry, direction, level_candidates, window * 1.2)
+                (near1, near2), stop_note = _snap_levels(
+                    entry, direction, level_candidates, [(tp1, window), (tp2, window * 1.2)], (sl, window)
+                )
+                tp1, sl = _best_tp_sl(
+                    r, entry, em_abs,
+                    [near1[1], tp1] if near1 else [tp1],
+                    [stop_note[1], sl] if stop_note else [sl],
+                )
                 if near2:
                     tp2 = near2[1]
-                stop_note = _stop_near(entry, sl, direction, level_candidates, window)
-                if stop_note:
-                    sl = stop_note[1]
         except Exception:
             pass
         # Ensure TP spacing is meaningful
@@ -448,17 +477,15 @@ def _chart_url(
         level_candidates = _collect_level_candidates(key_levels, fibs)
         window = max(0.15, (em_abs or 1.0) * 0.15)
         if level_candidates:
-            if tp1 is not None:
-                tp1_note = _nearest_level(tp1, entry, direction, level_candidates, window)
-                if tp1_note:
-                    plan.append(f"TP1 aligns with {tp1_note[0]} @ {tp1_note[1]:.2f}")
-                    r.setdefault("level_confluence", {})["tp1"] = {"label": tp1_note[0], "price": round(tp1_note[1], 2)}
-            if tp2 is not None:
-                tp2_note = _nearest_level(tp2, entry, direction, level_candidates, window * 1.5)
-                if tp2_note:
-                    plan.append(f"TP2 mindful of {tp2_note[0]} @ {tp2_note[1]:.2f}")
-                    r.setdefault("level_confluence", {})["tp2"] = {"label": tp2_note[0], "price": round(tp2_note[1], 2)}
-            stop_note = _stop_near(entry, sl, direction, level_candidates, window)
+            (tp1_note, tp2_note), stop_note = _snap_levels(
+                entry, direction, level_candidates, [(tp1, window), (tp2, window * 1.5)], (sl, window)
+            )
+            if tp1_note:
+                plan.append(f"TP1 aligns with {tp1_note[0]} @ {tp1_note[1]:.2f}")
+                r.setdefault("level_confluence", {})["tp1"] = {"label": tp1_note[0], "price": round(tp1_note[1], 2)}
+            if tp2_note:
+                plan.append(f"TP2 mindful of {tp2_note[0]} @ {tp2_note[1]:.2f}")
+                r.setdefault("level_confluence", {})["tp2"] = {"label": tp2_note[0], "price": round(tp2_note[1], 2)}
             if stop_note:
                 plan.append(f"Stop sits near {stop_note[0]} @ {stop_note[1]:.2f}")
                 r.setdefault("level_confluence", {})["stop"] = {"label": stop_note[0], "price": round(stop_note[1], 2)}
@@ -584,38 +611,65 @@ def _collect_level_candidates(key_levels: Optional[Dict[str, Any]], fibs: Option
     return levels
 
 
-def _nearest_level(target: float, entry: float, direction: str, levels: List[Tuple[str, float]], window: float) -> Optional[Tuple[str, float]]:
-    candidates: List[Tuple[str, float, float]] = []
-    for label, price in levels:
-        if direction == "long" and price < min(entry, target):
-            continue
-        if direction == "short" and price > max(entry, target):
-            continue
-        diff = abs(price - target)
-        if diff <= window:
-            candidates.append((label, price, diff))
-    if not candidates:
-        return None
-    label, price, _ = min(candidates, key=lambda x: x[2])
-    return label, price
+def _snap_levels(
+    entry: float,
+    direction: str,
+    levels: List[Tuple[str, float]],
+    targets: List[Tuple[float, float]],
+    stop: Optional[Tuple[float, float]] = None,
+) -> Tuple[List[Optional[Tuple[str, float]]], Optional[Tuple[str, float]]]:
+    """Nearest level for every (target, window) plus the stop in one pass over `levels`.
 
-
-def _stop_near(entry: float, stop: float, direction: str, levels: List[Tuple[str, float]], window: float) -> Optional[Tuple[str, float]]:
-    candidates: List[Tuple[str, float, float]] = []
+    Targets only snap to levels on the profit side of entry (or beyond the
+    target); the stop only snaps to levels on the loss side of entry.
+    """
+    best: List[Optional[Tuple[float, str, float]]] = [None] * len(targets)
+    best_stop: Optional[Tuple[float, str, float]] = None
+    long = direction == "long"
+    short = direction == "short"
+    bounds = [(min(entry, t) if long else None, max(entry, t) if short else None) for t, _ in targets]
     for label, price in levels:
-        if direction == "long" and price > entry:
-            continue
-        if direction == "short" and price < entry:
-            continue
-        diff = abs(price - stop)
-        if diff <= window:
-            candidates.append((label, price, diff))
-    if not candidates:
-        return None
-    label, price, _ = min(candidates, key=lambda x: x[2])
-    return label, price
-
-
+        for i, (t, window) in enumerate(targets):
+            lo, hi = bounds[i]
+            if (lo is not None and price < lo) or (hi is not None and price > hi):
+                continue
+            diff = abs(price - t)
+            if diff <= window and (best[i] is None or diff < best[i][0]):
+                best[i] = (diff, label, price)
+        if stop is not None:
+            if (long and price > entry) or (short and price < entry):
+                continue
+            diff = abs(price - stop[0])
+            if diff <= stop[1] and (best_stop is None or diff < best_stop[0]):
+                best_stop = (diff, label, price)
+    hits = [(b[1], b[2]) if b else None for b in best]
+    return hits, ((best_stop[1], best_stop[2]) if best_stop else None)
+
+
+def _best_tp_sl(
+    contract: Dict[str, Any], entry: float, em_abs: float, tps: List[float], sls: List[float]
+) -> Tuple[float, float]:
+    """(TP1, stop) pair with the best EV for `contract` among the candidate prices
+    (level-snapped first, so they win ties). Falls back to the first candidates when
+    the contract cannot be priced."""
+    if ev_grid is None or ChainArrays is None:
+        return tps[0], sls[0]
+    grid = ev_grid(ChainArrays.from_rows([contract]), em_abs,
+                   [abs(t - entry) for t in tps], [abs(s - entry) for s in sls])
+    best = grid["best"][0]
+    if best is None:
+        return tps[0], sls[0]
+    return tps[best[0]], sls[best[1]]
+
+
+async def _market_overview(indices: str, sectors: str) -> Dict[str, Any]:
+    """market_overview, fetched at most once per request for a given indices/sectors set."""
+    key = tuple(sorted({x.strip().upper() for x in indices.split(",") if x.strip()})), \
+        tuple(sorted({x.strip().upper() for x in sectors.split(",") if x.strip()}))
+    return await _memoized(("market.overview",) + key, lambda: market_overview_route(indices=indices, sectors=sectors))
+
+
+@_request_memo(lambda poly: "internals")
 async def _market_internals_summary(poly) -> Optional[Dict[str, Any]]:
     """Fetch a few market-internals proxies (advancers/decliners, TICK, ADD) and distil a signal."""
     if not poly or not _POLY_INTERNALS_ENABLED:
@@ -704,7 +758,7 @@ async def _market_internals_summary(poly) -> Optional[Dict[str, Any]]:
 
     # Sector breadth via overview (best-effort)
     try:
-        overview = await market_overview_route(indices="SPY,QQQ", sectors="XLK,XLV,XLF,XLE,XLY,XLP,XLI,XLB,XLRE,XLU,XLC")
+        overview = await _market_overview(indices="SPY,QQQ", sectors="XLK,XLV,XLF,XLE,XLY,XLP,XLI,XLB,XLRE,XLU,XLC")
         sectors = (overview or {}).get("sectors") or {}
         up = [sym for sym, payload in sectors.items() if isinstance(payload, dict) and isinstance(payload.get("change_pct"), (int, float)) and payload.get("change_pct", 0) > 0]
         down = [sym for sym, payload in sectors.items() if isinstance(payload, dict) and isinstance(payload.get("change_pct"), (int, float)) and payload.get("change_pct", 0) < 0]
@@ -766,6 +820,16 @@ class ExecRequest(BaseModel):
         "data.snapshot",
     ]
     args: Dict[str, Any] = Field(default_factory=dict)
+    deadline_s: Optional[float] = Field(default=None, gt=0, le=60, description="Time budget (seconds); defaults per op")
+
+
+class ExecBatchOp(ExecRequest):
+    id: Optional[str] = Field(default=None, description="Result key; defaults to the op's position in the batch")
+
+
+class ExecBatchRequest(BaseModel):
+    ops: List[ExecBatchOp] = Field(..., min_length=1, max_length=12)
+    deadline_s: Optional[float] = Field(default=None, gt=0, le=60, description="Budget for the whole batch (seconds)")
 
 
 class PositionSpec(BaseModel):
@@ -821,8 +885,95 @@ async def assistant_actions() -> Dict[str, Any]:
     }
 
 
+# Default time budget per op (seconds); ASSISTANT_EXEC_DEADLINE covers the rest
+_EXEC_DEADLINE_S = float(os.getenv("ASSISTANT_EXEC_DEADLINE", "10"))
+_OP_DEADLINES: Dict[str, float] = {
+    "data.snapshot": 12.0,
+    "market.setups": 15.0,
+    "assistant.hedge": 12.0,
+    "positions.manage": 12.0,
+    "premarket.context": 8.0,
+    "market.overview": 8.0,
+}
+# Slack after the deadline for stages to notice it and the response to be assembled
+_DEADLINE_GRACE_S = 1.0
+
+
+async def _exec_with_deadline(payload: ExecRequest) -> Dict[str, Any]:
+    """Run one op under its deadline. Stages cut short mark the result partial; if the
+    op as a whole overruns, outstanding work is cancelled and a partial error returned."""
+    budget = payload.deadline_s or _OP_DEADLINES.get(payload.op, _EXEC_DEADLINE_S)
+    # Provider and helper results are shared by every branch of this one exec; the memo
+    # scope opens inside the deadline (in a batch it joins the batch-wide scope instead)
+    with _deadline_scope(budget) as report, _request_scope():
+        try:
+            res = await asyncio.wait_for(_exec_op(payload), budget + _DEADLINE_GRACE_S)
+        except asyncio.TimeoutError:
+            return {
+                "ok": False, "op": payload.op, "partial": True, "data": None,
+                "timed_out": report["timed_out"],
+                "error": {"code": "DEADLINE_EXCEEDED", "message": f"not finished within {budget:g}s"},
+            }
+    if report["timed_out"]:
+        res = dict(res, partial=True, timed_out=report["timed_out"])
+    return res
+
+
 @router.post("/assistant/exec")
+@_cancel_on_disconnect("assistant.exec")
 async def assistant_exec(payload: ExecRequest = Body(...)) -> Dict[str, Any]:
+    return await _exec_with_deadline(payload)
+
+
+_BATCH_DEADLINE_S = float(os.getenv("ASSISTANT_BATCH_DEADLINE", "20"))
+
+
+def _exec_error(op: str, exc: BaseException) -> Dict[str, Any]:
+    if isinstance(exc, HTTPException):
+        detail = exc.detail if isinstance(exc.detail, dict) else {"error": {"message": str(exc.detail)}}
+        return {"ok": False, "op": op, "status": exc.status_code, "error": detail.get("error") or detail}
+    return {"ok": False, "op": op, "status": 500, "error": {"code": type(exc).__name__, "message": str(exc)}}
+
+
+@router.post("/assistant/exec/batch")
+@_cancel_on_disconnect("assistant.exec.batch")
+async def assistant_exec_batch(payload: ExecBatchRequest = Body(...)) -> Dict[str, Any]:
+    """Run several exec ops concurrently under one memo scope and one deadline.
+
+    Results are keyed by op id; an op that fails or misses the deadline gets an
+    error entry instead of failing the batch.
+    """
+    ids = [item.id or str(i) for i, item in enumerate(payload.ops)]
+    if len(set(ids)) != len(ids):
+        raise _bad_request("batch", "Duplicate op ids", {"ids": ids})
+    budget = payload.deadline_s or _BATCH_DEADLINE_S
+    started = time.perf_counter()
+    # Memo scope opened under the batch deadline: fetches shared between ops are bound
+    # by the batch budget, not by the shorter budget of the op that started them
+    with _deadline_scope(budget), _request_scope():
+        # Each op keeps its own (shorter) budget inside the batch deadline
+        tasks = {i: asyncio.ensure_future(_exec_with_deadline(item)) for i, item in zip(ids, payload.ops)}
+        done, pending = await asyncio.wait(tasks.values(), timeout=budget + _DEADLINE_GRACE_S)
+        for t in pending:
+            t.cancel()
+        # Let cancelled ops unwind (admission slots, memo scope) before responding
+        await asyncio.gather(*pending, return_exceptions=True)
+    results: Dict[str, Any] = {}
+    for (i, t), item in zip(tasks.items(), payload.ops):
+        if t in pending:
+            results[i] = {"ok": False, "op": item.op, "status": 504, "error": {"code": "DEADLINE_EXCEEDED", "message": f"not finished within {budget:g}s"}}
+        elif t.exception() is not None:
+            results[i] = _exec_error(item.op, t.exception())
+        else:
+            results[i] = t.result()
+    return {
+        "ok": all(r.get("ok", True) for r in results.values()),
+        "results": results,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+async def _exec_op(payload: ExecRequest) -> Dict[str, Any]:
     op = payload.op
 
     if op == "diag.health":
@@ -858,7 +1009,7 @@ async def assistant_exec(payload: ExecRequest = Body(...)) -> Dict[str, Any]:
         ]
         indices = ",".join(sorted({s.upper() for s in indices_list if s}))
         sectors = ",".join(sorted({s.upper() for s in sectors_list if s}))
-        overview = await market_overview_route(indices=indices, sectors=sectors)
+        overview = await _market_overview(indices=indices, sectors=sectors)
         ok = bool(overview.get("ok", True))
         data = {k: v for k, v in overview.items() if k != "ok"}
         return {"ok": ok, "op": op, "data": data}
@@ -868,33 +1019,35 @@ async def assistant_exec(payload: ExecRequest = Body(...)) -> Dict[str, Any]:
             args = ArgsMarketSetups.model_validate(payload.args or {})
         except ValidationError as exc:
             raise _bad_request(op, "Invalid args", {"errors": exc.errors()}) from exc
-        if _scan_top_setups is None:
+        if _get_setups is None:
             raise _bad_request(op, "Setups scanner unavailable", {"import": "app.services.setup_scanner"})
         try:
             symbols_list = [str(s).upper() for s in (getattr(args, 'symbols', None) or [])]
             strict_flag = bool(getattr(args, 'strict', True))
             min_conf = int(getattr(args, 'min_confidence', 70))
-            setups = await _scan_top_setups(
+            res = await _get_setups(
                 limit=args.limit,
                 include_options=bool(getattr(args, 'include_options', False)),
                 symbols=symbols_list,
                 strict=strict_flag,
                 min_confidence=min_conf,
             )
+            setups = res["setups"]
             fallback_used = False
             # Automatic second pass for broad scans (no symbols) when strict returns empty
             if not setups and strict_flag and not symbols_list:
-                setups = await _scan_top_setups(
+                res = await _get_setups(
                     limit=args.limit,
                     include_options=bool(getattr(args, 'include_options', False)),
                     symbols=None,
                     strict=False,
                     min_confidence=max(0, min_conf - 5 if min_conf else 65) or 65,
                 )
+                setups = res["setups"]
                 fallback_used = True
 
             # After-hours bias: prefer swing/leaps and include a compact macro snapshot
-            after_hours = not _market_is_open_now()
+            after_hours = not _mcal.is_open()
             if after_hours and setups:
                 def _h_order(item):
                     h = str(((item or {}).get('preferred_option') or {}).get('horizon') or '').lower()
@@ -902,7 +1055,12 @@ async def assistant_exec(payload: ExecRequest = Body(...)) -> Dict[str, Any]:
                     return order.get(h, 99)
                 setups = sorted(setups, key=_h_order)
 
-            data = {"count": len(setups), "setups": setups}
+            data = {"count": len(setups), "setups": setups, "as_of": res.get("as_of"), "stale": res.get("stale")}
+            if res.get("shed"):
+                data["shed"] = True
+            if res.get("timed_out") or res.get("options_timed_out"):
+                data["timed_out"] = res.get("timed_out") or []
+                data["options_timed_out"] = res.get("options_timed_out") or []
             if fallback_used:
                 data["fallback"] = True
 
@@ -922,7 +1080,7 @@ async def assistant_exec(payload: ExecRequest = Body(...)) -> Dict[str, Any]:
             if after_hours:
                 data["after_hours"] = True
                 try:
-                    mo = await market_overview_route(indices="SPY,QQQ", sectors="XLK,XLV,XLF,XLE,XLY,XLP,XLI,XLB,XLRE,XLU,XLC")
+                    mo = await _market_overview(indices="SPY,QQQ", sectors="XLK,XLV,XLF,XLE,XLY,XLP,XLI,XLB,XLRE,XLU,XLC")
                     if mo and bool(mo.get("ok", True)):
                         data["macro"] = {
                             "indices": {k: (mo.get("indices") or {}).get(k) for k in ("SPY","QQQ")},
@@ -932,6 +1090,8 @@ async def assistant_exec(payload: ExecRequest = Body(...)) -> Dict[str, Any]:
                     pass
 
             return {"ok": True, "op": op, "data": data}
+        except HTTPException:
+            raise
         except Exception as exc:
             raise HTTPException(status_code=500, detail={"ok": False, "error": {"code": type(exc).__name__, "message": str(exc)}})
 
@@ -979,7 +1139,7 @@ async def assistant_exec(payload: ExecRequest = Body(...)) -> Dict[str, Any]:
                     if pre is None:
                         pre = {}
                     if not pre.get("sentiment"):
-                        mo = await market_overview_route(indices="SPY,QQQ", sectors="XLK,XLV,XLF,XLE,XLY,XLP,XLI,XLB,XLRE,XLU,XLC")
+                        mo = await _market_overview(indices="SPY,QQQ", sectors="XLK,XLV,XLF,XLE,XLY,XLP,XLI,XLB,XLRE,XLU,XLC")
                         spy = ((mo or {}).get("indices") or {}).get("SPY") or {}
                         qqq = ((mo or {}).get("indices") or {}).get("QQQ") or {}
                         chg = [x for x in [spy.get("change_pct"), qqq.get("change_pct")] if isinstance(x, (int, float))]
@@ -1213,10 +1373,81 @@ async def assistant_exec(payload: ExecRequest = Body(...)) -> Dict[str, Any]:
 
     raise _bad_request(op, f"Unknown op '{op}' or invalid args.")
 
+# ---------- Snapshot field projection ----------
+# Work a data.snapshot can do, and which of it each output field needs. With `fields`
+# only those stages run; without it everything runs as before.
+SNAPSHOT_STAGES: Tuple[str, ...] = ("price", "chain", "iv_surface", "nbbo", "intraday", "levels", "internals", "premarket")
+_CHAIN = ("price", "chain")
+_LEVELS = ("levels",)
+SNAPSHOT_FIELDS: Dict[str, Tuple[str, ...]] = {
+    "price.last": ("price",),
+    "options.top": _CHAIN,
+    "options.strategies": _CHAIN,
+    "context.expected_move": _CHAIN,
+    "context.em_term": _CHAIN,
+    "context.liquidity_trend": _CHAIN,
+    "context.index_note": _CHAIN,
+    "context.iv_surface": _CHAIN + ("iv_surface",),
+    "context.order_flow": _CHAIN + ("nbbo",),
+    "context.risk_flags": _CHAIN,
+    "context.intraday": ("intraday",),
+    "context.key_levels": _LEVELS,
+    "context.fibonacci": _LEVELS,
+    "context.pivots": _LEVELS,
+    "context.prev_day_levels": _LEVELS,
+    "context.levels_session_utc": _LEVELS,
+    "context.levels_source": _LEVELS,
+    "context.index_proxy_note": _LEVELS,
+    "context.market_internals": ("internals",),
+    "context.premarket": ("premarket",),
+    "levels": _LEVELS,
+}
+
+
+def _snapshot_plan(fields: Any) -> Tuple[Optional[List[str]], set]:
+    """Expand requested fields (exact names or prefixes like "context") into catalogue
+    keys and the stages they need; (None, all stages) when no projection was asked for."""
+    if not fields:
+        return None, set(SNAPSHOT_STAGES)
+    wanted = [str(f).strip() for f in fields if str(f).strip()]
+    keys: List[str] = []
+    unknown: List[str] = []
+    for f in wanted:
+        hits = [k for k in SNAPSHOT_FIELDS if k == f or k.startswith(f + ".")]
+        if not hits:
+            unknown.append(f)
+        keys.extend(k for k in hits if k not in keys)
+    if unknown:
+        raise _bad_request("data.snapshot", "Unknown snapshot fields", {"unknown": unknown, "allowed": sorted(SNAPSHOT_FIELDS)})
+    return keys, {stage for k in keys for stage in SNAPSHOT_FIELDS[k]}
+
+
+def _project(out: Dict[str, Any], keys: List[str]) -> Dict[str, Any]:
+    proj: Dict[str, Any] = {}
+    for k in keys:
+        head, _, tail = k.partition(".")
+        if head not in out:
+            continue
+        if not tail:
+            proj[head] = out[head]
+        elif tail in (out[head] or {}):
+            proj.setdefault(head, {})[tail] = out[head][tail]
+    return proj
+
+
 # ---------- Core handler ----------
+@_admitted("data.snapshot")
 async def _handle_snapshot(args: Dict[str, Any]) -> Dict[str, Any]:
     symbols: List[str] = [str(s).upper() for s in (args.get("symbols") or [])]
-    include: List[str] = args.get("include") or []
+    include: List[str] = list(args.get("include") or [])
+    fields, stages = _snapshot_plan(args.get("fields"))
+    if fields is not None:
+        # The projection decides which sections are produced
+        include = [x for x in include if x not in ("options", "levels")]
+        if "chain" in stages:
+            include.append("options")
+        if "levels" in fields:
+            include.append("levels")
     options_req: Dict[str, Any] = args.get("options") or {}
     horizon: str = (args.get("horizon") or "intraday").lower()
 
@@ -1226,7 +1457,6 @@ async def _handle_snapshot(args: Dict[str, Any]) -> Dict[str, Any]:
     # init providers (non-fatal)
     poly = PolygonMarket() if PolygonMarket else None
     tradier = (TradierMarket or TradierClient)() if (TradierMarket or TradierClient) else None
-    market_internals_cache: Optional[Dict[str, Any]] = None
 
     async def last_price(sym: str) -> Optional[float]:
         # Try Tradier then Polygon (non-fatal)
@@ -1246,7 +1476,12 @@ async def _handle_snapshot(args: Dict[str, Any]) -> Dict[str, Any]:
                 errs[f"{sym}.price.polygon"] = f"{type(e).__name__}: {e}"
         return None
 
-    async def options_top(sym: str, lp: Optional[float]) -> Tuple[List[Dict[str, Any]], Optional[float], Optional[float], Dict[str, Any]]:
+    async def options_top(
+        sym: str,
+        lp: Optional[float],
+        key_levels_data: Optional[Dict[str, Any]] = None,
+        fib_data: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[float], Optional[float], Dict[str, Any]]:
         """Return (picks, EM_abs, EM_rel). Always tries to return *something*."""
         picks: List[Dict[str, Any]] = []
         em_abs = None; em_rel = None
@@ -1272,6 +1507,11 @@ async def _handle_snapshot(args: Dict[str, Any]) -> Dict[str, Any]:
                 odte_flag = True
         except Exception:
             pass
+        # Auto-picked dates (e.g. a Friday holiday) snap to a listed expiry when today's list is cached
+        if str(options_req.get("expiry") or "auto").strip().lower() == "auto":
+            listed = _exps.cached_expirations(sym)
+            if listed:
+                expiry = _exps.snap_to_listed(listed, expiry)
 
         if "options" in include and poly and (not (_is_spx(sym) or _is_ndx(sym))):
             try:
@@ -1329,12 +1569,20 @@ async def _handle_snapshot(args: Dict[str, Any]) -> Dict[str, Any]:
                             out.append(r)
                     return out
                 # Cache/update IV surface and record liquidity aggregates
+                surface_map: Optional[Dict[str, Any]] = None
                 if chain_rows:
                     try:
+                        # Merges into the per-underlying surface; unchanged expiries are skipped.
+                        # Local work over rows already fetched, and the picks' IV percentiles
+                        # depend on it, so it runs whenever the chain does; the stage only
+                        # gates the context.iv_surface section.
                         surf = await get_iv_surface(poly, sym, rows=chain_rows, ttl=180, last_price=lp)
-                        ctx.setdefault("iv_surface", {"ts": surf.get("ts")})
+                        surface_map = (surf or {}).get("surface") or {}
+                        if "iv_surface" in stages:
+                            ctx.setdefault("iv_surface", {"ts": surf.get("ts")})
                     except Exception:
                         pass
+                if chain_rows:
                     try:
                         liq = record_chain_aggregates(sym, expiry, chain_rows)
                         if liq:
@@ -1363,12 +1611,16 @@ async def _handle_snapshot(args: Dict[str, Any]) -> Dict[str, Any]:
                             picks = [p for p in picks if (p.get("spread_pct") is None) or (p.get("spread_pct") <= maxSpreadPct)]
 
                 # EM & probabilities if we have picks and last price
-                cache_key = _em_cache_key(sym, expiry, horizon)
                 if picks and lp is not None:
-                    cached_em = _em_cache_get(sym, expiry, horizon, lp)
-                    if cached_em:
-                        em_abs, em_rel = cached_em
-                    else:
+                    # One pass prices every expiry; later lookups are cache hits
+                    try:
+                        term = update_em_term(sym, chain_rows, lp) if chain_rows else get_em_term(sym, lp)
+                    except Exception:
+                        term = None
+                    em_abs, em_rel = _em_from_term(term, expiry, lo_dte, hi_dte)
+                    if term:
+                        ctx.setdefault("em_term", term.as_dict())
+                    if not em_abs:
                         em_abs, em_rel = _simple_em_from_straddle(lp, picks)
                     if not em_abs and poly:
                         # Fallback to ATR(14) daily when straddle-based EM is unavailable
@@ -1380,26 +1632,6 @@ async def _handle_snapshot(args: Dict[str, Any]) -> Dict[str, Any]:
                             em_abs = atr
                             em_rel = (atr/float(lp)) if lp else None
                     if em_abs:
-                        _em_cache_put(sym, expiry, horizon, lp, em_abs, em_rel)
-                    if em_abs:
-                        # Composite ODTE scoring helper
-                        def _odte_composite(r: Dict[str, Any]) -> Optional[float]:
-                            try:
-                                st = r.get("spread_stability")
-                                st_s = float(st) if isinstance(st,(int,float)) else 0.5
-                                sp = r.get("spread_pct")
-                                sp_s = 1.0 - min(1.0, float(sp or 0.0)/12.0)
-                                d = r.get("delta")
-                                target = 0.50 if horizon in ("scalp","intraday") else 0.35
-                                d_s = 1.0 - min(1.0, abs(abs(float(d or 0.0)) - target))
-                                ivp = r.get("iv_percentile")
-                                iv_s = 1.0 - min(1.0, abs(float((ivp or 50.0))-50.0)/50.0)
-                                oi = float(r.get("oi") or 0.0); vol = float(r.get("volume") or 0.0)
-                                liq_s = min(1.0, oi/2000.0 + vol/5000.0)
-                                score = st_s*0.30 + d_s*0.30 + iv_s*0.15 + liq_s*0.15 + sp_s*0.10
-                                return max(0.0, min(1.0, score))
-                            except Exception:
-                                return None
                         # Percentiles from chain rows (IV/OI/Volume) if available
                         def _extract_fields(rows: List[Dict[str, Any]]):
                             ivs: List[float] = []
@@ -1465,53 +1697,37 @@ async def _handle_snapshot(args: Dict[str, Any]) -> Dict[str, Any]:
 
                         if chain_rows:
                             ivs, ois, vols = _extract_fields(chain_rows)
-                            surface_map = None
-                            try:
-                                # Prefer surface cache when available
-                                surf2 = await get_iv_surface(poly, sym, rows=None, ttl=180, last_price=lp)
-                                surface_map = (surf2 or {}).get("surface") or {}
-                            except Exception:
-                                surface_map = None
 
+                        hit_probs = _hit_probs(em_abs)
                         for r in picks:
-                            # tradeability may be missing; compute only if engine available
-                            ta = None
-                            comps = None
-                            if tradeability_score:
-                                try:
-                                    # Add percentiles if possible
-                                    bucket_ivs = []
-                                    if surface_map is not None:
-                                        bucket_ivs = _pick_bucket_iv_list(surface_map, expiry, r.get("strike"), lp)
-                                    if bucket_ivs:
-                                        r["iv_percentile"] = _pct_rank(bucket_ivs, r.get("iv"))
-                                    elif ivs:
-                                        r["iv_percentile"] = _pct_rank(ivs, r.get("iv"))
-                                    if ois:
-                                        r["oi_percentile"] = _pct_rank(ois, r.get("oi"))
-                                    if vols:
-                                        r["vol_percentile"] = _pct_rank(vols, r.get("volume"))
-                                    # ratio proxy
-                                    try:
-                                        if r.get("oi"):
-                                            r["vol_oi_ratio"] = (float(r.get("volume") or 0.0) / float(r.get("oi") or 1.0))
-                                    except Exception:
-                                        pass
-                                    ta, comps = tradeability_score(r, horizon=horizon), None
-                                except Exception:
-                                    pass
+                            try:
+                                # Add percentiles if possible
+                                bucket_ivs = []
+                                if surface_map is not None:
+                                    bucket_ivs = _pick_bucket_iv_list(surface_map, expiry, r.get("strike"), lp)
+                                if bucket_ivs:
+                                    r["iv_percentile"] = _pct_rank(bucket_ivs, r.get("iv"))
+                                elif ivs:
+                                    r["iv_percentile"] = _pct_rank(ivs, r.get("iv"))
+                                if ois:
+                                    r["oi_percentile"] = _pct_rank(ois, r.get("oi"))
+                                if vols:
+                                    r["vol_percentile"] = _pct_rank(vols, r.get("volume"))
+                                # ratio proxy
+                                if r.get("oi"):
+                                    r["vol_oi_ratio"] = (float(r.get("volume") or 0.0) / float(r.get("oi") or 1.0))
+                            except Exception:
+                                pass
                             try:
                                 _attach_display_fields(sym, r)
                             except Exception:
                                 pass
-                            r["tradeability"] = ta
-                            r["hit_probabilities"] = {
-                                "tp1": _p_touch(em_abs*0.25, em_abs) if em_abs else None,
-                                "tp2": _p_touch(em_abs*0.50, em_abs) if em_abs else None,
-                            }
-                            sc = _odte_composite(r)
-                            if sc is not None:
-                                r["odte_score"] = round(sc*100.0, 1)
+                            r["tradeability"] = None
+                            r["hit_probabilities"] = dict(hit_probs)
+                        try:
+                            _score_picks(picks, horizon, em_abs)
+                        except Exception:
+                            pass
 
                         # Short NBBO sampling to estimate spread stability and refresh quotes
                         async def _nbbo_sample(picks: List[Dict[str, Any]], samples: int = 2, interval: float = 0.35) -> Optional[Dict[str, Any]]:
@@ -1561,11 +1777,6 @@ async def _handle_snapshot(args: Dict[str, Any]) -> Dict[str, Any]:
                                     continue
                                 st = _spread_stability(bids[s], asks[s]) if bids.get(s) and asks.get(s) else None
                                 picks[i]["spread_stability"] = st
-                                if tradeability_score:
-                                    try:
-                                        picks[i]["tradeability"] = tradeability_score(picks[i], horizon=horizon)
-                                    except Exception:
-                                        pass
                                 bid_vals = bids.get(s) or []
                                 ask_vals = asks.get(s) or []
                                 mid_vals = mids.get(s) or []
@@ -1651,10 +1862,15 @@ async def _handle_snapshot(args: Dict[str, Any]) -> Dict[str, Any]:
                                         summary["dominant_bias"] = dominant_bias[0]
                                 except Exception:
                                     pass
+                            # Re-score sampled picks with refreshed quotes/stability
+                            try:
+                                _score_picks(picks, horizon, em_abs)
+                            except Exception:
+                                pass
                             return summary
 
                         # Limit sampling scope to avoid latency explosion
-                        if picks and _market_is_open_now():
+                        if picks and "nbbo" in stages and _mcal.is_open() and _has_time(f"{sym}.nbbo", 2.0):
                             try:
                                 sample_n = min(len(picks), max(1, min(3, int(topK) if topK else 3)))
                                 nbbo_snapshot = await _nbbo_sample(picks[:sample_n], samples=2, interval=0.35)
@@ -1685,38 +1901,15 @@ async def _handle_snapshot(args: Dict[str, Any]) -> Dict[str, Any]:
                     from importlib import import_module as _im2
                     tc_mod = _im2("app.services.providers.tradier_chain")
                     tc_chain = getattr(tc_mod, "options_chain", None)
-                    tc_exps = getattr(tc_mod, "expirations", None)
                     if callable(tc_chain):
-                        # Resolve a concrete expiry within the horizon DTE window
+                        # Resolve a concrete expiry within the horizon DTE window (day-cached list)
                         chosen_exp = expiry
-                        if callable(tc_exps):
-                            try:
-                                all_exps = await _maybe_await(tc_exps(sym))
-                            except Exception:
-                                all_exps = []
-                            if all_exps:
-                                from datetime import date as _date
-                                today = _date.today()
-                                def _dte(iso: str) -> Optional[int]:
-                                    try:
-                                        return max(0, (_date.fromisoformat(str(iso)) - today).days)
-                                    except Exception:
-                                        return None
-                                center = (lo_dte + hi_dte) / 2.0
-                                cands = []
-                                for e in all_exps:
-                                    d = _dte(e)
-                                    if d is not None and lo_dte <= d <= hi_dte:
-                                        cands.append((abs(d - center), e))
-                                if not cands:
-                                    lo2, hi2 = int(lo_dte*0.8), int(hi_dte*1.2)
-                                    for e in all_exps:
-                                        d = _dte(e)
-                                        if d is not None and lo2 <= d <= hi2:
-                                            cands.append((abs(d - center), e))
-                                if cands:
-                                    cands.sort(key=lambda x: x[0])
-                                    chosen_exp = cands[0][1]
+                        try:
+                            all_exps = await _exps.get_expirations(sym)
+                        except Exception:
+                            all_exps = []
+                        if all_exps:
+                            chosen_exp = _exps.pick_in_dte_window(all_exps, lo_dte, hi_dte) or expiry
                         # Fetch chain for the chosen expiry
                         trows = await _maybe_await(tc_chain(sym, expiry=chosen_exp, greeks=greeks))
                         if trows and lp is not None:
@@ -1757,10 +1950,17 @@ async def _handle_snapshot(args: Dict[str, Any]) -> Dict[str, Any]:
                                 return _pct_rank_surface(vals, x)
                             except Exception:
                                 return None
-                        cached_em = _em_cache_get(sym, expiry, horizon, lp)
-                        if cached_em:
-                            em_abs, em_rel = cached_em
-                        else:
+                        horizon_hours = 2.0 if horizon == "scalp" else 6.5 if horizon == "intraday" else None
+                        try:
+                            term = update_em_term(sym, trows, lp) if trows else get_em_term(sym, lp)
+                        except Exception:
+                            term = None
+                        # Term lookups are already scaled to the holding horizon
+                        em_abs, em_rel = _em_from_term(term, chosen_exp, lo_dte, hi_dte, horizon_hours)
+                        if term:
+                            ctx.setdefault("em_term", term.as_dict())
+                        em_from_term = bool(em_abs)
+                        if not em_abs:
                             em_abs, em_rel = _simple_em_from_straddle(lp, picks)
                             if not em_abs and poly:
                                 try:
@@ -1770,9 +1970,7 @@ async def _handle_snapshot(args: Dict[str, Any]) -> Dict[str, Any]:
                                 if atr:
                                     em_abs = atr
                                     em_rel = (atr/float(lp)) if lp else None
-                            if em_abs:
-                                _em_cache_put(sym, expiry, horizon, lp, em_abs, em_rel)
-                        if em_abs:
+                        if em_abs and horizon_hours and not em_from_term:
                             # Apply same horizon scaling to fallback EM
                             try:
                                 from datetime import date
@@ -1780,8 +1978,7 @@ async def _handle_snapshot(args: Dict[str, Any]) -> Dict[str, Any]:
                                 today = date.today()
                                 days_to_exp = max(0.25, (exp_d - today).days or 0.25)
                                 hours_to_exp = max(1.0, days_to_exp * 6.5)
-                                horizon_hours = 2.0 if horizon == "scalp" else 6.5 if horizon == "intraday" else None
-                                if horizon_hours and hours_to_exp > 0:
+                                if hours_to_exp > 0:
                                     scale = (horizon_hours / hours_to_exp) ** 0.5
                                     em_abs = em_abs * scale
                                     em_rel = em_abs / lp if lp else em_rel
@@ -1801,28 +1998,18 @@ async def _handle_snapshot(args: Dict[str, Any]) -> Dict[str, Any]:
                                         r["vol_oi_ratio"] = (float(r.get("volume") or 0.0) / float(r.get("oi") or 1.0))
                                 except Exception:
                                     pass
-                                ta = None
-                                if tradeability_score:
-                                    try:
-                                        ta = tradeability_score(r, horizon=horizon)
-                                    except Exception:
-                                        pass
+                                r["tradeability"] = None
+                            try:
+                                _score_picks(picks, horizon, em_abs)
+                            except Exception:
+                                pass
+                            hit_probs = _hit_probs(em_abs)
+                            for r in picks:
                                 try:
                                     _attach_display_fields(sym, r)
                                 except Exception:
                                     pass
-                                r["tradeability"] = ta
-                                r["hit_probabilities"] = {
-                                    "tp1": _p_touch(em_abs*0.25, em_abs) if em_abs else None,
-                                    "tp2": _p_touch(em_abs*0.50, em_abs) if em_abs else None,
-                                }
-                                if expected_value_intraday:
-                                    try:
-                                        ev, bd = expected_value_intraday(r, lp, em_abs, horizon=horizon)
-                                        r["ev"] = {"dollars": ev, "pct": (ev/(max(1e-6, ((r.get('bid') or 0)+(r.get('ask') or 0))/2.0)) if (r.get('bid') is not None and r.get('ask') is not None) else None)}
-                                        r["ev_detail"] = bd
-                                    except Exception:
-                                        pass
+                                r["hit_probabilities"] = dict(hit_probs)
                                 # Attach chart URL as well (fallback path)
                                 try:
                                     url = _chart_url(
@@ -1842,7 +2029,7 @@ async def _handle_snapshot(args: Dict[str, Any]) -> Dict[str, Any]:
                                 except Exception:
                                     pass
                                 # NBBO sampling on fallback too
-                                if picks and _market_is_open_now():
+                                if picks and "nbbo" in stages and _mcal.is_open() and _has_time(f"{sym}.nbbo", 2.0):
                                     try:
                                         sample_n = min(len(picks), max(1, min(3, int(topK) if topK else 3)))
                                         nbbo_snapshot = await _nbbo_sample(picks[:sample_n], samples=2, interval=0.35)
@@ -1943,20 +2130,102 @@ async def _handle_snapshot(args: Dict[str, Any]) -> Dict[str, Any]:
             out.append(strat)
         return out
 
-    for sym in symbols:
+    async def _capped(coro):
+        async with _SNAPSHOT_SEM:
+            return await coro
+
+    async def intraday_metrics(sym: str) -> Optional[Dict[str, Any]]:
+        # Intraday metrics (VWAP, sigma, RVOL)
+        intr: Dict[str, Any] = {}
+        try:
+            mins = await poly.minute_bars_today(sym)
+            ind = bar_stream(f"{sym.upper()}:1m", mins).values()
+            vwap, sig_tp = ind.get("vwap"), ind.get("sigma_tp")
+            rvol5 = rvol_5min(mins)
+            if vwap is not None:
+                intr["vwap"] = vwap
+            if sig_tp is not None:
+                intr["sigma_tp"] = sig_tp
+            if rvol5 is not None:
+                intr["rvol5"] = rvol5
+        except Exception:
+            return None
+        return intr
+
+    async def levels_for(sym: str) -> Optional[Dict[str, Any]]:
+        try:
+            lpayload = await market_compute_levels(poly, sym)
+        except Exception:
+            return None
+        return lpayload if lpayload and lpayload.get("ok") else None
+
+    async def internals() -> Optional[Dict[str, Any]]:
+        try:
+            return await _market_internals_summary(poly)
+        except Exception:
+            return None
+
+    async def premarket_feature(sym: str) -> Optional[Dict[str, Any]]:
+        # Premarket webinar context (if a Feature row exists for today)
+        try:
+            async with SessionLocal() as s:
+                # Prefer per-symbol feature, then wildcard "*"
+                stmt = (
+                    select(Feature)
+                    .where(Feature.horizon == "premarket")
+                    .where(Feature.symbol.in_([sym, "*"]))
+                    .order_by(desc(Feature.created_at))
+                    .limit(1)
+                )
+                res = await s.execute(stmt)
+                feat = res.scalars().first()
+                if feat and isinstance(feat.payload, dict):
+                    return feat.payload
+        except Exception:
+            pass
+        return None
+
+    async def _done(value: Any = None) -> Any:
+        return value
+
+    # Market internals are symbol-independent: one shared fetch per snapshot
+    # Every stage is bounded by the request deadline; a stage that misses it is left out
+    # (and reported) while the rest of the snapshot is still returned.
+    def _stage(coro, label: str, default: Any = None):
+        return _within(_capped(coro), label, default, reserve=0.25)
+
+    internals_task = asyncio.ensure_future(_stage(internals(), "internals")) if (poly and symbols and "internals" in stages) else None
+
+    async def build_symbol(sym: str) -> Dict[str, Any]:
+        # Stage graph: price -> options; intraday bars, levels and premarket run alongside
+        price_task = asyncio.ensure_future(_stage(last_price(sym), f"{sym}.price") if "price" in stages else _done())
+
+        async def options_stage():
+            if "chain" not in stages:
+                await price_task
+                return [], None, None, {}
+            lp = await price_task
+            return await _stage(options_top(sym, lp), f"{sym}.options", ([], None, None, {}))
+
+        lp, (picks, em_abs, em_rel, opt_ctx), intraday, levels_payload, premarket, market_internals_cache = await asyncio.gather(
+            price_task,
+            options_stage(),
+            _stage(intraday_metrics(sym), f"{sym}.intraday") if (poly and "intraday" in stages) else _done(),
+            _stage(levels_for(sym), f"{sym}.levels") if (poly and "levels" in stages) else _done(),
+            _stage(premarket_feature(sym), f"{sym}.premarket") if "premarket" in stages else _done(),
+            internals_task if internals_task is not None else _done(),
+        )
+
         out: Dict[str, Any] = {}
-        lp = await last_price(sym)
         if lp is not None:
             out.setdefault("price", {})["last"] = lp
 
-        levels_payload: Optional[Dict[str, Any]] = None
-        key_levels_data: Optional[Dict[str, Any]] = None
-        fib_data: Optional[Dict[str, Any]] = None
-        pivots_data: Optional[Dict[str, Any]] = None
-        prev_day_data: Optional[Dict[str, Any]] = None
-        levels_session: Optional[str] = None
+        key_levels_data = (levels_payload or {}).get("key_levels")
+        fib_data = (levels_payload or {}).get("fibonacci")
+        pivots_data = (levels_payload or {}).get("pivots")
+        prev_day_data = (levels_payload or {}).get("prev_day")
+        levels_session = (levels_payload or {}).get("session_date_utc")
 
-        picks, em_abs, em_rel, opt_ctx = await options_top(sym, lp)
         if picks:
             out.setdefault("options", {})["top"] = picks
             # 0DTE strategies for scalp horizon (A+ only)
@@ -1987,35 +2256,8 @@ async def _handle_snapshot(args: Dict[str, Any]) -> Dict[str, Any]:
             out.setdefault("context", {})["expected_move"] = {"abs": em_abs, "rel": em_rel}
         if opt_ctx:
             out.setdefault("context", {}).update(opt_ctx)
-
-        if poly:
-            try:
-                # Intraday metrics (VWAP, sigma, RVOL)
-                try:
-                    mins = await poly.minute_bars_today(sym)
-                    vwap, sig_tp = _vwap_sig(mins)
-                    rvol5 = _rvol5(mins)
-                    out.setdefault("context", {}).setdefault("intraday", {})
-                    intr = out["context"]["intraday"]
-                    if vwap is not None:
-                        intr["vwap"] = vwap
-                    if sig_tp is not None:
-                        intr["sigma_tp"] = sig_tp
-                    if rvol5 is not None:
-                        intr["rvol5"] = rvol5
-                except Exception:
-                    pass
-                lpayload = await market_compute_levels(poly, sym)
-                if lpayload and lpayload.get("ok"):
-                    levels_payload = lpayload
-                    key_levels_data = lpayload.get("key_levels")
-                    fib_data = lpayload.get("fibonacci")
-                    pivots_data = lpayload.get("pivots")
-                    prev_day_data = lpayload.get("prev_day")
-                    levels_session = lpayload.get("session_date_utc")
-                    levels_source = lpayload.get("levels_source")
-            except Exception:
-                levels_payload = None
+        if intraday is not None:
+            out.setdefault("context", {})["intraday"] = intraday
 
         ctx_ref = out.setdefault("context", {})
         if key_levels_data:
@@ -2028,12 +2270,6 @@ async def _handle_snapshot(args: Dict[str, Any]) -> Dict[str, Any]:
             ctx_ref["prev_day_levels"] = prev_day_data
         if levels_session:
             ctx_ref["levels_session_utc"] = levels_session
-        if poly:
-            try:
-                if market_internals_cache is None:
-                    market_internals_cache = await _market_internals_summary(poly)
-            except Exception:
-                pass
         if market_internals_cache:
             try:
                 ctx_ref["market_internals"] = dict(market_internals_cache)
@@ -2048,23 +2284,8 @@ async def _handle_snapshot(args: Dict[str, Any]) -> Dict[str, Any]:
         except Exception:
             pass
 
-        # Attach premarket webinar context (if a Feature row exists for today)
-        try:
-            async with SessionLocal() as s:
-                # Prefer per-symbol feature, then wildcard "*"
-                stmt = (
-                    select(Feature)
-                    .where(Feature.horizon == "premarket")
-                    .where(Feature.symbol.in_([sym, "*"]))
-                    .order_by(desc(Feature.created_at))
-                    .limit(1)
-                )
-                res = await s.execute(stmt)
-                feat = res.scalars().first()
-                if feat and isinstance(feat.payload, dict):
-                    ctx_ref["premarket"] = feat.payload
-        except Exception:
-            pass
+        if premarket:
+            ctx_ref["premarket"] = premarket
         # Phase 5: simple risk flags
         picks_local = (out.get("options") or {}).get("top") or []
         liq_trend = (out.get("context") or {}).get("liquidity_trend")
@@ -2080,7 +2301,14 @@ async def _handle_snapshot(args: Dict[str, Any]) -> Dict[str, Any]:
                 out["levels"] = levels_obj
             else:
                 out.setdefault("levels", {})
+        return out
 
-        snapshot["symbols"][sym] = out
+    # Symbols run concurrently; _SNAPSHOT_SEM caps in-flight provider stages process-wide
+    outs = await asyncio.gather(*[build_symbol(sym) for sym in symbols])
+    for sym, out in zip(symbols, outs):
+        snapshot["symbols"][sym] = out if fields is None else _project(out, fields)
+    if fields is not None:
+        snapshot["fields"] = fields
+        snapshot["skipped"] = [st for st in SNAPSHOT_STAGES if st not in stages]
 
     return {"ok": True, "snapshot": snapshot, "errors": errs}
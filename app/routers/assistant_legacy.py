@@ -11,6 +11,7 @@ from typing import Any, Dict, List, Optional
 from datetime import datetime, timedelta
 import re as _re
 from app.utils.cache import memo
+from app.utils.topk import top_k
 
 # Indicators your code already uses (adjust names only if your services module differs)
 from app.services.indicators import (ema, sma, rsi, macd, atr14, session_vwap_and_sigma, pivots_classic, rvol_5min)
@@ -196,7 +197,7 @@ def filter_and_rank_options(rows: List[Dict[str, Any]], expiry: str, horizon: st
             li = min(1.0, (oi/1000.0 + vol/5000.0))
             ivp= 1.0 - min(1.0, abs(iv-0.25)/0.40)
             return dc*0.45 + st*0.25 + li*0.20 + ivp*0.10
-        ranked = sorted(items, key=score, reverse=True)[:topK]
+        ranked = top_k(items, topK, key=score, reverse=True)
         return [{
             "symbol": r["symbol"], "type": r["type"], "strike": r["strike"], "expiry": r["expiry"],
             "bid": r.get("bid"), "ask": r.get("ask"), "last": r.get("last"),
@@ -26,6 +26,10 @@ _INTERVAL_ALIASES = {
     "15m": "15m",
     "15min": "15m",
     "15minute": "15m",
+    "60": "1h",
+    "60m": "1h",
+    "1h": "1h",
+    "hour": "1h",
     "d": "1d",
     "1d": "1d",
     "day": "1d",
@@ -33,11 +37,14 @@ _INTERVAL_ALIASES = {
 }
 
 
+# Intraday intervals are resampled server-side (/api/v1/market/bars) on
+# wall-clock buckets, so the page never regroups bars by count.
 _INTERVAL_CONFIG = {
-    "1m": {"fetch": "1m", "group": 1, "default_lookback": 390},
-    "5m": {"fetch": "5m", "group": 1, "default_lookback": 120},
-    "15m": {"fetch": "5m", "group": 3, "default_lookback": 120},
-    "1d": {"fetch": "1d", "group": 1, "default_lookback": 180},
+    "1m": {"fetch": "1m", "default_lookback": 390},
+    "5m": {"fetch": "5m", "default_lookback": 120},
+    "15m": {"fetch": "15m", "default_lookback": 120},
+    "1h": {"fetch": "1h", "default_lookback": 120},
+    "1d": {"fetch": "1d", "default_lookback": 180},
 }
 
 
@@ -47,9 +54,9 @@ def _normalize_interval(value: Optional[str], *, default: str) -> str:
     return normalized if normalized in _INTERVAL_CONFIG else default
 
 
-def _interval_prefs(interval: str) -> Tuple[str, int, int]:
+def _interval_prefs(interval: str) -> Tuple[str, int]:
     cfg = _INTERVAL_CONFIG.get(interval, _INTERVAL_CONFIG["1m"])
-    return cfg["fetch"], cfg["group"], cfg["default_lookback"]
+    return cfg["fetch"], cfg["default_lookback"]
 
 
 def _tv_interval(normalized: str) -> str:
@@ -57,6 +64,7 @@ def _tv_interval(normalized: str) -> str:
         "1m": "1",
         "5m": "5",
         "15m": "15",
+        "1h": "60",
         "1d": "D",
     }
     return mapping.get(normalized, "15")
@@ -216,7 +224,7 @@ async def chart_proposal(
     height = max(360, min(1080, int(height)))
 
     interval_norm = _normalize_interval(interval, default="1m")
-    fetch_interval, group_size, lookback_default = _interval_prefs(interval_norm)
+    fetch_interval, lookback_default = _interval_prefs(interval_norm)
     try:
         lookback_int = int(lookback)
     except Exception:
@@ -225,7 +233,7 @@ async def chart_proposal(
         lookback_int = lookback_default
     lookback_int = min(max(lookback_int, 30), 5000)
 
-    fetch_lookback = min(max(lookback_int * max(1, group_size), 30), 5000)
+    fetch_lookback = lookback_int
 
     entry_val, sl_val, tp1_val, tp2_val = _normalize_levels(entry, sl, tp1, tp2, dir_norm, em_abs)
 
@@ -384,53 +392,18 @@ async def chart_proposal(
         return [];
       }
       let bars = await fetchBars('${FETCH_INTERVAL}');
-      let groupSize = ${GROUP_SIZE};
       if (!bars.length && '${FETCH_INTERVAL}' === '1m') {
         bars = await fetchBars('5m');
-        groupSize = ${GROUP_SIZE};
       }
       if (!bars.length && '${FETCH_INTERVAL}' !== '1d') {
         bars = await fetchBars('1d', '${LOOKBACK}');
-        groupSize = 1;
       }
       if (!bars.length) {
         el.innerHTML = '<div style="color:${TEXT};padding:16px">No data available for ${SYM} (${INTERVAL}). Try a different timeframe or check market hours.</div>';
         return;
       }
 
-      function aggregateBars(raw, group) {
-        if (!Array.isArray(raw) || group <= 1) return raw;
-        const out = [];
-        let bucket = null;
-        let count = 0;
-        for (const b of raw) {
-          if (bucket === null) {
-            bucket = { ...b };
-            bucket.h = b.h;
-            bucket.l = b.l;
-            bucket.v = b.v || 0;
-            count = 1;
-          } else {
-            bucket.h = Math.max(bucket.h, b.h);
-            bucket.l = Math.min(bucket.l, b.l);
-            bucket.c = b.c;
-            bucket.v = (bucket.v || 0) + (b.v || 0);
-            bucket.t = b.t;
-            count += 1;
-          }
-          if (count === group) {
-            out.push({ ...bucket });
-            bucket = null;
-            count = 0;
-          }
-        }
-        if (bucket) {
-          out.push({ ...bucket });
-        }
-        return out;
-      }
-
-      const normalizedBars = aggregateBars(bars, groupSize);
+      const normalizedBars = bars;
       const data = normalizedBars.map(b => ({ time: Math.floor(b.t/1000), open: b.o, high: b.h, low: b.l, close: b.c }));
       candleSeries.setData(data);
       // Fit content to visible range for readability
@@ -664,7 +637,6 @@ async def chart_proposal(
         'LOOKBACK': str(lookback_int),
         'FETCH_INTERVAL': fetch_interval_display,
         'FETCH_LOOKBACK': str(fetch_lookback),
-        'GROUP_SIZE': str(max(1, group_size)),
         'OVERLAYS': overlays,
         'THEME': theme_key,
         'DIR': dir_norm,
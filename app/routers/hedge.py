@@ -11,6 +11,7 @@ from importlib import import_module as _im
 from app.services.iv_surface import get_iv_surface
 from app.engine.bs import greeks as bs_greeks
 from app.utils.occ import build_occ
+from app.services.admission import admitted
 
 router = APIRouter(prefix="/api/v1/assistant", tags=["assistant"])
 
@@ -115,6 +116,7 @@ def _approx_iv_for_position(surface_map: Dict[str, Any], expiry: Optional[str],
 
 
 @router.post("/hedge")
+@admitted("assistant.hedge")
 async def hedge_plan(req: HedgeRequest = Body(...)) -> Dict[str, Any]:
     # Group positions by underlying symbol
     groups: Dict[str, List[Position]] = {}
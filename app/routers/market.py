@@ -6,8 +6,9 @@ from typing import Any, Dict, List, Optional
 from fastapi import APIRouter, Query
 
 from importlib import import_module as _im
-from app.services.indicators import session_vwap_and_sigma, rvol_5min
-from app.engine.regime import analyze as regime_analyze
+from app.services.indicators_batch import universe_indicators
+from app.engine.regime import RegimeTracker
+from app.utils.disconnect import cancel_on_disconnect
 
 router = APIRouter(prefix="/api/v1/market", tags=["market"])
 
@@ -40,24 +41,47 @@ async def _daily_change(poly, sym: str) -> Optional[float]:
     return None
 
 
-async def _intraday_metrics(poly, sym: str) -> Dict[str, Any]:
-    out: Dict[str, Any] = {}
+# Per-symbol regime trackers: each overview only folds in bars newer than the last one
+_REGIMES: Dict[str, RegimeTracker] = {}
+
+
+def _regime(sym: str, mins: List[Dict[str, Any]]) -> Dict[str, Any]:
+    tr = _REGIMES.get(sym)
+    if tr is None:
+        tr = _REGIMES[sym] = RegimeTracker()
+    return tr.feed(mins).result()
+
+
+async def _minutes(poly, sym: str) -> List[Dict[str, Any]]:
+    try:
+        return await poly.minute_bars_today(sym) or []
+    except Exception:
+        return []
+
+
+def _intraday_metrics(series: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+    """VWAP/sigma/RVOL for every symbol in one batch call, plus per-symbol regime."""
+    out: Dict[str, Dict[str, Any]] = {s: {} for s in series}
     try:
-        mins = await poly.minute_bars_today(sym)
-        vwap, sig = session_vwap_and_sigma(mins)
-        out["vwap"] = vwap
-        out["sigma_tp"] = sig
-        out["rvol5"] = rvol_5min(mins)
+        ind = universe_indicators(series)
+    except Exception:
+        ind = {}
+    for sym, mins in series.items():
+        row = ind.get(sym) or {}
+        d = out[sym]
+        if mins:
+            d["vwap"] = row.get("vwap")
+            d["sigma_tp"] = row.get("sigma_tp")
+            d["rvol5"] = row.get("rvol5")
         try:
-            out["regime"] = regime_analyze(mins)
+            d["regime"] = _regime(sym, mins)
         except Exception:
             pass
-    except Exception:
-        pass
     return out
 
 
 @router.get("/overview")
+@cancel_on_disconnect("market.overview")
 async def market_overview(
     indices: str = Query("SPY,QQQ"),
     sectors: str = Query("XLK,XLV,XLF,XLE,XLY,XLP,XLI,XLB,XLRE,XLU,XLC"),
@@ -74,25 +98,23 @@ async def market_overview(
     out_sec: Dict[str, Any] = {}
 
     async def gather_for(sym: str) -> Dict[str, Any]:
-        last, chg, intr = await asyncio.gather(_last(poly, sym), _daily_change(poly, sym), _intraday_metrics(poly, sym))
-        d: Dict[str, Any] = {"last": last, "change_pct": chg}
-        d.update({"intraday": intr})
-        return d
-
-    # Gather concurrently
-    idx_results = await asyncio.gather(*[gather_for(s) for s in idx_syms], return_exceptions=True)
-    for s, r in zip(idx_syms, idx_results):
-        if isinstance(r, Exception):
-            errors[s] = f"{type(r).__name__}: {r}"
-        else:
-            out_idx[s] = r
-
-    sec_results = await asyncio.gather(*[gather_for(s) for s in sec_syms], return_exceptions=True)
-    for s, r in zip(sec_syms, sec_results):
+        last, chg, mins = await asyncio.gather(_last(poly, sym), _daily_change(poly, sym), _minutes(poly, sym))
+        return {"last": last, "change_pct": chg, "_mins": mins}
+
+    # Gather concurrently; intraday metrics are then computed for the whole set at once
+    all_syms = list(dict.fromkeys(idx_syms + sec_syms))
+    results = await asyncio.gather(*[gather_for(s) for s in all_syms], return_exceptions=True)
+    fetched: Dict[str, Dict[str, Any]] = {}
+    for s, r in zip(all_syms, results):
         if isinstance(r, Exception):
             errors[s] = f"{type(r).__name__}: {r}"
         else:
-            out_sec[s] = r
+            fetched[s] = r
+    intraday = _intraday_metrics({s: d.pop("_mins") for s, d in fetched.items()})
+    for s, d in fetched.items():
+        d["intraday"] = intraday.get(s) or {}
+    out_idx.update({s: fetched[s] for s in idx_syms if s in fetched})
+    out_sec.update({s: fetched[s] for s in sec_syms if s in fetched})
 
     # Leaders by change pct (sectors)
     def _leaders(d: Dict[str, Any], top: int = 5):
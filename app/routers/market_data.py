@@ -1,13 +1,16 @@
 from __future__ import annotations
 
-from datetime import datetime, timedelta, timezone, time
-from typing import Dict, Any, List, Optional, Tuple
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional
 
 from fastapi import APIRouter, Query
 from importlib import import_module as _im
-from zoneinfo import ZoneInfo
 
 from app.services.indicators import pivots_classic, fibonacci_levels
+from app.services.resample import resample, INTERVALS
+from app.utils.bars import Bars, to_dicts
+from app.services.market_calendar import Session
+from app.utils.request_memo import request_memo
 
 router = APIRouter(prefix="/api/v1/market", tags=["market"])
 
@@ -21,28 +24,29 @@ except Exception:
 @router.get("/bars")
 async def bars(
     symbol: str,
-    interval: str = Query("1m", pattern="^(1m|5m|1d)$"),
+    interval: str = Query("1m", pattern="^(1m|5m|15m|30m|1h|4h|1d)$"),
     lookback: int = 390,
 ) -> Dict[str, Any]:
     if not PolygonMarket:
         return {"ok": False, "error": "Polygon provider unavailable"}
     sym = (symbol or "").upper()
     poly = PolygonMarket()
-    data: List[Dict[str, Any]] = []
+    data: Bars = Bars()
     try:
         if interval == "1m":
             data = await poly.minute_bars_today(sym)
             if not data:
-                prev_minutes, _ = await _previous_session_minutes(poly, sym)
-                if prev_minutes:
-                    data = prev_minutes
-        elif interval == "5m":
-            data = await poly.five_minute_bars_today(sym)
-            if not data:
-                try:
-                    data = await poly.five_minute_bars_prev_session(sym)
-                except AttributeError:
-                    data = []
+                data, _ = await poly.previous_session_minutes(sym)
+        elif interval in ("5m", "15m", "30m"):
+            # Wall-clock buckets from today's 1m bars, else the previous session's
+            minutes = await poly.minute_bars_today(sym)
+            if not minutes:
+                minutes, _ = await poly.previous_session_minutes(sym)
+            data = resample(minutes or [], interval)
+        elif interval in ("1h", "4h"):
+            width = INTERVALS[interval]
+            days = min(30, max(2, (lookback * width) // (16 * 60) + 2)) if lookback else 5
+            data = await poly.resampled_bars(sym, interval, lookback_days=days)
         else:
             # 1d
             data = await poly.daily_bars(sym, lookback=max(lookback, 30))
@@ -50,43 +54,25 @@ async def bars(
             data = data[-lookback:]
     except Exception as e:
         return {"ok": False, "error": f"{type(e).__name__}: {e}"}
-    return {"ok": True, "symbol": sym, "interval": interval, "bars": data}
-
-
-_EASTERN = ZoneInfo("America/New_York")
-_PREMARKET_START = time(hour=4, minute=0)
-_REGULAR_START = time(hour=9, minute=30)
-_REGULAR_END = time(hour=16, minute=0)
-
-
-async def _previous_session_minutes(poly, symbol: str, max_back: int = 7) -> Tuple[Optional[List[Dict[str, Any]]], Optional[datetime]]:
-    """Fetch minute bars for the most recent trading session (1-minute granularity)."""
-    day = datetime.now(timezone.utc).date() - timedelta(days=1)
-    for _ in range(max_back):
-        dt = datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
-        bars = await poly.minute_bars_for_day(symbol, dt)
-        if bars:
-            return bars, dt
-        day -= timedelta(days=1)
-    return None, None
+    return {"ok": True, "symbol": sym, "interval": interval, "bars": to_dicts(data)}
 
 
-def _session_extremes(minute_bars: List[Dict[str, Any]]) -> Dict[str, Optional[float]]:
+def _session_extremes(minute_bars: Bars, sess: Session) -> Dict[str, Optional[float]]:
     pre_high = pre_low = None
     reg_high = reg_low = None
     for bar in minute_bars:
         ts = bar.get("t")
         if ts is None:
             continue
-        dt = datetime.fromtimestamp(ts / 1000, tz=timezone.utc).astimezone(_EASTERN)
         price_high = bar.get("h")
         price_low = bar.get("l")
         if price_high is None or price_low is None:
             continue
-        if _PREMARKET_START <= dt.time() < _REGULAR_START:
+        ph = sess.phase(ts)
+        if ph == "pre":
             pre_high = price_high if pre_high is None else max(pre_high, price_high)
             pre_low = price_low if pre_low is None else min(pre_low, price_low)
-        elif _REGULAR_START <= dt.time() <= _REGULAR_END:
+        elif ph == "rth" or ts == sess.close:
             reg_high = price_high if reg_high is None else max(reg_high, price_high)
             reg_low = price_low if reg_low is None else min(reg_low, price_low)
     return {
@@ -97,6 +83,7 @@ def _session_extremes(minute_bars: List[Dict[str, Any]]) -> Dict[str, Optional[f
     }
 
 
+@request_memo(lambda poly, symbol: (symbol or "").upper())
 async def compute_levels(poly, symbol: str) -> Dict[str, Any]:
     sym = (symbol or "").upper()
     # Map index underlyings to ETF proxies for reliable intraday levels
@@ -115,15 +102,15 @@ async def compute_levels(poly, symbol: str) -> Dict[str, Any]:
     piv = pivots_classic(ohlc)
     fibs = fibonacci_levels(ohlc.get("h"), ohlc.get("l"))
 
-    minute_bars, session_day = await _previous_session_minutes(poly, level_sym)
+    minute_bars, sess = await poly.previous_session_minutes(level_sym)
     key_levels = {
         "prev_high": round(ohlc.get("h"), 2) if ohlc.get("h") is not None else None,
         "prev_low": round(ohlc.get("l"), 2) if ohlc.get("l") is not None else None,
         "prev_close": round(ohlc.get("c"), 2) if ohlc.get("c") is not None else None,
     }
 
-    if minute_bars:
-        extremes = _session_extremes(minute_bars)
+    if minute_bars and sess is not None:
+        extremes = _session_extremes(minute_bars, sess)
         key_levels.update(extremes)
     else:
         key_levels.update({
@@ -141,7 +128,7 @@ async def compute_levels(poly, symbol: str) -> Dict[str, Any]:
         "pivots": piv,
         "key_levels": key_levels,
         "fibonacci": fibs,
-        "session_date_utc": session_day.isoformat() if session_day else None,
+        "session_date_utc": datetime(sess.day.year, sess.day.month, sess.day.day, tzinfo=timezone.utc).isoformat() if sess else None,
     }
 
 
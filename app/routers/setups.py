@@ -1,14 +1,25 @@
 from __future__ import annotations
 
+import json
+
 from fastapi import APIRouter, Query
-from typing import Any, Dict
+from fastapi.responses import StreamingResponse
+from typing import Any, AsyncIterator, Dict, List, Optional
 
-from app.services.setup_scanner import scan_top_setups
+from app.services.setup_scanner import get_setups, stream_setups
+from app.utils.disconnect import cancel_on_disconnect
 
 router = APIRouter(prefix="/api/v1/market", tags=["market"], include_in_schema=False)
 
 
+def _symbols(symbols: Optional[str]) -> Optional[List[str]]:
+    if not symbols:
+        return None
+    return [s.strip().upper() for s in symbols.split(',') if s.strip()]
+
+
 @router.get("/setups")
+@cancel_on_disconnect("market.setups")
 async def market_setups(
     limit: int = Query(10, ge=3, le=30),
     include_options: bool = Query(True),
@@ -16,14 +27,65 @@ async def market_setups(
     strict: bool = Query(True),
     min_confidence: int = Query(70, ge=0, le=100),
 ) -> Dict[str, Any]:
-    sym_list = None
-    if symbols:
-        sym_list = [s.strip().upper() for s in symbols.split(',') if s.strip()]
-    setups = await scan_top_setups(
+    res = await get_setups(
         limit=limit,
         include_options=include_options,
-        symbols=sym_list,
+        symbols=_symbols(symbols),
         strict=strict,
         min_confidence=min_confidence,
     )
-    return {"ok": True, "count": len(setups), "setups": setups}
+    setups = res["setups"]
+    out = {
+        "ok": True,
+        "count": len(setups),
+        "setups": setups,
+        "as_of": res["as_of"],
+        "stale": res["stale"],
+        "timed_out": res["timed_out"],
+        "options_timed_out": res["options_timed_out"],
+    }
+    if res.get("shed"):
+        out["shed"] = True
+    return out
+
+
+@router.get("/setups/stream")
+async def market_setups_stream(
+    limit: int = Query(10, ge=3, le=30),
+    include_options: bool = Query(True),
+    symbols: str | None = Query(None, description="Comma-separated tickers"),
+    strict: bool = Query(True),
+    min_confidence: int = Query(70, ge=0, le=100),
+    format: str = Query("ndjson", pattern="^(ndjson|sse)$"),
+) -> StreamingResponse:
+    """Each setup as soon as it is scored ("setup" events), then a ranked "summary"."""
+    events = stream_setups(
+        limit=limit,
+        include_options=include_options,
+        symbols=_symbols(symbols),
+        strict=strict,
+        min_confidence=min_confidence,
+    )
+
+    # Pull the first event before responding: a shed scan with nothing cached raises
+    # Overloaded here and becomes a 503 instead of a broken stream
+    try:
+        first = await events.__anext__()
+    except StopAsyncIteration:
+        first = None
+
+    async def _all() -> AsyncIterator[Dict[str, Any]]:
+        if first is not None:
+            yield first
+        async for ev in events:
+            yield ev
+
+    async def _body() -> AsyncIterator[str]:
+        async for ev in _all():
+            if format == "sse":
+                yield f"event: {ev['event']}\ndata: {json.dumps(ev['data'], default=str)}\n\n"
+            else:
+                yield json.dumps(ev, default=str) + "\n"
+
+    media = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(_body(), media_type=media, headers={"Cache-Control": "no-cache"})
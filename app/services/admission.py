@@ -0,0 +1,163 @@
+"""
+Admission control for expensive endpoints.
+
+Each gate allows `limit` concurrent executions plus a bounded queue. A request
+that would overflow the queue, or that waits longer than the queue-time SLO, is
+shed at once with a 503 (Retry-After) instead of piling up behind the shared
+rate limiter until every request times out together. Callers that hold a cached
+answer can catch Overloaded and serve that instead.
+
+Gates are re-entrant within one request (exec -> snapshot -> ...), so nested
+calls never wait on a slot their own request already holds.
+
+Configure per gate with ADMISSION_<NAME>="limit,queue,max_wait_s", e.g.
+ADMISSION_DATA_SNAPSHOT="4,8,2".
+"""
+from __future__ import annotations
+
+import asyncio
+import functools
+import inspect
+import os
+import time
+import typing
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Dict, FrozenSet, Tuple
+
+from fastapi import HTTPException
+
+from app.services.metrics import (
+    admission_in_flight,
+    admission_queue_depth,
+    admission_queue_seconds,
+    admission_shed_total,
+)
+from app.utils.deadline import remaining
+
+# name -> (concurrent executions, queue slots, max queue wait in seconds)
+_DEFAULTS: Dict[str, Tuple[int, int, float]] = {
+    "data.snapshot": (4, 8, 2.0),
+    "market.setups": (2, 8, 3.0),
+    "assistant.hedge": (2, 4, 2.0),
+}
+RETRY_AFTER_S = 2
+
+_HELD: ContextVar[FrozenSet[str]] = ContextVar("admission_held", default=frozenset())
+
+
+class Overloaded(HTTPException):
+    """503 raised when a gate sheds a request."""
+
+    def __init__(self, gate: str, reason: str):
+        self.gate, self.reason = gate, reason
+        super().__init__(
+            status_code=503,
+            detail={"ok": False, "error": {"code": "OVERLOADED", "message": f"{gate} is saturated ({reason})", "endpoint": gate, "reason": reason}},
+            headers={"Retry-After": str(RETRY_AFTER_S)},
+        )
+
+
+class Gate:
+    def __init__(self, name: str, limit: int, queue: int, max_wait: float):
+        self.name, self.limit, self.queue, self.max_wait = name, max(1, limit), max(0, queue), max_wait
+        self._sem = asyncio.Semaphore(self.limit)
+        self.waiting = 0
+        self.active = 0
+
+    def _shed(self, reason: str) -> Overloaded:
+        admission_shed_total.labels(endpoint=self.name, reason=reason).inc()
+        return Overloaded(self.name, reason)
+
+    async def _acquire(self) -> None:
+        if not self._sem.locked():
+            await self._sem.acquire()
+            return
+        if self.waiting >= self.queue:
+            raise self._shed("queue_full")
+        self.waiting += 1
+        admission_queue_depth.labels(endpoint=self.name).set(self.waiting)
+        started = time.monotonic()
+        try:
+            # Queue no longer than the SLO, nor past the request's own deadline
+            left = remaining()
+            wait = self.max_wait if left is None else max(0.0, min(self.max_wait, left))
+            await asyncio.wait_for(self._sem.acquire(), wait)
+        except asyncio.TimeoutError:
+            raise self._shed("queue_timeout") from None
+        finally:
+            self.waiting -= 1
+            admission_queue_depth.labels(endpoint=self.name).set(self.waiting)
+            admission_queue_seconds.labels(endpoint=self.name).observe(time.monotonic() - started)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        await self._acquire()
+        self.active += 1
+        admission_in_flight.labels(endpoint=self.name).set(self.active)
+        try:
+            yield
+        finally:
+            self.active -= 1
+            admission_in_flight.labels(endpoint=self.name).set(self.active)
+            self._sem.release()
+
+    def as_dict(self) -> Dict[str, object]:
+        return {"limit": self.limit, "queue": self.queue, "max_wait_s": self.max_wait, "active": self.active, "waiting": self.waiting}
+
+
+def _config(name: str) -> Tuple[int, int, float]:
+    limit, queue, wait = _DEFAULTS[name]
+    raw = os.getenv("ADMISSION_" + name.upper().replace(".", "_"), "")
+    parts = [p.strip() for p in raw.split(",")] if raw else []
+    try:
+        if len(parts) > 0 and parts[0]:
+            limit = int(parts[0])
+        if len(parts) > 1 and parts[1]:
+            queue = int(parts[1])
+        if len(parts) > 2 and parts[2]:
+            wait = float(parts[2])
+    except ValueError:
+        pass
+    return limit, queue, wait
+
+
+GATES: Dict[str, Gate] = {name: Gate(name, *_config(name)) for name in _DEFAULTS}
+
+
+@asynccontextmanager
+async def admit(name: str) -> AsyncIterator[None]:
+    """Hold a slot of gate `name` (no-op for ungated names and for nested calls)."""
+    gate = GATES.get(name)
+    held = _HELD.get()
+    if gate is None or name in held:
+        yield
+        return
+    async with gate.slot():
+        token = _HELD.set(held | {name})
+        try:
+            yield
+        finally:
+            _HELD.reset(token)
+
+
+def admitted(name: str):
+    """Decorator form of admit() for async handlers (keeps FastAPI's view of the signature)."""
+    def deco(fn):
+        @functools.wraps(fn)
+        async def wrap(*a, **kw):
+            async with admit(name):
+                return await fn(*a, **kw)
+
+        hints = typing.get_type_hints(fn)
+        sig = inspect.signature(fn)
+        wrap.__signature__ = sig.replace(
+            parameters=[p.replace(annotation=hints.get(p.name, p.annotation)) for p in sig.parameters.values()],
+            return_annotation=hints.get("return", sig.return_annotation),
+        )
+        return wrap
+    return deco
+
+
+def status() -> Dict[str, Dict[str, object]]:
+    return {name: gate.as_dict() for name, gate in GATES.items()}
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import time
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+from app.engine.options_scoring import EMPoint, EMTermStructure, em_term_structure
+
+# Per-underlying expected-move term structure built from chain snapshots:
+#   { "SPY": { "lp": <spot the points were priced at>, "term": <assembled or None>,
+#              "points": { "2025-01-17": {"t": <fresh>, "point": EMPoint} } } }
+# A snapshot only replaces the expiries it carries, so a single-expiry chain
+# (e.g. Tradier) refines the structure instead of wiping it.
+_CACHE: Dict[str, Dict[str, Any]] = {}
+
+_TTL = 120.0
+# Straddle-implied moves are priced at spot; drop them when spot drifts past this.
+_LP_DRIFT = 0.01
+
+def _key(symbol: str) -> str:
+    return (symbol or "").upper()
+
+def _drifted(prev: Optional[float], cur: Optional[float]) -> bool:
+    if prev is None or cur is None or cur <= 0:
+        return False
+    return abs(prev - cur) / cur > _LP_DRIFT
+
+def _prune(item: Dict[str, Any], ttl: float, now: float) -> None:
+    pts: Dict[str, Dict[str, Any]] = item["points"]
+    today = date.today().isoformat()
+    stale = [e for e, ent in pts.items() if (now - ent.get("t", 0)) > ttl or e[:10] < today]
+    for e in stale:
+        pts.pop(e, None)
+    if stale:
+        item["term"] = None
+
+def _term_of(item: Dict[str, Any]) -> EMTermStructure:
+    term = item.get("term")
+    if term is None:
+        pts: List[EMPoint] = [ent["point"] for ent in item["points"].values()]
+        pts.sort(key=lambda p: (p.hours, p.expiry))
+        term = item["term"] = EMTermStructure(last_price=item.get("lp"), points=pts)
+    return term
+
+def update_em_term(underlying: str, rows: List[Dict[str, Any]], last_price: Optional[float], ttl: float = _TTL) -> EMTermStructure:
+    """Price every expiry in `rows` in one pass and merge into the cached structure."""
+    now = time.time()
+    item = _CACHE.get(_key(underlying))
+    if item is None or _drifted(item.get("lp"), last_price):
+        item = _CACHE[_key(underlying)] = {"lp": last_price, "points": {}, "term": None}
+    fresh = em_term_structure(last_price, rows)
+    if fresh.points:
+        for p in fresh.points:
+            item["points"][p.expiry] = {"t": now, "point": p}
+        item["lp"] = last_price
+        item["term"] = None
+    _prune(item, ttl, now)
+    return _term_of(item)
+
+def get_em_term(underlying: str, last_price: Optional[float] = None, ttl: float = _TTL) -> Optional[EMTermStructure]:
+    """Cached term structure for `underlying`, or None if missing, stale, or spot moved."""
+    item = _CACHE.get(_key(underlying))
+    if not item:
+        return None
+    if _drifted(item.get("lp"), last_price):
+        _CACHE.pop(_key(underlying), None)
+        return None
+    _prune(item, ttl, time.time())
+    if not item["points"]:
+        return None
+    return _term_of(item)
@@ -0,0 +1,182 @@
+"""
+Per-underlying option expirations, cached for the trading day.
+
+Listed expirations change at most once a day, so each underlying is fetched
+from Tradier once per Eastern date (single-flight on a miss) and expiry
+selection runs locally against the cached list. A premarket warm-up loads
+the usual watchlist before the open.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+from datetime import date, datetime, time as dtime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.services import market_calendar as mcal
+from app.utils.request_memo import detached_task
+
+try:
+    from app.services.providers.tradier_chain import expirations as _fetch_expirations
+except Exception:  # pragma: no cover - optional provider
+    _fetch_expirations = None  # type: ignore
+
+# { "SPY": {"day": <Eastern date fetched>, "exps": ["2025-01-17", ...]} }
+_CACHE: Dict[str, Dict[str, Any]] = {}
+_INFLIGHT: Dict[str, "asyncio.Task"] = {}
+
+WARM_AT = dtime(8, 0)  # Eastern, premarket
+WARM_SYMBOLS = [
+    s.strip().upper()
+    for s in (os.getenv("EXPIRATIONS_WARM_SYMBOLS") or "SPY,QQQ,IWM,DIA,AAPL,MSFT,NVDA,AMZN,META,TSLA,GOOGL,AMD").split(",")
+    if s.strip()
+]
+
+
+def _key(symbol: str) -> str:
+    return (symbol or "").upper()
+
+
+def _live(exps: List[str], today: date) -> List[str]:
+    iso = today.isoformat()
+    return [e for e in exps if e[:10] >= iso]
+
+
+def cached_expirations(symbol: str) -> Optional[List[str]]:
+    """Today's cached list (no fetch), or None."""
+    ent = _CACHE.get(_key(symbol))
+    today = mcal.eastern_date()
+    if not ent or ent["day"] != today:
+        return None
+    return _live(ent["exps"], today)
+
+
+async def _load(key: str) -> List[str]:
+    try:
+        exps = sorted(str(e) for e in (await _fetch_expirations(key) or []))
+        if exps:
+            _CACHE[key] = {"day": mcal.eastern_date(), "exps": exps}
+        return exps
+    finally:
+        _INFLIGHT.pop(key, None)
+
+
+async def get_expirations(symbol: str) -> List[str]:
+    """Listed expirations (ISO dates, ascending, none in the past)."""
+    hit = cached_expirations(symbol)
+    if hit is not None:
+        return hit
+    if _fetch_expirations is None:
+        return []
+    key = _key(symbol)
+    task = _INFLIGHT.get(key)
+    if task is None or task.done():
+        task = _INFLIGHT[key] = detached_task(_load(key))
+    exps = await asyncio.shield(task)
+    return _live(exps, mcal.eastern_date())
+
+
+async def warm(symbols: Iterable[str]) -> None:
+    syms = list(dict.fromkeys(_key(s) for s in symbols if s))
+    await asyncio.gather(*[get_expirations(s) for s in syms], return_exceptions=True)
+
+
+# ---------- local selection ----------
+
+def _dte(e: str, today: date) -> Optional[int]:
+    try:
+        return (date.fromisoformat(e[:10]) - today).days
+    except Exception:
+        return None
+
+
+def pick_expiry(
+    exps: List[str],
+    min_days: int,
+    max_days: int,
+    prefer_month: Optional[str] = None,
+    today: Optional[date] = None,
+) -> Optional[str]:
+    """Expiry closest to the middle of [min_days, max_days] DTE (months starting
+    with `prefer_month` weigh closer); else the nearest one at or past min_days."""
+    today = today or date.today()
+    pref = (prefer_month or "").lower()[:3]
+    best = None
+    for e in exps:
+        days = _dte(e, today)
+        if days is None or not (min_days <= days <= max_days):
+            continue
+        weight = abs(days - (min_days + max_days) / 2.0)
+        if pref and date.fromisoformat(e[:10]).strftime('%b').lower().startswith(pref):
+            weight *= 0.6
+        if best is None or weight < best[0]:
+            best = (weight, e)
+    if best is not None:
+        return best[1]
+    for e in exps:
+        days = _dte(e, today)
+        if days is None or days < min_days:
+            continue
+        weight = abs(days - min_days)
+        if pref and date.fromisoformat(e[:10]).strftime('%b').lower().startswith(pref):
+            weight *= 0.7
+        if best is None or weight < best[0]:
+            best = (weight, e)
+    return best[1] if best else None
+
+
+def pick_in_dte_window(exps: List[str], lo_dte: int, hi_dte: int, today: Optional[date] = None) -> Optional[str]:
+    """Expiry nearest the window centre; widens the window by 20% each side if nothing fits."""
+    today = today or date.today()
+    center = (lo_dte + hi_dte) / 2.0
+    dtes = [(e, max(0, d)) for e in exps for d in [_dte(e, today)] if d is not None]
+    for lo, hi in ((lo_dte, hi_dte), (int(lo_dte * 0.8), int(hi_dte * 1.2))):
+        cands = [(abs(d - center), e) for e, d in dtes if lo <= d <= hi]
+        if cands:
+            return min(cands)[1]
+    return None
+
+
+def snap_to_listed(exps: List[str], target: str) -> str:
+    """First listed expiry on/after `target` (e.g. an auto-picked Friday that is a holiday)."""
+    for e in exps:
+        if e[:10] >= target[:10]:
+            return e
+    return target
+
+
+# ---------- premarket warm-up ----------
+
+def _next_warm(now: datetime) -> datetime:
+    d = mcal.eastern_date(now)
+    while True:
+        if mcal.is_trading_day(d):
+            at = datetime.combine(d, WARM_AT, tzinfo=mcal.EASTERN)
+            if at > now:
+                return at
+        d += timedelta(days=1)
+
+
+async def run_scheduler_on_startup() -> None:
+    """Warm WARM_SYMBOLS now and every trading day at 08:00 ET (plus anything cached
+    the day before). Controlled by ENABLE_EXPIRATIONS_WARM (default on when a Tradier
+    token is configured). Non-fatal on errors."""
+    has_token = os.getenv("TRADIER_ACCESS_TOKEN") or os.getenv("TRADIER_API_KEY")
+    flag = os.getenv("ENABLE_EXPIRATIONS_WARM", "1" if has_token else "0")
+    if not flag or flag == "0" or _fetch_expirations is None:
+        return
+
+    async def _loop():
+        await warm(WARM_SYMBOLS)
+        while True:
+            try:
+                now = datetime.now(mcal.EASTERN)
+                await asyncio.sleep(max(1.0, (_next_warm(now) - now).total_seconds()))
+                await warm(list(WARM_SYMBOLS) + list(_CACHE))
+            except Exception:
+                await asyncio.sleep(60)
+
+    try:
+        asyncio.create_task(_loop())
+    except Exception:
+        pass
@@ -2,15 +2,287 @@ from __future__ import annotations
 from typing import List, Dict, Any, Tuple, Optional
 import math
 from statistics import median
+from dataclasses import dataclass, field, asdict, replace
+
+# ---------- Streaming indicator state ----------
+# Each state object folds in one value/bar at a time in O(1) and reports the
+# same number as the batch function below. States are plain dataclasses so
+# they round-trip through to_dict()/from_dict() (e.g. into state_store).
+
+def _is_num(v: Any) -> bool:
+    return isinstance(v, (int, float))
+
+@dataclass
+class _State:
+    def to_dict(self) -> Dict[str, Any]:
+        return {"kind": type(self).__name__, **asdict(self)}
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]):
+        d = dict(d); d.pop("kind", None)
+        return cls(**d)
+
+    def copy(self):
+        return replace(self)
+
+@dataclass
+class EMAState(_State):
+    period: int
+    n: int = 0
+    e: Optional[float] = None
+
+    def update(self, v: Any) -> None:
+        if not _is_num(v):
+            return
+        k = 2/(self.period+1)
+        self.e = v if self.e is None else v*k + self.e*(1-k)
+        self.n += 1
+
+    @property
+    def value(self) -> Optional[float]:
+        if self.n < max(1, self.period) or self.e is None:
+            return None
+        return round(self.e, 4)
+
+@dataclass
+class RSIState(_State):
+    period: int = 14
+    n: int = 0                      # changes seen
+    prev: Optional[float] = None
+    avg_gain: float = 0.0           # running sums until `period` changes, Wilder averages after
+    avg_loss: float = 0.0
+
+    def update(self, v: Any) -> None:
+        if not _is_num(v):
+            return
+        if self.prev is None:
+            self.prev = v
+            return
+        ch = v - self.prev
+        self.prev = v
+        g, l = max(0.0, ch), max(0.0, -ch)
+        p = self.period
+        self.n += 1
+        if self.n <= p:
+            self.avg_gain += g; self.avg_loss += l
+            if self.n == p:
+                self.avg_gain /= p; self.avg_loss /= p
+        else:
+            self.avg_gain = (self.avg_gain*(p-1) + g) / p
+            self.avg_loss = (self.avg_loss*(p-1) + l) / p
+
+    @property
+    def value(self) -> Optional[float]:
+        if self.n < self.period:
+            return None
+        if self.avg_loss == 0: return 100.0
+        rs = self.avg_gain / self.avg_loss
+        return round(100 - (100 / (1 + rs)), 2)
+
+@dataclass
+class MACDState(_State):
+    fast: int = 12
+    slow: int = 26
+    signal_p: int = 9
+    n: int = 0
+    e_f: Optional[float] = None
+    e_s: Optional[float] = None
+    e_sig: Optional[float] = None
+
+    def update(self, v: Any) -> None:
+        if not _is_num(v):
+            return
+        if self.e_f is None:
+            self.e_f = self.e_s = v
+        kf = 2/(self.fast+1); ks = 2/(self.slow+1)
+        self.e_f = v*kf + self.e_f*(1-kf)
+        self.e_s = v*ks + self.e_s*(1-ks)
+        m = self.e_f - self.e_s
+        if self.e_sig is None:
+            self.e_sig = m
+        ks2 = 2/(self.signal_p+1)
+        self.e_sig = m*ks2 + self.e_sig*(1-ks2)
+        self.n += 1
+
+    @property
+    def value(self) -> Optional[Dict[str, float]]:
+        if self.n < max(self.fast, self.slow, self.signal_p) + 10:
+            return None
+        m = self.e_f - self.e_s
+        return {"macd": round(m, 4), "signal": round(self.e_sig, 4), "hist": round(m - self.e_sig, 4)}
+
+@dataclass
+class ATRState(_State):
+    period: int = 14
+    n: int = 0                      # true ranges seen
+    prev_c: Optional[float] = None
+    a: float = 0.0
+
+    def update(self, bar: Dict[str, Any]) -> None:
+        h, l, c = bar["h"], bar["l"], bar["c"]
+        if self.prev_c is None:
+            self.prev_c = c
+            return
+        tr = max(h-l, abs(h-self.prev_c), abs(l-self.prev_c))
+        self.prev_c = c
+        p = self.period
+        self.n += 1
+        if self.n <= p:
+            self.a += tr
+            if self.n == p:
+                self.a /= p
+        else:
+            self.a = (self.a*(p-1) + tr) / p
+
+    @property
+    def value(self) -> Optional[float]:
+        return round(self.a, 4) if self.n >= self.period else None
+
+@dataclass
+class VWAPState(_State):
+    """Session VWAP of typical price plus its sample sigma (Welford)."""
+    n: int = 0
+    pv: float = 0.0
+    vol: float = 0.0
+    mean: float = 0.0
+    m2: float = 0.0
+
+    def update(self, bar: Dict[str, Any]) -> None:
+        h = bar.get("h") or 0.0; l = bar.get("l") or 0.0; c = bar.get("c") or 0.0
+        v = bar.get("v") or 0.0
+        tp = (h + l + c) / 3.0
+        self.pv += tp*v; self.vol += v
+        self.n += 1
+        d = tp - self.mean
+        self.mean += d / self.n
+        self.m2 += d * (tp - self.mean)
+
+    @property
+    def value(self) -> Tuple[Optional[float], Optional[float]]:
+        if self.n == 0: return None, None
+        vwap = self.pv / self.vol if self.vol > 0 else self.mean
+        sig = math.sqrt(self.m2 / (self.n - 1)) if self.n >= 2 else None
+        return round(vwap, 4), (round(sig, 4) if sig is not None else None)
+
+_STATE_KINDS = {cls.__name__: cls for cls in (EMAState, RSIState, MACDState, ATRState, VWAPState)}
+
+def state_from_dict(d: Dict[str, Any]) -> _State:
+    return _STATE_KINDS[d["kind"]].from_dict(d)
+
+@dataclass
+class BarStream:
+    """
+    Incremental indicator set over one bar series (e.g. a symbol's 1m session).
+
+    feed() applies only bars newer than the last one seen. The newest bar is
+    kept as an uncommitted tail because providers revise the forming bar; reads
+    fold it into a copy of the committed state. A series that no longer starts
+    where it did (new session, different window) is replayed from scratch.
+    """
+    ema_periods: Tuple[int, ...] = (9, 20, 50)
+    rsi_period: int = 14
+    atr_period: int = 14
+    first_t: Any = None
+    last_t: Any = None
+    tail: Optional[Dict[str, Any]] = None
+    states: Dict[str, _State] = field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        if not self.states:
+            self.reset()
+
+    def reset(self) -> None:
+        self.first_t = self.last_t = None
+        self.tail = None
+        self.states = {f"ema{p}": EMAState(p) for p in self.ema_periods}
+        self.states.update({
+            "rsi": RSIState(self.rsi_period), "macd": MACDState(),
+            "atr": ATRState(self.atr_period), "vwap": VWAPState(),
+        })
+
+    def _apply(self, states: Dict[str, _State], bar: Dict[str, Any]) -> None:
+        c = bar.get("c")
+        for st in states.values():
+            if isinstance(st, (ATRState, VWAPState)):
+                if isinstance(st, ATRState) and not all(_is_num(bar.get(k)) for k in ("h", "l", "c")):
+                    continue
+                st.update(bar)
+            else:
+                st.update(c)
+
+    def update(self, bar: Dict[str, Any]) -> None:
+        t = bar.get("t")
+        if self.tail is not None and t is not None and t == self.tail.get("t"):
+            self.tail = bar           # revision of the forming bar
+            return
+        if self.tail is not None:
+            self._apply(self.states, self.tail)
+            self.last_t = self.tail.get("t")
+        if self.first_t is None:
+            self.first_t = t
+        self.tail = bar
+
+    def feed(self, bars: List[Dict[str, Any]]) -> "BarStream":
+        if not bars:
+            return self
+        if self.first_t is not None and bars[0].get("t") != self.first_t:
+            self.reset()
+        for b in bars:
+            t = b.get("t")
+            if self.last_t is not None and t is not None and t <= self.last_t:
+                continue
+            self.update(b)
+        if self.tail is not None:
+            self.tail = dict(self.tail)   # detach from the source series
+        return self
+
+    def values(self) -> Dict[str, Any]:
+        states = {k: st.copy() for k, st in self.states.items()}
+        if self.tail is not None:
+            self._apply(states, self.tail)
+        vwap, sig = states["vwap"].value
+        out: Dict[str, Any] = {k: st.value for k, st in states.items() if k not in ("vwap",)}
+        out.update({"vwap": vwap, "sigma_tp": sig})
+        return out
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "ema_periods": list(self.ema_periods), "rsi_period": self.rsi_period,
+            "atr_period": self.atr_period, "first_t": self.first_t, "last_t": self.last_t,
+            "tail": self.tail, "states": {k: st.to_dict() for k, st in self.states.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "BarStream":
+        return cls(
+            ema_periods=tuple(d.get("ema_periods") or (9, 20, 50)),
+            rsi_period=d.get("rsi_period", 14), atr_period=d.get("atr_period", 14),
+            first_t=d.get("first_t"), last_t=d.get("last_t"), tail=d.get("tail"),
+            states={k: state_from_dict(v) for k, v in (d.get("states") or {}).items()},
+        )
+
+# Per-series streams, keyed by caller (e.g. "SPY:1m"). In-process only, like
+# the provider caches; serialize with to_dict() to persist across restarts.
+_STREAMS: Dict[str, BarStream] = {}
+
+def bar_stream(key: str, bars: Optional[List[Dict[str, Any]]] = None) -> BarStream:
+    """Fetch-or-create the stream for `key` and feed it any new bars."""
+    st = _STREAMS.get(key)
+    if st is None:
+        st = _STREAMS[key] = BarStream()
+    if bars:
+        st.feed(bars)
+    return st
+
+# ---------- Batch helpers (full-series; same numbers as the states above) ----------
+
+def _fold(state: _State, values: List[Any]) -> _State:
+    for v in values:
+        state.update(v)
+    return state
 
 def ema(values: List[float], period: int) -> Optional[float]:
-    vals = [v for v in values if isinstance(v,(int,float))]
-    if len(vals) < max(1, period): return None
-    k = 2/(period+1)
-    e = vals[0]
-    for v in vals[1:]:
-        e = v*k + e*(1-k)
-    return round(e, 4)
+    return _fold(EMAState(period), values).value
 
 def sma(values: List[float], period: int) -> Optional[float]:
     vals = [v for v in values if isinstance(v,(int,float))]
@@ -18,58 +290,14 @@ def sma(values: List[float], period: int) -> Optional[float]:
     return round(sum(vals[-period:]) / period, 4)
 
 def rsi(values: List[float], period: int = 14) -> Optional[float]:
-    vals = [v for v in values if isinstance(v,(int,float))]
-    if len(vals) <= period: return None
-    gains, losses = [], []
-    for i in range(1, len(vals)):
-        ch = vals[i] - vals[i-1]
-        gains.append(max(0.0, ch))
-        losses.append(max(0.0, -ch))
-    avg_gain = sum(gains[:period]) / period
-    avg_loss = sum(losses[:period]) / period
-    for i in range(period, len(gains)):
-        avg_gain = (avg_gain*(period-1) + gains[i]) / period
-        avg_loss = (avg_loss*(period-1) + losses[i]) / period
-    if avg_loss == 0: return 100.0
-    rs = avg_gain / avg_loss
-    return round(100 - (100 / (1 + rs)), 2)
+    return _fold(RSIState(period), values).value
 
 def macd(values: List[float], fast: int = 12, slow: int = 26, signal_p: int = 9) -> Optional[Dict[str, float]]:
-    vals = [v for v in values if isinstance(v,(int,float))]
-    if len(vals) < max(fast, slow, signal_p) + 10: return None
-    def _ema(seq, p):
-        k = 2/(p+1); e = seq[0]
-        for x in seq[1:]:
-            e = x*k + e*(1-k)
-        return e
-    ema_fast = []
-    ema_slow = []
-    e_f = vals[0]; e_s = vals[0]
-    kf = 2/(fast+1); ks = 2/(slow+1)
-    for x in vals:
-        e_f = x*kf + e_f*(1-kf); ema_fast.append(e_f)
-        e_s = x*ks + e_s*(1-ks); ema_slow.append(e_s)
-    macd_line = [a-b for a,b in zip(ema_fast, ema_slow)]
-    e_sig = macd_line[0]; ks2 = 2/(signal_p+1)
-    signal = []
-    for m in macd_line:
-        e_sig = m*ks2 + e_sig*(1-ks2); signal.append(e_sig)
-    hist = macd_line[-1] - signal[-1]
-    return {"macd": round(macd_line[-1], 4), "signal": round(signal[-1], 4), "hist": round(hist, 4)}
+    return _fold(MACDState(fast, slow, signal_p), values).value
 
 def atr14(daily: List[Dict[str, Any]]) -> Optional[float]:
     if len(daily) < 15: return None
-    trs = []
-    prev_c = daily[0]["c"]
-    for i in range(1,len(daily)):
-        h,l,c = daily[i]["h"], daily[i]["l"], daily[i]["c"]
-        tr = max(h-l, abs(h-prev_c), abs(l-prev_c))
-        trs.append(tr); prev_c = c
-    if len(trs) < 14: return None
-    a = sum(trs[:14]) / 14
-    for tr in trs[14:]:
-        a = (a*13 + tr)/14
-    return round(a, 4)
+    return _fold(ATRState(14), daily).value
 
 def _sigma(values: List[float]) -> Optional[float]:
     n = len(values)
@@ -80,16 +308,7 @@ def _sigma(values: List[float]) -> Optional[float]:
 
 def session_vwap_and_sigma(bars: List[Dict[str,Any]]) -> Tuple[Optional[float], Optional[float]]:
     if not bars: return None, None
-    tps, vols = [], []
-    for b in bars:
-        h = b.get("h") or 0.0; l = b.get("l") or 0.0; c = b.get("c") or 0.0
-        v = b.get("v") or 0.0
-        tp = (h + l + c) / 3.0
-        tps.append(tp); vols.append(v)
-    s_vol = sum(vols)
-    vwap = (sum(tps[i]*vols[i] for i in range(len(tps))) / s_vol) if s_vol>0 else (sum(tps)/len(tps))
-    sig = _sigma(tps)
-    return round(vwap, 4), (round(sig,4) if sig is not None else None)
+    return _fold(VWAPState(), bars).value
 
 def rvol_5min(minute_bars: List[Dict[str,Any]]) -> Optional[float]:
     if len(minute_bars) < 10: return None
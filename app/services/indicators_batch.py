@@ -0,0 +1,272 @@
+"""
+Universe-wide indicator batch: one call over a symbols × time bar matrix.
+
+Values match the scalar helpers in app.services.indicators (bars missing
+from a symbol's series are masked out, exactly like filtering the list).
+NumPy is used when installed; otherwise each row is folded through the
+streaming states so callers get the same shape back either way.
+"""
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.services.indicators import (
+    EMAState, RSIState, MACDState, ATRState, VWAPState, rvol_5min,
+)
+from app.utils.bars import as_bars
+
+try:
+    import numpy as np
+except Exception:  # pragma: no cover - optional dependency
+    np = None
+
+_FIELDS = ("o", "h", "l", "c", "v")
+
+# output key -> rounding applied at the API edge (same as the scalar helpers)
+_ROUND = {"rsi": 2, "rvol5": 2}
+
+
+@dataclass
+class BarMatrix:
+    """Bars stacked on a shared time axis. With NumPy each field is an S×T float
+    array (NaN where missing) and `mask` marks bars that exist; without it the
+    per-symbol bar lists are kept as-is in `rows`."""
+    symbols: List[str]
+    t: List[Any]
+    fields: Dict[str, Any]
+    mask: Any
+    rows: Optional[List[List[Dict[str, Any]]]] = None
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+
+def _f(v: Any) -> float:
+    return float(v) if isinstance(v, (int, float)) else math.nan
+
+
+def stack_bars(series: Dict[str, Any]) -> BarMatrix:
+    """Align per-symbol bar series (Bars or {t,o,h,l,c,v} lists) on the union of their timestamps."""
+    symbols = list(series.keys())
+    if np is None:
+        rows = [list(series[s] or []) for s in symbols]
+        t_axis = sorted({b.get("t") for r in rows for b in r if b.get("t") is not None})
+        return BarMatrix(symbols=symbols, t=t_axis, fields={}, mask=None, rows=rows)
+    cols = [as_bars(series[s]) for s in symbols]
+    ts = [np.frombuffer(b.t, dtype=np.int64) for b in cols]
+    axis = np.unique(np.concatenate(ts)) if ts else np.zeros(0, dtype=np.int64)
+    S, T = len(symbols), len(axis)
+    fields = {k: np.full((S, T), np.nan) for k in _FIELDS}
+    mask = np.zeros((S, T), dtype=bool)
+    for i, (b, t) in enumerate(zip(cols, ts)):
+        j = np.searchsorted(axis, t)
+        mask[i, j] = True
+        for k in _FIELDS:
+            fields[k][i, j] = np.frombuffer(getattr(b, k), dtype=np.float64)
+    return BarMatrix(symbols=symbols, t=axis.tolist(), fields=fields, mask=mask)
+
+
+# ---------- NumPy kernels (vectorized across symbols, one step per column) ----------
+
+def _np_ema(x, valid, period: int):
+    S, T = x.shape
+    k = 2/(period+1)
+    e = np.full(S, np.nan); n = np.zeros(S, dtype=int)
+    for j in range(T):
+        vj = valid[:, j]; xj = x[:, j]
+        seed = vj & np.isnan(e)
+        e = np.where(seed, xj, np.where(vj, xj*k + e*(1-k), e))
+        n += vj
+    return np.where(n >= max(1, period), e, np.nan)
+
+
+def _np_rsi(x, valid, period: int):
+    S, T = x.shape
+    p = period
+    prev = np.full(S, np.nan); n = np.zeros(S, dtype=int)
+    ag = np.zeros(S); al = np.zeros(S)
+    for j in range(T):
+        vj = valid[:, j]; xj = x[:, j]
+        step = vj & ~np.isnan(prev)
+        ch = np.where(step, xj - prev, 0.0)
+        g = np.maximum(0.0, ch); l = np.maximum(0.0, -ch)
+        n += step
+        warm = step & (n <= p)
+        wild = step & (n > p)
+        ag = np.where(warm, ag + g, np.where(wild, (ag*(p-1) + g)/p, ag))
+        al = np.where(warm, al + l, np.where(wild, (al*(p-1) + l)/p, al))
+        done = warm & (n == p)
+        ag = np.where(done, ag/p, ag); al = np.where(done, al/p, al)
+        prev = np.where(vj, xj, prev)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        val = np.where(al == 0, 100.0, 100 - 100/(1 + ag/al))
+    return np.where(n >= p, val, np.nan)
+
+
+def _np_macd(x, valid, fast: int, slow: int, signal_p: int):
+    S, T = x.shape
+    kf = 2/(fast+1); ks = 2/(slow+1); ks2 = 2/(signal_p+1)
+    ef = np.full(S, np.nan); es = np.full(S, np.nan); sig = np.full(S, np.nan)
+    n = np.zeros(S, dtype=int)
+    for j in range(T):
+        vj = valid[:, j]; xj = x[:, j]
+        seed = vj & np.isnan(ef)
+        ef = np.where(seed, xj, ef); es = np.where(seed, xj, es)
+        ef = np.where(vj, xj*kf + ef*(1-kf), ef)
+        es = np.where(vj, xj*ks + es*(1-ks), es)
+        m = ef - es
+        sig = np.where(vj & np.isnan(sig), m, sig)
+        sig = np.where(vj, m*ks2 + sig*(1-ks2), sig)
+        n += vj
+    ok = n >= max(fast, slow, signal_p) + 10
+    m = ef - es
+    return np.where(ok, m, np.nan), np.where(ok, sig, np.nan), np.where(ok, m - sig, np.nan)
+
+
+def _np_atr(h, l, c, valid, period: int):
+    S, T = c.shape
+    p = period
+    prev_c = np.full(S, np.nan); a = np.zeros(S); n = np.zeros(S, dtype=int)
+    for j in range(T):
+        vj = valid[:, j]
+        step = vj & ~np.isnan(prev_c)
+        hj, lj, cj = h[:, j], l[:, j], c[:, j]
+        tr = np.maximum(hj - lj, np.maximum(np.abs(hj - prev_c), np.abs(lj - prev_c)))
+        tr = np.where(step, tr, 0.0)
+        n += step
+        warm = step & (n <= p)
+        wild = step & (n > p)
+        a = np.where(warm, a + tr, np.where(wild, (a*(p-1) + tr)/p, a))
+        a = np.where(warm & (n == p), a/p, a)
+        prev_c = np.where(vj, cj, prev_c)
+    return np.where(n >= p, a, np.nan)
+
+
+def _np_vwap(h, l, c, v, mask):
+    z = lambda a: np.where(mask, np.nan_to_num(a, nan=0.0), 0.0)
+    tp = (z(h) + z(l) + z(c)) / 3.0
+    vol = z(v)
+    n = mask.sum(axis=1)
+    s_vol = vol.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = tp.sum(axis=1) / n
+        vwap = np.where(s_vol > 0, (tp*vol).sum(axis=1) / s_vol, mean)
+        dev = np.where(mask, tp - mean[:, None], 0.0)
+        sigma = np.sqrt((dev*dev).sum(axis=1) / (n - 1))
+    return np.where(n > 0, vwap, np.nan), np.where(n >= 2, sigma, np.nan)
+
+
+def _np_rvol5(v, mask):
+    """rvol_5min per row over present bars only (right-aligned, ragged lengths)."""
+    S, T = v.shape
+    L = mask.sum(axis=1)
+    vol = np.where(mask, np.nan_to_num(v, nan=0.0), 0.0)
+    order = np.argsort(mask, axis=1, kind="stable")          # missing first, present right-aligned
+    packed = np.take_along_axis(vol, order, axis=1)
+    cs = np.concatenate([np.zeros((S, 1)), np.cumsum(packed, axis=1)], axis=1)
+    off = T - L                                               # packed index of each row's first bar
+
+    def window(start):                                        # sum of 5 bars from row position `start`
+        i0 = np.clip(off + start, 0, T); i1 = np.clip(off + start + 5, 0, T)
+        return np.take_along_axis(cs, i1[:, None], 1)[:, 0] - np.take_along_axis(cs, i0[:, None], 1)[:, 0]
+
+    last5 = window(L - 5)
+    base0 = np.maximum(0, L - 35)
+    chunks = []
+    for j in range(7):
+        s = base0 + 5*j
+        chunks.append(np.where(s < L - 5, window(s), np.nan))
+    ch = np.stack(chunks, axis=1)
+    has = ~np.isnan(ch).all(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        med = np.where(has, np.nanmedian(np.where(has[:, None], ch, 0.0), axis=1), np.nan)
+        out = np.where((L >= 10) & (med > 0), last5 / med, np.nan)
+    return out
+
+
+def _batch_numpy(mat: BarMatrix, ema_periods, rsi_period, macd_p, atr_period) -> Dict[str, Any]:
+    f = mat.fields; mask = mat.mask
+    c = f["c"]
+    valid_c = mask & ~np.isnan(c)
+    out: Dict[str, Any] = {f"ema{p}": _np_ema(c, valid_c, p) for p in ema_periods}
+    out["rsi"] = _np_rsi(c, valid_c, rsi_period)
+    out["macd"], out["macd_signal"], out["macd_hist"] = _np_macd(c, valid_c, *macd_p)
+    valid_hlc = valid_c & ~np.isnan(f["h"]) & ~np.isnan(f["l"])
+    out["atr"] = _np_atr(f["h"], f["l"], c, valid_hlc, atr_period)
+    out["vwap"], out["sigma_tp"] = _np_vwap(f["h"], f["l"], c, f["v"], mask)
+    out["rvol5"] = _np_rvol5(f["v"], mask)
+    idx = np.where(valid_c.any(axis=1), valid_c.shape[1] - 1 - np.argmax(valid_c[:, ::-1], axis=1), 0)
+    out["last"] = np.where(valid_c.any(axis=1), np.take_along_axis(c, idx[:, None], 1)[:, 0], np.nan)
+    return out
+
+
+def _batch_python(mat: BarMatrix, ema_periods, rsi_period, macd_p, atr_period) -> Dict[str, Any]:
+    keys = [f"ema{p}" for p in ema_periods] + ["rsi", "macd", "macd_signal", "macd_hist", "atr", "vwap", "sigma_tp", "rvol5", "last"]
+    out: Dict[str, List[Optional[float]]] = {k: [] for k in keys}
+    for bars in mat.rows or []:
+        emas = [EMAState(p) for p in ema_periods]
+        r = RSIState(rsi_period); m = MACDState(*macd_p); a = ATRState(atr_period); vw = VWAPState()
+        last = None
+        for b in bars:
+            cv = b.get("c")
+            for st in emas:
+                st.update(cv)
+            r.update(cv); m.update(cv); vw.update(b)
+            if all(isinstance(b.get(k), (int, float)) for k in ("h", "l", "c")):
+                a.update(b)
+            if isinstance(cv, (int, float)):
+                last = float(cv)
+        for p, st in zip(ema_periods, emas):
+            out[f"ema{p}"].append(st.value)
+        out["rsi"].append(r.value)
+        mv = m.value or {}
+        out["macd"].append(mv.get("macd")); out["macd_signal"].append(mv.get("signal")); out["macd_hist"].append(mv.get("hist"))
+        out["atr"].append(a.value)
+        vwap, sig = vw.value
+        out["vwap"].append(vwap); out["sigma_tp"].append(sig)
+        out["rvol5"].append(rvol_5min(bars))
+        out["last"].append(last)
+    return out
+
+
+def batch_indicators(
+    mat: BarMatrix,
+    ema_periods: Sequence[int] = (9, 20, 50),
+    rsi_period: int = 14,
+    macd_params: Tuple[int, int, int] = (12, 26, 9),
+    atr_period: int = 14,
+) -> Dict[str, Any]:
+    """
+    Latest EMA/RSI/MACD/ATR/VWAP/sigma/rvol5 for every symbol in one call.
+    Returns {name: array-like of len(mat.symbols)}; NaN/None where a symbol
+    lacks enough bars. Use per_symbol() to get rounded dicts for responses.
+    """
+    if not mat.symbols:
+        return {}
+    if np is not None and mat.rows is None:
+        return _batch_numpy(mat, tuple(ema_periods), rsi_period, macd_params, atr_period)
+    return _batch_python(mat, tuple(ema_periods), rsi_period, macd_params, atr_period)
+
+
+def per_symbol(mat: BarMatrix, res: Dict[str, Any]) -> Dict[str, Dict[str, Optional[float]]]:
+    """{symbol: {name: rounded value or None}} from a batch_indicators result."""
+    out: Dict[str, Dict[str, Optional[float]]] = {}
+    for i, sym in enumerate(mat.symbols):
+        row: Dict[str, Optional[float]] = {}
+        for k, arr in res.items():
+            v = arr[i]
+            if v is None:
+                row[k] = None
+                continue
+            v = float(v)
+            row[k] = None if math.isnan(v) else round(v, _ROUND.get(k, 4))
+        out[sym] = row
+    return out
+
+
+def universe_indicators(series: Dict[str, List[Dict[str, Any]]], **kw: Any) -> Dict[str, Dict[str, Optional[float]]]:
+    """Convenience: stack, compute and unpack in one go."""
+    mat = stack_bars(series)
+    return per_symbol(mat, batch_indicators(mat, **kw))
@@ -1,25 +1,61 @@
 from __future__ import annotations
 
 import time
-from typing import Dict, Any, List, Optional, Tuple
+from datetime import date
+from typing import Dict, Any, Iterable, List, Optional, Tuple
 from collections import defaultdict
 
+# Per-underlying surface state. Expiries are maintained independently so a
+# snapshot only touches the expiries/strikes it actually carries:
+#   { "SPY": { "t": <last touch>, "surface": <assembled view or None>,
+#              "expiries": { "2025-01-17": { "t": <fresh>, "lp": <bucketed at>,
+#                                            "points": { key: (strike, iv) },
+#                                            "buckets": { 'all': [...], ... } } } } }
 _CACHE: Dict[str, Dict[str, Any]] = {}
 
+# Re-bucket an unchanged expiry only when spot drifts more than this (relative).
+_LP_REBUCKET = 0.001
+
 def _key(symbol: str) -> str:
     return (symbol or "").upper()
 
+def _prune(item: Dict[str, Any], ttl: int, now: float) -> None:
+    """Drop expiries that went stale (per-expiry TTL) or already expired."""
+    exps: Dict[str, Dict[str, Any]] = item.setdefault("expiries", {})
+    today = date.today().isoformat()
+    stale = [e for e, ent in exps.items() if (now - ent.get("t", 0)) > ttl or e < today]
+    for e in stale:
+        exps.pop(e, None)
+    if stale:
+        item["surface"] = None
+
 def _cache_get(sym: str, ttl: int) -> Optional[Dict[str, Any]]:
     item = _CACHE.get(_key(sym))
     if not item:
         return None
-    if (time.time() - item.get("t", 0)) > ttl:
+    now = time.time()
+    _prune(item, ttl, now)
+    if not item["expiries"] and (now - item.get("t", 0)) > ttl:
         _CACHE.pop(_key(sym), None)
         return None
     return item
 
-def _cache_put(sym: str, surface: Dict[str, List[float]]) -> None:
-    _CACHE[_key(sym)] = {"t": time.time(), "surface": surface}
+def _cache_item(sym: str) -> Dict[str, Any]:
+    item = _CACHE.get(_key(sym))
+    if item is None:
+        item = _CACHE[_key(sym)] = {"t": time.time(), "expiries": {}, "surface": None}
+    return item
+
+def _surface_of(item: Dict[str, Any]) -> Dict[str, Any]:
+    surface = item.get("surface")
+    if surface is None:
+        surface = {
+            exp: ent["buckets"]
+            for exp, ent in sorted((item.get("expiries") or {}).items())
+            if ent.get("buckets")
+        }
+        item["surface"] = surface
+    return surface
 
 def _extract_expiry(rr: Dict[str, Any]) -> Optional[str]:
     meta = rr.get("options") or {}
@@ -46,6 +82,21 @@ def _extract_strike(rr: Dict[str, Any]) -> Optional[float]:
     except Exception:
         return None
 
+def _extract_type(rr: Dict[str, Any]) -> str:
+    meta = rr.get("options") or {}
+    det  = rr.get("details") or {}
+    occ  = rr.get("_occ") or {}
+    typ = rr.get("type") or rr.get("option_type") or occ.get("type") or meta.get("contract_type") or det.get("contract_type")
+    return str(typ or "").lower()[:1]
+
+def _contract_key(rr: Dict[str, Any], strike: Optional[float]) -> str:
+    meta = rr.get("options") or {}
+    det  = rr.get("details") or {}
+    sym = rr.get("symbol") or rr.get("ticker") or meta.get("symbol") or det.get("ticker")
+    if sym:
+        return str(sym)
+    return f"{_extract_type(rr)}{strike}"
+
 def _mn_bucket(strike: Optional[float], last_price: Optional[float]) -> Optional[str]:
     if strike is None or last_price is None or last_price <= 0:
         return None
@@ -80,30 +131,93 @@ def build_iv_surface(rows: List[Dict[str, Any]], last_price: Optional[float] = N
         cleaned[k] = {bk: vals for bk, vals in v.items() if vals}
     return cleaned
 
+def _bucketize(points: Iterable[Tuple[Optional[float], float]], last_price: Optional[float]) -> Dict[str, List[float]]:
+    out: Dict[str, List[float]] = {"all": [], "atm": [], "near": [], "far": []}
+    for st, iv in points:
+        out["all"].append(iv)
+        if last_price is not None:
+            b = _mn_bucket(st, last_price)
+            if b:
+                out[b].append(iv)
+    return {bk: vals for bk, vals in out.items() if vals}
+
+def _lp_moved(prev: Optional[float], cur: Optional[float]) -> bool:
+    if cur is None:
+        return False
+    if prev is None or prev <= 0:
+        return True
+    return abs(cur - prev) / prev > _LP_REBUCKET
+
+def merge_iv_rows(underlying: str, rows: List[Dict[str, Any]], last_price: Optional[float] = None) -> List[str]:
+    """
+    Merge chain rows into the cached surface for `underlying`.
+    Only expiries present in `rows` are touched; within an expiry, contracts are
+    upserted by symbol. An expiry is re-bucketed only when one of its points
+    changed or spot drifted enough to move moneyness buckets.
+    Returns the list of expiries whose buckets were rebuilt.
+    """
+    now = time.time()
+    item = _cache_item(underlying)
+    item["t"] = now
+    exps: Dict[str, Dict[str, Any]] = item["expiries"]
+
+    incoming: Dict[str, Dict[str, Tuple[Optional[float], float]]] = defaultdict(dict)
+    for rr in rows or []:
+        exp = _extract_expiry(rr)
+        iv = _extract_iv(rr)
+        if not exp or iv is None:
+            continue
+        st = _extract_strike(rr)
+        incoming[str(exp)][_contract_key(rr, st)] = (st, iv)
+
+    changed: List[str] = []
+    for exp, pts in incoming.items():
+        ent = exps.get(exp)
+        if ent is None:
+            ent = exps[exp] = {"t": now, "lp": None, "points": {}, "buckets": {}}
+        ent["t"] = now
+        book = ent["points"]
+        dirty = False
+        for k, v in pts.items():
+            if book.get(k) != v:
+                book[k] = v
+                dirty = True
+        if not dirty and not _lp_moved(ent.get("lp"), last_price):
+            continue
+        lp = last_price if last_price is not None else ent.get("lp")
+        ent["buckets"] = _bucketize(book.values(), lp)
+        ent["lp"] = lp
+        changed.append(exp)
+    if changed:
+        item["surface"] = None
+    return changed
+
 async def get_iv_surface(poly, underlying: str, rows: Optional[List[Dict[str, Any]]] = None, ttl: int = 180, last_price: Optional[float] = None) -> Dict[str, Any]:
     """
-    Returns { 'surface': { expiry: [iv,...], ... }, 'ts': <epoch_seconds> }.
-    Uses in-memory cache by underlying for TTL seconds.
-    If rows are provided, builds from rows and refreshes cache.
+    Returns { 'surface': { expiry: {bucket: [iv,...]}, ... }, 'ts': <epoch_seconds> }.
+    Uses in-memory cache by underlying; each expiry stays fresh for TTL seconds.
+    If rows are provided, merges them into the cache (see merge_iv_rows); repeated
+    identical snapshots leave the surface untouched.
     """
     if rows:
-        surface = build_iv_surface(rows, last_price=last_price)
-        _cache_put(underlying, surface)
-        return {"surface": surface, "ts": time.time(), "source": "rows"}
+        changed = merge_iv_rows(underlying, rows, last_price=last_price)
+        item = _cache_item(underlying)
+        _prune(item, ttl, time.time())
+        return {"surface": _surface_of(item), "ts": time.time(), "source": "rows", "changed": changed}
     cached = _cache_get(underlying, ttl)
     if cached:
-        return {"surface": cached.get("surface", {}), "ts": cached.get("t"), "source": "cache"}
+        return {"surface": _surface_of(cached), "ts": cached.get("t"), "source": "cache"}
     # Fetch fresh snapshot from provider
-    surface: Dict[str, List[float]] = {}
     try:
         if poly is not None:
             j = await poly.snapshot_option_chain(underlying)
-            rows = (j or {}).get("results") or []
-            surface = build_iv_surface(rows, last_price=last_price)
+            merge_iv_rows(underlying, (j or {}).get("results") or [], last_price=last_price)
     except Exception:
-        surface = {}
-    _cache_put(underlying, surface)
-    return {"surface": surface, "ts": time.time(), "source": "fetch"}
+        pass
+    # Touch even on empty/failed fetch so we don't refetch until TTL
+    item = _cache_item(underlying)
+    item["t"] = time.time()
+    return {"surface": _surface_of(item), "ts": time.time(), "source": "fetch"}
 
 def percentile_rank(values: List[float], x: Optional[float]) -> Optional[float]:
     if x is None or not values:
@@ -0,0 +1,256 @@
+"""
+US equity trading calendar (NYSE rules): holidays, early closes and the
+pre-market / regular / after-hours windows of every session.
+
+Sessions are computed from the published holiday rules (no network, no
+extra dependency) and memoized per year, so "previous session" or "today's
+bounds" are plain lookups instead of probing Polygon one day at a time.
+All timestamps are UTC epoch milliseconds, like Polygon aggregates.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, datetime, time as dtime, timedelta, timezone
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+EASTERN = ZoneInfo("America/New_York")
+
+PRE_OPEN = dtime(4, 0)
+RTH_OPEN = dtime(9, 30)
+RTH_CLOSE = dtime(16, 0)
+POST_CLOSE = dtime(20, 0)
+EARLY_CLOSE = dtime(13, 0)
+EARLY_POST_CLOSE = dtime(17, 0)
+
+
+@dataclass(frozen=True)
+class Session:
+    day: date
+    pre_open: int     # 04:00 ET
+    open: int         # 09:30 ET
+    close: int        # 16:00 ET (13:00 on early-close days)
+    post_close: int   # 20:00 ET (17:00 on early-close days)
+    early_close: bool = False
+
+    @property
+    def rth_ms(self) -> int:
+        return self.close - self.open
+
+    def phase(self, t_ms: int) -> str:
+        """'pre' | 'rth' | 'post' | 'closed' for a timestamp on this session's date."""
+        if self.open <= t_ms < self.close:
+            return "rth"
+        if self.pre_open <= t_ms < self.open:
+            return "pre"
+        if self.close <= t_ms < self.post_close:
+            return "post"
+        return "closed"
+
+    def as_dict(self) -> Dict[str, object]:
+        return {
+            "date": self.day.isoformat(), "pre_open": self.pre_open, "open": self.open,
+            "close": self.close, "post_close": self.post_close, "early_close": self.early_close,
+        }
+
+
+# ---------- holiday rules ----------
+
+def _nth_weekday(year: int, month: int, weekday: int, n: int) -> date:
+    d = date(year, month, 1)
+    d += timedelta(days=(weekday - d.weekday()) % 7)
+    return d + timedelta(weeks=n - 1)
+
+
+def _last_weekday(year: int, month: int, weekday: int) -> date:
+    d = date(year, month + 1, 1) - timedelta(days=1) if month < 12 else date(year, 12, 31)
+    return d - timedelta(days=(d.weekday() - weekday) % 7)
+
+
+def _easter(year: int) -> date:
+    # Anonymous Gregorian algorithm
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _observed(d: date) -> date:
+    if d.weekday() == 5:
+        return d - timedelta(days=1)
+    if d.weekday() == 6:
+        return d + timedelta(days=1)
+    return d
+
+
+# One-off closures that no rule predicts (national days of mourning, etc.)
+_SPECIAL_CLOSURES: Dict[date, str] = {
+    date(2018, 12, 5): "National Day of Mourning (G. H. W. Bush)",
+    date(2025, 1, 9): "National Day of Mourning (J. Carter)",
+}
+
+
+@lru_cache(maxsize=64)
+def holidays(year: int) -> Dict[date, str]:
+    """Full-day closures for `year`."""
+    out: Dict[date, str] = {d: why for d, why in _SPECIAL_CLOSURES.items() if d.year == year}
+    ny = date(year, 1, 1)
+    if ny.weekday() != 5:                     # NYSE does not observe a Saturday New Year on Dec 31
+        out[_observed(ny)] = "New Year's Day"
+    out[_nth_weekday(year, 1, 0, 3)] = "Martin Luther King Jr. Day"
+    out[_nth_weekday(year, 2, 0, 3)] = "Washington's Birthday"
+    out[_easter(year) - timedelta(days=2)] = "Good Friday"
+    out[_last_weekday(year, 5, 0)] = "Memorial Day"
+    if year >= 2022:
+        out[_observed(date(year, 6, 19))] = "Juneteenth"
+    out[_observed(date(year, 7, 4))] = "Independence Day"
+    out[_nth_weekday(year, 9, 0, 1)] = "Labor Day"
+    out[_nth_weekday(year, 11, 3, 4)] = "Thanksgiving Day"
+    out[_observed(date(year, 12, 25))] = "Christmas Day"
+    return out
+
+
+@lru_cache(maxsize=64)
+def early_closes(year: int) -> Dict[date, str]:
+    """13:00 ET closes: Jul 3, day after Thanksgiving, Christmas Eve (weekdays that are not holidays)."""
+    hol = holidays(year)
+    cands = {
+        date(year, 7, 3): "Independence Day eve",
+        _nth_weekday(year, 11, 3, 4) + timedelta(days=1): "Day after Thanksgiving",
+        date(year, 12, 24): "Christmas Eve",
+    }
+    return {d: why for d, why in cands.items() if d.weekday() < 5 and d not in hol}
+
+
+def is_trading_day(d: date) -> bool:
+    return d.weekday() < 5 and d not in holidays(d.year)
+
+
+# ---------- sessions ----------
+
+def _ms(d: date, t: dtime) -> int:
+    return int(datetime.combine(d, t, tzinfo=EASTERN).timestamp() * 1000)
+
+
+_SESSIONS: Dict[date, Session] = {}
+
+
+def session(d: date) -> Optional[Session]:
+    """Session for Eastern calendar date `d`, or None when the market is closed."""
+    s = _SESSIONS.get(d)
+    if s is None:
+        if not is_trading_day(d):
+            return None
+        early = d in early_closes(d.year)
+        s = _SESSIONS[d] = Session(
+            day=d,
+            pre_open=_ms(d, PRE_OPEN),
+            open=_ms(d, RTH_OPEN),
+            close=_ms(d, EARLY_CLOSE if early else RTH_CLOSE),
+            post_close=_ms(d, EARLY_POST_CLOSE if early else POST_CLOSE),
+            early_close=early,
+        )
+    return s
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def eastern_date(now: Optional[datetime] = None) -> date:
+    return (now or _now()).astimezone(EASTERN).date()
+
+
+def today(now: Optional[datetime] = None) -> Optional[Session]:
+    """Today's session (Eastern date), or None on weekends/holidays."""
+    return session(eastern_date(now))
+
+
+def previous_session(ref: Optional[date] = None) -> Session:
+    """Latest session strictly before `ref` (default: today, Eastern)."""
+    d = (ref or eastern_date()) - timedelta(days=1)
+    while not is_trading_day(d):
+        d -= timedelta(days=1)
+    return session(d)  # type: ignore[return-value]
+
+
+def next_session(ref: Optional[date] = None) -> Session:
+    """First session strictly after `ref` (default: today, Eastern)."""
+    d = (ref or eastern_date()) + timedelta(days=1)
+    while not is_trading_day(d):
+        d += timedelta(days=1)
+    return session(d)  # type: ignore[return-value]
+
+
+def last_session(now: Optional[datetime] = None) -> Session:
+    """Today's session once pre-market has opened, else the previous one."""
+    now = now or _now()
+    s = today(now)
+    if s is not None and int(now.timestamp() * 1000) >= s.pre_open:
+        return s
+    return previous_session(eastern_date(now))
+
+
+def sessions_back(n: int, ref: Optional[date] = None, include_ref: bool = True) -> List[Session]:
+    """The last `n` sessions up to `ref` (inclusive when it trades), oldest first."""
+    ref = ref or eastern_date()
+    out: List[Session] = []
+    cur = session(ref) if include_ref else None
+    if cur is not None:
+        out.append(cur)
+    d = ref
+    while len(out) < n:
+        cur = previous_session(d)
+        out.append(cur)
+        d = cur.day
+    return out[::-1]
+
+
+def phase(now: Optional[datetime] = None) -> str:
+    """'pre' | 'rth' | 'post' | 'closed' right now."""
+    now = now or _now()
+    s = today(now)
+    return s.phase(int(now.timestamp() * 1000)) if s else "closed"
+
+
+def is_open(now: Optional[datetime] = None, extended: bool = False) -> bool:
+    p = phase(now)
+    return p == "rth" or (extended and p in ("pre", "post"))
+
+
+def rth_remaining_fraction(now: Optional[datetime] = None) -> Optional[float]:
+    """Share of today's regular session still ahead (honours early closes); None outside RTH."""
+    now = now or _now()
+    s = today(now)
+    t = int(now.timestamp() * 1000)
+    if s is None or not (s.open <= t < s.close):
+        return None
+    return (s.close - t) / max(1, s.rth_ms)
+
+
+def midnight_ms(d: date) -> int:
+    """00:00 ET on `d`, the timestamp Polygon stamps on daily bars."""
+    return _ms(d, dtime(0, 0))
+
+
+def day_bounds(d: date, extended: bool = True) -> Tuple[int, int]:
+    """(start, end) ms of the session on `d` (pre->post when extended, else RTH); Eastern midnight bounds when closed."""
+    s = session(d)
+    if s is None:
+        return midnight_ms(d), midnight_ms(d + timedelta(days=1))
+    return (s.pre_open, s.post_close) if extended else (s.open, s.close)
+
+
+def rth_bounds_for(t_ms: int) -> Optional[Tuple[int, int]]:
+    """Regular-hours (open, close) of the session on the Eastern date of `t_ms`."""
+    d = datetime.fromtimestamp(t_ms / 1000, tz=EASTERN).date()
+    s = session(d)
+    return (s.open, s.close) if s else None
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from prometheus_client import Counter, Histogram
+from prometheus_client import Counter, Gauge, Histogram
 
 # Track Polygon REST request counts by status code / outcome.
 polygon_request_total = Counter(
@@ -23,7 +23,41 @@ polygon_request_latency = Histogram(
     ("path",),
 )
 
+# Handlers cancelled because the HTTP client went away mid-request.
+client_disconnect_cancellations_total = Counter(
+    "client_disconnect_cancellations_total",
+    "Requests whose in-flight work was cancelled after the client disconnected, by endpoint.",
+    ("endpoint",),
+)
+
+# Admission control for expensive endpoints (see app/services/admission.py).
+admission_queue_depth = Gauge(
+    "admission_queue_depth",
+    "Requests waiting for an execution slot, by endpoint.",
+    ("endpoint",),
+)
+admission_in_flight = Gauge(
+    "admission_in_flight",
+    "Requests currently holding an execution slot, by endpoint.",
+    ("endpoint",),
+)
+admission_queue_seconds = Histogram(
+    "admission_queue_seconds",
+    "Time spent queued before admission (or shedding), by endpoint.",
+    ("endpoint",),
+)
+admission_shed_total = Counter(
+    "admission_shed_total",
+    "Requests shed instead of queued, by endpoint and reason (queue_full, queue_timeout).",
+    ("endpoint", "reason"),
+)
+
 __all__ = [
+    "admission_queue_depth",
+    "admission_in_flight",
+    "admission_queue_seconds",
+    "admission_shed_total",
+    "client_disconnect_cancellations_total",
     "polygon_request_total",
     "polygon_request_retry_total",
     "polygon_request_latency",
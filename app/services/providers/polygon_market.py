@@ -1,9 +1,16 @@
 from __future__ import annotations
 import os, time, httpx, re, asyncio, logging
-from typing import Dict, Any, List, Optional, Tuple
+from bisect import bisect_left
+from typing import Dict, Any, List, Optional, Tuple, Union
 from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
-from datetime import datetime, timedelta, timezone
-
+from datetime import date, datetime
+
+from app.utils.topk import top_k
+from app.services.resample import resample
+from app.utils.bars import Bars
+from app.services import market_calendar as mcal
+from app.utils.request_memo import memoized
+from app.utils.deadline import DeadlineExceeded, clamp as _clamp_deadline, mark_timed_out
 from app.services.metrics import (
     polygon_request_latency,
     polygon_request_retry_total,
@@ -38,6 +45,31 @@ def _cache_get(key: str, ttl: int) -> Optional[Dict[str, Any]]:
 def _cache_put(key: str, value: Dict[str, Any]) -> None:
     _CACHE[key] = {"t": time.time(), "v": value}
 
+def _bars_of(j: Dict[str, Any]) -> Bars:
+    """Aggregates payload -> Bars, built once per cached response; hits get a copy so
+    callers can't mutate the cached series."""
+    bars = j.get("_bars")
+    if bars is None:
+        bars = Bars.from_rows(j.get("results") or [])
+        j["_bars"] = bars
+    return bars[:]
+
+# Incrementally maintained 1m series per symbol:
+#   { "SPY": {"start": <first session pre-open ms>, "bars": Bars, "t": <fetched at>} }
+# Each refresh only requests bars from the last stored minute onward.
+_MINUTES: Dict[str, Dict[str, Any]] = {}
+_MINUTES_TTL = 5.0
+# Completed-session daily history per symbol, refetched once per trading date:
+#   { "SPY": {"day": date, "lookback": int, "bars": Bars} }
+_DAILY: Dict[str, Dict[str, Any]] = {}
+_LOCKS: Dict[str, asyncio.Lock] = {}
+
+def _lock(key: str) -> asyncio.Lock:
+    lk = _LOCKS.get(key)
+    if lk is None:
+        lk = _LOCKS[key] = asyncio.Lock()
+    return lk
+
 def _p(extra=None) -> Dict[str, Any]:
     d = {"apiKey": API_KEY}
     if extra: d.update(extra)
@@ -87,7 +119,10 @@ class PolygonMarket:
             cached = _cache_get(key, cache_ttl)
             if cached is not None:
                 return cached
+        # Within one request, identical GETs share a single upstream call
+        return await memoized(("polygon", key), lambda: self._fetch(url, params, key, cache_ttl))
 
+    async def _fetch(self, url: str, params: Dict[str, Any] | None, key: str, cache_ttl: int) -> Dict[str, Any]:
         path = urlparse(url).path or url
         async with httpx.AsyncClient(timeout=self.timeout) as c:
             backoff = 0.25
@@ -99,7 +134,8 @@ class PolygonMarket:
 
                 start = time.perf_counter()
                 try:
-                    r = await c.get(url, params=_p(params))
+                    # No retry or request outlives the caller's deadline
+                    r = await c.get(url, params=_p(params), timeout=_clamp_deadline(self.timeout))
                 except httpx.TimeoutException as exc:
                     duration = time.perf_counter() - start
                     polygon_request_latency.labels(path=path).observe(duration)
@@ -215,74 +251,109 @@ class PolygonMarket:
             pass
         return {"symbol": symbol.upper(), "price": None, "t": None}
 
-    # ---------- Session bounds helpers ----------
-    def _utc_day_bounds(self, dt: Optional[datetime] = None) -> Tuple[int, int]:
-        now = dt or datetime.now(timezone.utc)
-        start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        return int(start.timestamp() * 1000), int(now.timestamp() * 1000)
-
-    async def _minute_bars_range(self, symbol: str, start_ms: int, end_ms: int, mult: int = 1) -> List[Dict[str, Any]]:
+    async def _minute_bars_range(self, symbol: str, start_ms: int, end_ms: int, mult: int = 1) -> Bars:
         mapped = self._map_index(symbol)
         j = await self._get(
             f"{BASE}/v2/aggs/ticker/{mapped}/range/{mult}/minute/{start_ms}/{end_ms}",
             {"adjusted": "true", "sort": "asc", "limit": 50000},
             cache_ttl=8,
         )
-        return [
-            {"t": b.get("t"), "o": b.get("o"), "h": b.get("h"), "l": b.get("l"), "c": b.get("c"), "v": b.get("v")}
-            for b in (j.get("results") or [])
-        ]
+        return _bars_of(j)
 
     # ---------- 1m/5m for today ----------
-    async def minute_bars_today(self, symbol: str) -> List[Dict[str, Any]]:
-        start_ms, end_ms = self._utc_day_bounds()
+    async def minute_bars_session(self, symbol: str, sess: Optional[mcal.Session]) -> Bars:
+        """1m bars from pre-market open to after-hours close of `sess` (capped at now)."""
+        if sess is None:
+            return Bars()
+        now_ms = int(time.time() * 1000)
+        if now_ms < sess.pre_open:
+            return Bars()
+        return await self._minute_bars_range(symbol, sess.pre_open, min(now_ms, sess.post_close), mult=1)
+
+    async def minute_bars_today(self, symbol: str) -> Bars:
+        # Eastern session bounds: UTC midnight would pull the prior evening's after-hours
+        return await self.minute_bars_session(symbol, mcal.today())
+
+    async def five_minute_bars_today(self, symbol: str) -> Bars:
+        # Derived from the (cached) 1m series: no extra upstream request
+        return resample(await self.minute_bars_today(symbol), "5m")
+
+    # ---------- 1m history + locally resampled higher timeframes ----------
+    async def minute_bars_lookback(self, symbol: str, lookback_days: int = 5) -> Bars:
+        end_ms = int(time.time() * 1000)
+        start_ms = end_ms - max(1, lookback_days) * 86_400_000
         return await self._minute_bars_range(symbol, start_ms, end_ms, mult=1)
 
-    async def five_minute_bars_today(self, symbol: str) -> List[Dict[str, Any]]:
-        start_ms, end_ms = self._utc_day_bounds()
-        return await self._minute_bars_range(symbol, start_ms, end_ms, mult=5)
+    async def resampled_bars(self, symbol: str, interval: str, lookback_days: int = 5) -> Bars:
+        """5m/15m/30m/1h/4h/session bars built from one 1m request (wall-clock buckets)."""
+        return resample(await self.minute_bars_lookback(symbol, lookback_days), interval)
 
-    # ---------- 1m for a specific UTC date ----------
-    async def minute_bars_for_day(self, symbol: str, day: datetime) -> List[Dict[str, Any]]:
-        start_ms = int(day.replace(hour=0, minute=0, second=0, microsecond=0, tzinfo=timezone.utc).timestamp() * 1000)
-        end_ms = start_ms + 86_400_000
-        return await self._minute_bars_range(symbol, start_ms, end_ms, mult=1)
+    # ---------- incrementally maintained series (scanner feed) ----------
+    async def minute_series(self, symbol: str, sessions: int = 10) -> Bars:
+        """1m bars covering the last `sessions` sessions (pre/post included).
 
-    # ---------- 5m for previous trading session (aggregating 1m if needed) ----------
-    async def five_minute_bars_prev_session(self, symbol: str, max_lookback_days: int = 10) -> List[Dict[str, Any]]:
-        day = datetime.now(timezone.utc).date() - timedelta(days=1)
-        for _ in range(max_lookback_days):
-            bars_1m = await self.minute_bars_for_day(symbol, datetime(day.year, day.month, day.day, tzinfo=timezone.utc))
-            if bars_1m:
-                # aggregate to 5m
-                out, acc = [], []
-                for b in bars_1m:
-                    acc.append(b)
-                    if len(acc) == 5:
-                        out.append({
-                            "t": acc[-1]["t"],
-                            "o": acc[0]["o"],
-                            "h": max(x["h"] for x in acc),
-                            "l": min(x["l"] for x in acc),
-                            "c": acc[-1]["c"],
-                            "v": sum((x["v"] or 0) for x in acc),
-                        })
-                        acc = []
-                if acc:
-                    out.append({
-                        "t": acc[-1]["t"],
-                        "o": acc[0]["o"],
-                        "h": max(x["h"] for x in acc),
-                        "l": min(x["l"] for x in acc),
-                        "c": acc[-1]["c"],
-                        "v": sum((x["v"] or 0) for x in acc),
-                    })
-                return out
-            day = day - timedelta(days=1)
-        return []
+        The first call fetches the whole window; later calls only request bars
+        from the last stored minute (which is re-fetched, since it may still be
+        forming) and splice them on, so steady-state cost is one small request.
+        """
+        key = f"{symbol.upper()}:1m"
+        start = mcal.sessions_back(sessions)[0].pre_open
+        async with _lock(key):
+            ent = _MINUTES.get(key)
+            if ent and ent["start"] <= start and time.time() - ent["t"] < _MINUTES_TTL:
+                return ent["bars"].since(start)
+            now_ms = int(time.time() * 1000)
+            if ent and ent["start"] <= start and len(ent["bars"]):
+                old = ent["bars"]
+                frm = max(old.t[-1], start)
+                fresh = await self._minute_bars_range(symbol, frm, now_ms)
+                merged = old.since(start)
+                if len(fresh):
+                    keep = bisect_left(merged.t, fresh.t[0])
+                    merged = merged[:keep]
+                    merged.extend(fresh)
+            else:
+                merged = (await self._minute_bars_range(symbol, start, now_ms))[:]
+            _MINUTES[key] = {"start": start, "bars": merged, "t": time.time()}
+            return merged
+
+    async def daily_history(self, symbol: str, lookback: int = 8) -> Bars:
+        """Daily bars of completed sessions only; fetched once per trading date."""
+        key = symbol.upper()
+        day = mcal.eastern_date()
+        async with _lock(f"{key}:1d"):
+            ent = _DAILY.get(key)
+            if ent and ent["day"] == day and ent["lookback"] >= lookback:
+                return ent["bars"][-lookback:]
+            bars = await self.daily_bars(symbol, lookback=lookback)
+            bars = bars[:bisect_left(bars.t, mcal.midnight_ms(day))]
+            _DAILY[key] = {"day": day, "lookback": lookback, "bars": bars}
+            return bars[-lookback:]
+
+    # ---------- 1m for a specific date ----------
+    async def minute_bars_for_day(self, symbol: str, day: Union[date, datetime]) -> Bars:
+        """Session minutes for that calendar date; weekends/holidays return empty without a request."""
+        d = day.date() if isinstance(day, datetime) else day
+        return await self.minute_bars_session(symbol, mcal.session(d))
+
+    # ---------- previous trading session (calendar lookup, no probing) ----------
+    async def previous_session_minutes(self, symbol: str, max_sessions: int = 2) -> Tuple[Bars, Optional[mcal.Session]]:
+        """1m bars of the latest completed session; steps back a session only if one comes back empty."""
+        ref = None
+        for _ in range(max(1, max_sessions)):
+            sess = mcal.previous_session(ref)
+            bars = await self.minute_bars_session(symbol, sess)
+            if bars:
+                return bars, sess
+            ref = sess.day
+        return Bars(), None
+
+    async def five_minute_bars_prev_session(self, symbol: str) -> Bars:
+        bars, _ = await self.previous_session_minutes(symbol)
+        return resample(bars, "5m")
 
     # ---------- Daily bars ----------
-    async def daily_bars(self, symbol: str, lookback: int = 220) -> List[Dict[str, Any]]:
+    async def daily_bars(self, symbol: str, lookback: int = 220) -> Bars:
         now_ms = int(time.time() * 1000)
         frm = now_ms - max(lookback, 220) * 86_400_000
         mapped = self._map_index(symbol)
@@ -291,12 +362,9 @@ class PolygonMarket:
             {"adjusted": "true", "sort": "asc", "limit": 1000},
             cache_ttl=30,
         )
-        return [
-            {"t": b.get("t"), "o": b.get("o"), "h": b.get("h"), "l": b.get("l"), "c": b.get("c"), "v": b.get("v")}
-            for b in (j.get("results") or [])
-        ]
+        return _bars_of(j)
 
-    async def aggregate_bars(self, symbol: str, multiplier: int, timespan: str, lookback_days: int = 5) -> List[Dict[str, Any]]:
+    async def aggregate_bars(self, symbol: str, multiplier: int, timespan: str, lookback_days: int = 5) -> Bars:
         """Generic aggregates (e.g., 60-minute, 240-minute)."""
         now_ms = int(time.time() * 1000)
         frm = now_ms - max(1, lookback_days) * 86_400_000
@@ -306,10 +374,24 @@ class PolygonMarket:
             {"adjusted": "true", "sort": "asc", "limit": 5000},
             cache_ttl=15,
         )
-        return [
-            {"t": b.get("t"), "o": b.get("o"), "h": b.get("h"), "l": b.get("l"), "c": b.get("c"), "v": b.get("v")}
-            for b in (j.get("results") or [])
-        ]
+        return _bars_of(j)
+
+    # ---------- market-wide (one request for every ticker) ----------
+    async def grouped_daily(self, day: date) -> List[Dict[str, Any]]:
+        """Daily bars for all US stocks on one session date (rows carry T/o/h/l/c/v)."""
+        j = await self._get(
+            f"{BASE}/v2/aggs/grouped/locale/us/market/stocks/{day.isoformat()}",
+            {"adjusted": "true"},
+            cache_ttl=0,   # callers keep a compact per-date copy
+        )
+        rows = j.get("results") or []
+        return rows if isinstance(rows, list) else []
+
+    async def all_tickers_snapshot(self) -> List[Dict[str, Any]]:
+        """Full-market snapshot (today's day/prevDay/lastTrade per ticker)."""
+        j = await self._get(f"{BASE}/v2/snapshot/locale/us/markets/stocks/tickers", None, cache_ttl=0)
+        rows = j.get("tickers") or []
+        return rows if isinstance(rows, list) else []
 
     async def top_movers(self, limit: int = 10) -> List[Dict[str, Any]]:
         """Return combined top gainers/losers ranked by absolute % move."""
@@ -359,7 +441,7 @@ class PolygonMarket:
             if current is None or _score(row) > _score(current):
                 unique[sym] = row
 
-        ranked = sorted(unique.values(), key=_score, reverse=True)[:max(1, limit)]
+        ranked = top_k(unique.values(), max(1, limit), key=_score, reverse=True)
         return ranked
 
     # ---------- Options snapshot (v3) with pagination + OCC normalization ----------
@@ -383,6 +465,10 @@ class PolygonMarket:
         return None
 
     async def snapshot_option_chain(self, underlying: str, limit: int = 250, max_pages: int = 6) -> Dict[str, Any]:
+        key = ("polygon.option_chain", underlying.upper(), limit, max_pages)
+        return await memoized(key, lambda: self._snapshot_option_chain(underlying, limit, max_pages))
+
+    async def _snapshot_option_chain(self, underlying: str, limit: int, max_pages: int) -> Dict[str, Any]:
         per = min(max(1, limit), 250)
         url = f"{BASE}/v3/snapshot/options/{underlying.upper()}"
         params = {"limit": per}
@@ -391,7 +477,14 @@ class PolygonMarket:
 
         async with httpx.AsyncClient(timeout=self.timeout) as c:
             for _ in range(max_pages):
-                r = await c.get(_ensure_api_key(next_url) if next_url else url, params=None if next_url else _p(params))
+                try:
+                    timeout = _clamp_deadline(self.timeout)
+                except DeadlineExceeded:
+                    if not out:
+                        raise
+                    mark_timed_out(f"{underlying.upper()}.chain_pages")  # keep the pages we have
+                    break
+                r = await c.get(_ensure_api_key(next_url) if next_url else url, params=None if next_url else _p(params), timeout=timeout)
                 r.raise_for_status()
                 j = r.json() or {}
                 for x in (j.get("results") or []):
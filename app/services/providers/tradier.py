@@ -1,6 +1,8 @@
 from __future__ import annotations
 import os, httpx
 from typing import Dict, Any
+from app.utils.request_memo import memoized
+from app.utils.deadline import clamp as _clamp_deadline
 try:
     from app.services.rate_limiter import get_tradier_limiter
     _trad_rl = get_tradier_limiter()
@@ -46,12 +48,15 @@ class TradierMarket:
         }
 
     async def quote_last(self, symbol: str) -> Dict[str, Any]:
+        return await memoized(("tradier.quote", symbol.upper()), lambda: self._quote_last(symbol))
+
+    async def _quote_last(self, symbol: str) -> Dict[str, Any]:
         token = _resolve_token()
         if not token:
             raise TradierAuthError("Missing TRADIER_API_KEY / TRADIER_ACCESS_TOKEN")
         url = f"{_resolve_base()}/markets/quotes"
         params = {"symbols": symbol.upper()}
-        async with httpx.AsyncClient(timeout=self.timeout) as c:
+        async with httpx.AsyncClient(timeout=_clamp_deadline(self.timeout)) as c:
             if _trad_rl is not None:
                 await _trad_rl.wait(1.0)
             r = await c.get(url, headers=self._headers(), params=params)
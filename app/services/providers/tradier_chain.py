@@ -6,6 +6,8 @@ try:
 except Exception:
     _trad_rl = None
 from typing import List, Dict, Any
+from app.utils.request_memo import request_memo
+from app.utils.deadline import clamp as _clamp_deadline
 
 ENV = (os.getenv("TRADIER_ENV") or "prod").lower()  # "prod" or "sandbox"
 BASE = "https://api.tradier.com/v1" if ENV=="prod" else "https://sandbox.tradier.com/v1"
@@ -17,10 +19,11 @@ def _hdrs():
         auth = f"Bearer {auth}"
     return {"Authorization": auth, "Accept": "application/json"}
 
+@request_memo(lambda symbol, expiry, greeks=True: (symbol.upper(), str(expiry), bool(greeks)))
 async def options_chain(symbol: str, expiry: str, greeks: bool=True) -> List[Dict[str, Any]]:
     url = f"{BASE}/markets/options/chains"
     params = {"symbol": symbol.upper(), "expiration": expiry, "greeks": "true" if greeks else "false"}
-    async with httpx.AsyncClient(timeout=12.0) as c:
+    async with httpx.AsyncClient(timeout=_clamp_deadline(12.0)) as c:
         if _trad_rl is not None:
             await _trad_rl.wait(1.0)
         r = await c.get(url, headers=_hdrs(), params=params)
@@ -47,7 +50,7 @@ async def expirations(symbol: str) -> List[str]:
     """Return a list of ISO date strings for available expirations."""
     url = f"{BASE}/markets/options/expirations"
     params = {"symbol": symbol.upper(), "includeAllRoots": "true", "strikes": "false"}
-    async with httpx.AsyncClient(timeout=10.0) as c:
+    async with httpx.AsyncClient(timeout=_clamp_deadline(10.0)) as c:
         if _trad_rl is not None:
             await _trad_rl.wait(1.0)
         r = await c.get(url, headers=_hdrs(), params=params)
@@ -3,6 +3,8 @@ from __future__ import annotations
 import os, asyncio, time
 from typing import Dict
 
+from app.utils.deadline import DeadlineExceeded, remaining
+
 
 class RateLimiter:
     """Simple async token-bucket limiter for in-process rate limiting.
@@ -32,6 +34,10 @@ class RateLimiter:
                     return
                 # sleep for remaining time needed to earn tokens
                 need = (cost - self._tokens) / self.rate
+                left = remaining()
+                if left is not None and need > left:
+                    # Give the slot to callers that can still use it
+                    raise DeadlineExceeded("rate limiter wait exceeds request deadline")
                 await asyncio.sleep(max(0.0, need))
 
 
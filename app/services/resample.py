@@ -0,0 +1,182 @@
+"""
+Wall-clock bar resampler: 1m bars -> 5m/15m/30m/1h/4h/session.
+
+Buckets are aligned to US/Eastern clock boundaries (09:30-09:35, 10:00-11:00,
+...), not to bar counts, so a missing minute never shifts later buckets.
+Each output bar is stamped with its bucket start, like Polygon aggregates.
+Uses NumPy when installed (one reduceat per field); otherwise a single pass.
+"""
+from __future__ import annotations
+
+import math
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from app.utils.bars import FIELDS, Bars, as_bars
+from app.services import market_calendar as mcal
+
+try:
+    import numpy as np
+except Exception:  # pragma: no cover - optional dependency
+    np = None
+
+_EASTERN = ZoneInfo("America/New_York")
+_MIN_MS = 60_000
+_DAY_MS = 86_400_000
+
+# interval -> bucket width in minutes ("session" = one bar per RTH session)
+INTERVALS: Dict[str, int] = {
+    "1m": 1, "5m": 5, "15m": 15, "30m": 30, "1h": 60, "4h": 240, "session": 0,
+}
+
+_ALIASES = {"60m": "1h", "240m": "4h", "1d": "session", "day": "session"}
+
+
+def normalize_interval(interval: str) -> Optional[str]:
+    iv = (interval or "").strip().lower()
+    iv = _ALIASES.get(iv, iv)
+    return iv if iv in INTERVALS else None
+
+
+# UTC offset (ms) per Eastern calendar day; DST only flips between days.
+_OFFSETS: Dict[int, int] = {}
+
+
+def _et_offset_ms(t_ms: int) -> int:
+    day = t_ms // _DAY_MS
+    off = _OFFSETS.get(day)
+    if off is None:
+        noon = datetime.fromtimestamp((day * _DAY_MS + _DAY_MS // 2) / 1000, tz=timezone.utc)
+        off = _OFFSETS[day] = int(noon.astimezone(_EASTERN).utcoffset().total_seconds() * 1000)
+    return off
+
+
+def _bucket_start(t_ms: int, width_ms: int) -> int:
+    off = _et_offset_ms(t_ms)
+    local = t_ms + off
+    return local - (local % width_ms) - off
+
+
+# Regular-hours (open, close) per UTC day; RTH never spans UTC midnight, so the
+# UTC date is the session date. Early closes and holidays come from the calendar.
+_RTH: Dict[int, Tuple[int, int]] = {}
+
+
+def _rth_window(day: int) -> Tuple[int, int]:
+    w = _RTH.get(day)
+    if w is None:
+        d = datetime.fromtimestamp(day * _DAY_MS / 1000, tz=timezone.utc).date()
+        sess = mcal.session(d)
+        w = _RTH[day] = (sess.open, sess.close) if sess else (0, 0)
+    return w
+
+
+def _is_rth(t_ms: int) -> bool:
+    lo, hi = _rth_window(t_ms // _DAY_MS)
+    return lo <= t_ms < hi
+
+
+def bucket_keys(bars: Bars, interval: str) -> List[int]:
+    """Bucket start (UTC ms) for each bar."""
+    width = INTERVALS[interval]
+    w = _DAY_MS if width == 0 else width * _MIN_MS
+    return [_bucket_start(t, w) for t in bars.t]
+
+
+def _bucket_keys_np(t: "np.ndarray", interval: str) -> "np.ndarray":
+    # one offset lookup per UTC day instead of per bar
+    width = INTERVALS[interval]
+    w = _DAY_MS if width == 0 else width * _MIN_MS
+    days, inv = np.unique(t // _DAY_MS, return_inverse=True)
+    off = np.array([_et_offset_ms(int(d) * _DAY_MS) for d in days], dtype=np.int64)[inv]
+    local = t + off
+    return local - (local % w) - off
+
+
+def _rth_mask_np(t: "np.ndarray") -> "np.ndarray":
+    days, inv = np.unique(t // _DAY_MS, return_inverse=True)
+    win = np.array([_rth_window(int(d)) for d in days], dtype=np.int64)[inv]
+    return (t >= win[:, 0]) & (t < win[:, 1])
+
+
+def _merge_py(bars: Bars, keys: List[int]) -> Bars:
+    out = Bars()
+    nan = math.isnan
+    cur_key = None
+    for i, k in enumerate(keys):
+        o, h, l, c, v = bars.o[i], bars.h[i], bars.l[i], bars.c[i], bars.v[i]
+        v = 0.0 if nan(v) else v
+        if k != cur_key:
+            out.append(k, o, h, l, c, v)
+            cur_key = k
+            continue
+        j = len(out) - 1
+        if not nan(h):
+            out.h[j] = h if nan(out.h[j]) else max(out.h[j], h)
+        if not nan(l):
+            out.l[j] = l if nan(out.l[j]) else min(out.l[j], l)
+        if not nan(c):
+            out.c[j] = c
+        out.v[j] += v
+    return out
+
+
+def _merge_np(t: "np.ndarray", cols: Dict[str, "np.ndarray"], k: "np.ndarray") -> Bars:
+    starts = np.flatnonzero(np.r_[True, k[1:] != k[:-1]])
+    ends = np.r_[starts[1:], len(k)] - 1
+    with np.errstate(invalid="ignore"):
+        hh = np.fmax.reduceat(cols["h"], starts)
+        ll = np.fmin.reduceat(cols["l"], starts)
+    vv = np.add.reduceat(np.nan_to_num(cols["v"]), starts)
+    # close = last non-missing close in the bucket
+    c = cols["c"]
+    last = np.maximum.accumulate(np.where(np.isnan(c), -1, np.arange(len(c))))[ends]
+    cc = np.where(last >= starts, c[np.maximum(last, 0)], np.nan)
+    return Bars.from_columns(t=k[starts], o=cols["o"][starts], h=hh, l=ll, c=cc, v=vv)
+
+
+def _resample_np(src: Bars, iv: str, rth: bool) -> Bars:
+    t = np.frombuffer(src.t, dtype=np.int64)
+    cols = {f: np.frombuffer(getattr(src, f), dtype=np.float64) for f in FIELDS[1:]}
+    if rth:
+        m = _rth_mask_np(t)
+        t = t[m]
+        cols = {f: a[m] for f, a in cols.items()}
+    if not len(t):
+        return Bars()
+    if iv == "1m":
+        return Bars.from_columns(t=t, **cols)
+    return _merge_np(t, cols, _bucket_keys_np(t, iv))
+
+
+def resample(bars: Any, interval: str, rth_only: bool = False) -> Bars:
+    """
+    Resample ascending 1m bars (Bars or {t,o,h,l,c,v} dicts) to `interval`.
+    'session' always keeps regular-hours bars only; set rth_only to drop
+    pre/post-market minutes for intraday intervals too.
+    """
+    iv = normalize_interval(interval)
+    if iv is None:
+        raise ValueError(f"unsupported interval: {interval}")
+    src = as_bars(bars)
+    rth = iv == "session" or rth_only
+    if np is not None and len(src) > 64:
+        return _resample_np(src, iv, rth)
+    if rth:
+        keep = [i for i, t in enumerate(src.t) if _is_rth(t)]
+        src = Bars.from_columns(**{f: [getattr(src, f)[i] for i in keep] for f in FIELDS})
+    if not len(src) or iv == "1m":
+        return src[:]
+    return _merge_py(src, bucket_keys(src, iv))
+
+
+def resample_many(bars: Any, intervals: List[str], rth_only: bool = False) -> Dict[str, Bars]:
+    """Derive several timeframes from one 1m series."""
+    src = as_bars(bars)
+    return {iv: resample(src, iv, rth_only=rth_only) for iv in intervals}
+
+
+def session_slice(bars: Any, day_start_ms: int) -> Bars:
+    """Bars at or after `day_start_ms` (e.g. today's part of a multi-day 1m series)."""
+    return as_bars(bars).since(day_start_ms)
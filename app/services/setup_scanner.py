@@ -5,7 +5,8 @@ import math
 import time
 import os
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from urllib.parse import quote
 
 try:
@@ -17,6 +18,20 @@ try:
 except Exception:
     _td_options_chain = None  # type: ignore
     _td_expirations = None  # type: ignore
+from app.utils.topk import top_k
+from app.services.indicators_batch import universe_indicators
+from app.services.resample import resample_many, session_slice
+from app.services import market_calendar as mcal
+from app.services.universe import prefilter_candidates
+from app.services.expirations import get_expirations, pick_expiry
+from app.utils.request_memo import detached_task
+from app.services.admission import Overloaded, admit
+from app.utils.bars import Bars
+from app.engine.options_scoring import (
+    ChainArrays as _ChainArrays,
+    SCANNER_PROFILE as _SCANNER_PROFILE,
+    composite_scores as _composite_scores,
+)
 try:
     from app.services.indicators import spread_stability as _spread_stability
 except Exception:
@@ -43,8 +58,25 @@ class _TimeframeState:
     distance: Optional[float]
 
 
-_CACHE: Dict[str, Tuple[float, List[Dict[str, Any]]]] = {}
+# cache_key -> (as_of, ranked setups, {"timed_out": [...], "options_timed_out": [...]})
+_CACHE: Dict[str, Tuple[float, List[Dict[str, Any]], Dict[str, Any]]] = {}
 _CACHE_TTL = 45  # seconds
+# Per-symbol deadlines (seconds): a late snapshot drops the symbol, late options
+# leave it without an options summary. Either way the scan does not wait on it.
+_SNAPSHOT_DEADLINE = float(os.getenv("SETUP_SCAN_SNAPSHOT_DEADLINE", "6"))
+_OPTIONS_DEADLINE = float(os.getenv("SETUP_SCAN_OPTIONS_DEADLINE", "8"))
+_STALE_MAX = float(os.getenv("SETUP_SCAN_STALE_MAX", "1800"))  # serve-stale ceiling (seconds)
+_INFLIGHT: Dict[str, "asyncio.Task"] = {}
+# Candidates passed from the universe prefilter to full per-symbol analysis:
+# max(5, limit + 3) unless SETUP_SCAN_DEEP_N raises it
+_DEEP_SCAN_N = int(os.getenv("SETUP_SCAN_DEEP_N", "0"))
+# Scheduler cadence per market phase (seconds)
+_SCHEDULE_INTERVALS: Dict[str, float] = {
+    "rth": float(os.getenv("SETUP_SCAN_INTERVAL_RTH", "60")),
+    "pre": float(os.getenv("SETUP_SCAN_INTERVAL_EXT", "300")),
+    "post": float(os.getenv("SETUP_SCAN_INTERVAL_EXT", "300")),
+    "closed": float(os.getenv("SETUP_SCAN_INTERVAL_CLOSED", "1800")),
+}
 _PUBLIC_BASE = os.getenv("PUBLIC_BASE_URL", "") or "https://web-production-a9084.up.railway.app"
 _BLUE_CHIP = {
     "SPY", "QQQ", "IWM", "DIA", "AAPL", "MSFT", "GOOGL", "GOOG", "NVDA", "META", "TSLA", "AMD", "AMZN", "NFLX"
@@ -99,23 +131,49 @@ def _round(val: Optional[float], decimals: int = 2) -> Optional[float]:
     return round(val, decimals)
 
 
-async def _symbol_snapshot(poly: PolygonMarket, sym: str, mover_meta: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-    try:
-        last_trade = await poly.last_trade(sym)
-        last_price = _safe_float(last_trade.get("price"))
-    except Exception:
-        last_trade = {}
-        last_price = None
-
-    daily_bars, h4_bars, h1_bars, intraday_minutes = await asyncio.gather(
-        poly.daily_bars(sym, lookback=8),
-        poly.aggregate_bars(sym, multiplier=240, timespan="minute", lookback_days=10),
-        poly.aggregate_bars(sym, multiplier=60, timespan="minute", lookback_days=5),
-        poly.minute_bars_today(sym),
+def _day_bar(minutes: Bars, day_ms: int) -> Optional[Bars]:
+    """Today's daily bar (all session minutes) built locally from the 1m feed."""
+    if not len(minutes):
+        return None
+    hs = [x for x in minutes.h if not math.isnan(x)]
+    ls = [x for x in minutes.l if not math.isnan(x)]
+    cs = [x for x in minutes.c if not math.isnan(x)]
+    opens = [x for x in minutes.o if not math.isnan(x)]
+    if not cs:
+        return None
+    bar = Bars()
+    bar.append(
+        day_ms, opens[0] if opens else None, max(hs) if hs else None, min(ls) if ls else None,
+        cs[-1], sum(x for x in minutes.v if not math.isnan(x)),
     )
+    return bar
 
-    if not last_price and intraday_minutes:
-        last_price = _safe_float(intraday_minutes[-1].get("c"))
+
+async def _symbol_snapshot(poly: PolygonMarket, sym: str, mover_meta: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    # One incrementally refreshed 1m feed serves H4/H1 (wall-clock buckets), today's
+    # minutes, today's daily bar and the last price; completed daily history is
+    # fetched once per trading date. Steady state: one small request per symbol.
+    daily_hist, minutes_hist = await asyncio.gather(
+        poly.daily_history(sym, lookback=8),
+        poly.minute_series(sym, sessions=10),
+    )
+    frames = resample_many(minutes_hist, ["4h", "1h"])
+    h4_bars = frames["4h"]
+    h1_bars = frames["1h"].since(mcal.sessions_back(5)[0].pre_open)
+    today = mcal.today()
+    intraday_minutes = session_slice(minutes_hist, today.pre_open) if today else Bars()
+
+    daily_bars = daily_hist
+    today_bar = _day_bar(intraday_minutes, mcal.midnight_ms(today.day)) if today else None
+    if today_bar is not None:
+        daily_bars = daily_hist[:]
+        daily_bars.extend(today_bar)
+
+    last_price = None
+    if len(minutes_hist):
+        last_price = _safe_float(minutes_hist[-1].get("c"))
+    if not last_price:
+        last_price = _safe_float(mover_meta.get("last"))
 
     tf_daily = _tf_state(daily_bars, last_price, breakout_buffer=0.003)
     tf_h4 = _tf_state(h4_bars, last_price, breakout_buffer=0.0025)
@@ -200,6 +258,7 @@ async def _symbol_snapshot(poly: PolygonMarket, sym: str, mover_meta: Dict[str,
             "trend": round(trend_score, 3),
         },
         "base_confidence": base_confidence,
+        "_minutes": intraday_minutes,
         "notes": {
             "price": price_notes,
             "rvol": [rvol_note] if rvol_note else [],
@@ -208,18 +267,6 @@ async def _symbol_snapshot(poly: PolygonMarket, sym: str, mover_meta: Dict[str,
     }
 
 
-async def _pick_near_atm(rows: List[Dict[str, Any]], last: float, topK: int = 3) -> List[Dict[str, Any]]:
-    if not rows or last is None:
-        return []
-    def k(r):
-        try:
-            return abs(float(r.get('strike')) - float(last))
-        except Exception:
-            return 1e9
-    out = sorted(rows, key=k)[:max(1, topK)]
-    return out
-
-
 async def _nbbo_enrich(poly: PolygonMarket, occ_syms: List[str], samples: int = 2, interval: float = 0.3) -> Dict[str, Dict[str, Any]]:
     res: Dict[str, Dict[str, Any]] = {s: {} for s in occ_syms}
     if not poly or not occ_syms:
@@ -243,66 +290,28 @@ async def _nbbo_enrich(poly: PolygonMarket, occ_syms: List[str], samples: int =
     return res
 
 
-def _options_score(row: Dict[str, Any]) -> float:
-    try:
-        sp = float(row.get('spread_pct') or 12.0)
-        st = float(row.get('spread_stability') or 0.5)
-        d = abs(float(row.get('delta') or 0.45))
-        ivp = float(row.get('iv_percentile') or 50.0)
-        oi = float(row.get('oi') or 0.0); vol = float(row.get('volume') or 0.0)
-        sp_s = 1.0 - min(1.0, sp/12.0)
-        d_s = 1.0 - min(1.0, abs(d - 0.45))
-        iv_s = 1.0 - min(1.0, abs(ivp-50.0)/50.0)
-        liq_s = min(1.0, oi/1500.0 + vol/6000.0)
-        score = st*0.30 + sp_s*0.20 + d_s*0.25 + iv_s*0.10 + liq_s*0.15
-        return round(max(0.0, min(1.0, score))*100.0, 1)
-    except Exception:
-        return 0.0
+def _rank_expiry(rows: List[Dict[str, Any]], topK: int = 4) -> List[Dict[str, Any]]:
+    """Score every contract in the expiry in one batch and return the best `topK` candidates."""
+    if not rows:
+        return []
+    scores = _composite_scores(_ChainArrays.from_rows(rows), _SCANNER_PROFILE)
+    order = top_k(range(len(rows)), max(1, topK), key=scores.__getitem__, reverse=True)
+    return [rows[i] for i in order]
 
 
 async def _options_summary(poly: PolygonMarket, symbol: str, last: Optional[float]) -> Optional[Dict[str, Any]]:
     if _td_expirations is None or _td_options_chain is None:
         return None
     try:
-        exps = await _td_expirations(symbol)
+        exps = await get_expirations(symbol)
     except Exception:
         return None
     if not exps:
         return None
-    # choose expiries by horizon
+    # choose expiries by horizon, locally against the day's cached list
     from datetime import date
     today = date.today()
-    def _pick_date(target_days_min: int, target_days_max: int, prefer: Optional[str] = None) -> Optional[str]:
-        candidates = []
-        for e in exps:
-            try:
-                dd = date.fromisoformat(e)
-                days = (dd - today).days
-                if days >= target_days_min and days <= target_days_max:
-                    weight = abs(days - ((target_days_min + target_days_max)/2.0))
-                    if prefer and dd.strftime('%b').lower().startswith(prefer.lower()[:3]):
-                        weight *= 0.6
-                    candidates.append((weight, days, e))
-            except Exception:
-                continue
-        if not candidates:
-            # fallback to nearest above min
-            above = []
-            for e in exps:
-                try:
-                    dd = date.fromisoformat(e)
-                    days = (dd - today).days
-                    if days >= target_days_min:
-                        weight = abs(days - target_days_min)
-                        if prefer and dd.strftime('%b').lower().startswith(prefer.lower()[:3]):
-                            weight *= 0.7
-                        above.append((weight, days, e))
-                except Exception:
-                    continue
-            if above:
-                return sorted(above, key=lambda x: x[0])[0][2]
-            return None
-        return sorted(candidates, key=lambda x: x[0])[0][2]
+    _pick_date = lambda lo, hi, prefer=None: pick_expiry(exps, lo, hi, prefer_month=prefer, today=today)
 
     leap_prefer_months = ["jan", "mar", "jun", "sep", "dec"]
     leap_exp = None
@@ -319,29 +328,38 @@ async def _options_summary(poly: PolygonMarket, symbol: str, last: Optional[floa
         'swing': _pick_date(30, 150),       # ~1–5 months
         'leaps': leap_exp,                  # prefer official LEAP cycle
     }
-    out: Dict[str, Any] = {}
+    # Horizons that resolve to the same expiry (scalp/intraday usually do) share one chain
+    by_exp: Dict[str, List[str]] = {}
     for hz, exp in targets.items():
-        if not exp:
-            continue
-        try:
-            rows = await _td_options_chain(symbol, expiry=exp, greeks=True)
-        except Exception:
-            continue
-        picks = await _pick_near_atm(rows, last or 0.0, topK=4)
-        # only sample a couple of candidates for nbbo
-        occs = [p.get('symbol') for p in picks if p.get('symbol')][:4]
-        nbbo = await _nbbo_enrich(poly, occs) if occs else {}
-        best = None
-        best_score = -1.0
+        if exp:
+            by_exp.setdefault(exp, []).append(hz)
+    if not by_exp:
+        return None
+
+    async def _leaders(exp: str) -> List[Dict[str, Any]]:
+        # Rank the whole expiry, then NBBO-sample only the leaders
+        rows = await _td_options_chain(symbol, expiry=exp, greeks=True)
+        return _rank_expiry(rows, topK=4)
+
+    exps_list = list(by_exp)
+    chains = await asyncio.gather(*[_leaders(e) for e in exps_list], return_exceptions=True)
+    picks_by_exp = {e: c for e, c in zip(exps_list, chains) if isinstance(c, list)}
+    # One NBBO sample set across every expiry's leaders
+    occs = list(dict.fromkeys(p.get('symbol') for picks in picks_by_exp.values() for p in picks[:4] if p.get('symbol')))
+    nbbo = await _nbbo_enrich(poly, occs) if occs else {}
+
+    out: Dict[str, Any] = {}
+    for exp, picks in picks_by_exp.items():
         for p in picks:
             sym = p.get('symbol')
             if sym in nbbo:
                 p.update(nbbo[sym])
-            sc = _options_score(p)
-            if sc > best_score:
-                best_score = sc
-                best = p.copy()
-                best['options_score'] = sc
+        best = None
+        if picks:
+            scores = _composite_scores(_ChainArrays.from_rows(picks), _SCANNER_PROFILE)
+            i_best = max(range(len(picks)), key=lambda i: scores[i])
+            best = picks[i_best].copy()
+            best['options_score'] = round(scores[i_best]*100.0, 1)
         if best:
             entry = {
                 'symbol': best.get('symbol'),
@@ -359,13 +377,15 @@ async def _options_summary(poly: PolygonMarket, symbol: str, last: Optional[floa
                 'options_score': best.get('options_score'),
             }
             try:
-                from datetime import date
                 exp_dt = date.fromisoformat(entry['expiry'])
                 entry['days_to_exp'] = (exp_dt - today).days
                 entry['expiry_display'] = exp_dt.strftime('%b %d, %Y')
             except Exception:
                 pass
-            out[hz] = entry
+            for hz in by_exp[exp]:
+                out[hz] = dict(entry)
+    # keep the horizon order callers expect
+    out = {hz: out[hz] for hz in targets if hz in out}
     return out or None
 
 
@@ -465,6 +485,102 @@ def _options_grade(score: Optional[float]) -> Optional[str]:
     return "D"
 
 
+def _attach_intraday(results: List[Dict[str, Any]]) -> None:
+    """Session VWAP/sigma/RVOL/EMA/RSI for all scanned symbols in one batch call."""
+    series = {r["symbol"]: r.pop("_minutes", None) or [] for r in results if r.get("symbol")}
+    try:
+        ind = universe_indicators(series)
+    except Exception:
+        return
+    for r in results:
+        row = ind.get(r.get("symbol")) or {}
+        if not series.get(r.get("symbol")):
+            continue
+        vwap = row.get("vwap")
+        price = _safe_float(r.get("price"))
+        r["intraday"] = {
+            "vwap": vwap,
+            "sigma_tp": row.get("sigma_tp"),
+            "rvol5": row.get("rvol5"),
+            "ema20": row.get("ema20"),
+            "rsi": row.get("rsi"),
+            "above_vwap": (price > vwap) if (price is not None and vwap is not None) else None,
+        }
+
+
+def _cache_key(limit: int, include_options: bool, symbols: Optional[List[str]], strict: bool, min_confidence: int) -> str:
+    sym_key = ",".join(sorted([s.upper() for s in (symbols or [])])) if symbols else "auto"
+    return f"top:{limit}:opts:{1 if include_options else 0}:syms:{sym_key}:strict:{1 if strict else 0}:minc:{min_confidence}"
+
+
+def _fresh_ttl() -> float:
+    """Results stay fresh for one scheduler cycle of the current market phase."""
+    ph = mcal.phase()
+    return _CACHE_TTL if ph == "rth" else _SCHEDULE_INTERVALS.get(ph, _CACHE_TTL)
+
+
+async def _scan_shared(cache_key: str, params: Dict[str, Any]) -> Tuple[float, List[Dict[str, Any]], Dict[str, Any]]:
+    """Single-flight scan: concurrent callers (and the scheduler) share one run.
+    The run holds a market.setups slot for as long as it lasts, whoever is still
+    waiting on it; Overloaded reaches every caller when the gate sheds it."""
+    task = _INFLIGHT.get(cache_key)
+    if task is None or task.done():
+        async def _run() -> Tuple[float, List[Dict[str, Any]], Dict[str, Any]]:
+            try:
+                async with admit("market.setups"):
+                    ranked, report = await _run_scan(**params)
+                entry = (time.time(), ranked, report)
+                _CACHE[cache_key] = entry
+                return entry
+            finally:
+                _INFLIGHT.pop(cache_key, None)
+        task = _INFLIGHT[cache_key] = detached_task(_run())
+    return await asyncio.shield(task)
+
+
+async def get_setups(
+    limit: int = 10,
+    include_options: bool = False,
+    symbols: Optional[List[str]] = None,
+    strict: bool = True,
+    min_confidence: int = 70,
+) -> Dict[str, Any]:
+    """
+    Ranked setups plus freshness: {"setups", "as_of", "stale", "timed_out",
+    "options_timed_out"} (the last two list symbols cut by their deadline).
+    Stale-while-revalidate: a result older than the fresh window (but within
+    _STALE_MAX) is served immediately while one background rescan runs. When the
+    scan gate is saturated an expired result is served with "shed": True.
+    """
+    if PolygonMarket is None:
+        return {"setups": [], "as_of": None, "stale": False, "timed_out": [], "options_timed_out": [], "shed": False}
+    params = dict(limit=limit, include_options=include_options, symbols=symbols, strict=strict, min_confidence=min_confidence)
+    key = _cache_key(**params)
+    cached = _CACHE.get(key)
+    age = time.time() - cached[0] if cached else None
+    shed = False
+    if cached is None or age > _STALE_MAX:
+        try:
+            # Joining a scan already in flight costs nothing; starting one needs a slot
+            cached = await _scan_shared(key, params)
+            age = 0.0
+        except Overloaded:
+            if cached is None:
+                raise
+            shed = True  # saturated: serve the expired result rather than nothing
+    elif age >= _fresh_ttl() and key not in _INFLIGHT:
+        task = detached_task(_scan_shared(key, params))
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+    return {
+        "setups": cached[1],
+        "as_of": datetime.fromtimestamp(cached[0], tz=timezone.utc).isoformat(),
+        "stale": age >= _fresh_ttl(),
+        "timed_out": cached[2].get("timed_out", []),
+        "options_timed_out": cached[2].get("options_timed_out", []),
+        "shed": shed,
+    }
+
+
 async def scan_top_setups(
     limit: int = 10,
     include_options: bool = False,
@@ -472,246 +588,229 @@ async def scan_top_setups(
     strict: bool = True,
     min_confidence: int = 70,
 ) -> List[Dict[str, Any]]:
-    if PolygonMarket is None:
-        return []
-    sym_key = ",".join(sorted([s.upper() for s in (symbols or [])])) if symbols else "auto"
-    cache_key = f"top:{limit}:opts:{1 if include_options else 0}:syms:{sym_key}:strict:{1 if strict else 0}:minc:{min_confidence}"
-    now = time.time()
-    cached = _CACHE.get(cache_key)
-    if cached and now - cached[0] < _CACHE_TTL:
-        return cached[1]
+    res = await get_setups(limit=limit, include_options=include_options, symbols=symbols, strict=strict, min_confidence=min_confidence)
+    return res["setups"]
 
-    poly = PolygonMarket()
+
+async def _candidates(poly: Any, limit: int, symbols: Optional[List[str]]) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """Symbols to analyse in depth plus their mover/prefilter metadata."""
     if symbols:
         unique_symbols = [s.upper() for s in symbols if s]
         movers = [{"symbol": s} for s in unique_symbols]
     else:
+        # Stage one: score the whole liquid universe from market-wide data, then
+        # only the best max(5, limit + 3) names (or SETUP_SCAN_DEEP_N) get per-symbol snapshots and options.
         try:
-            movers = await poly.top_movers(limit=max(10, limit * 2))
+            movers = await prefilter_candidates(poly, max(5, limit + 3, _DEEP_SCAN_N))
         except Exception:
             movers = []
+        if not movers:
+            try:
+                movers = await poly.top_movers(limit=max(10, limit * 2))
+            except Exception:
+                movers = []
         sym_list = [m.get("symbol") for m in movers if m.get("symbol")]
         unique_symbols: List[str] = []
         for s in sym_list:
             if s not in unique_symbols:
                 unique_symbols.append(s)
-        unique_symbols = unique_symbols[: max(5, limit + 3)]
-
-    results: List[Dict[str, Any]] = []
-    sem = asyncio.Semaphore(5)
-
-    async def _worker(sym: str, meta: Dict[str, Any]):
-        async with sem:
-            try:
-                data = await _symbol_snapshot(poly, sym, meta)
-                if data:
-                    results.append(data)
-            except Exception:
-                return
+        unique_symbols = unique_symbols[: max(5, limit + 3, _DEEP_SCAN_N)]
+
+    return unique_symbols, movers
+
+
+def _score_item(item: Dict[str, Any], include_options: bool) -> Optional[Dict[str, Any]]:
+    """Final confidence, preferred option, chart params and notes for one snapshot (None = drop)."""
+    price = _safe_float(item.get('price')) or 0.0
+    components = item.get('components') or {}
+    alignment_score = float(components.get('alignment') or 0.0)
+    price_liq_score = float(components.get('price_liquidity') or 0.0)
+    rvol_score = float(components.get('rvol') or 0.0)
+    trend_score = float(components.get('trend') or 0.0)
+
+    options_component = 0.0
+    option_best_note = None
+    option_grade_best = None
+    horizon_hits: List[str] = []
+
+    opts = item.get('options') if include_options else None
+    preferred_payload = None
+    preferred_weight = -1.0
+    if isinstance(opts, dict):
+        for horizon, payload in list(opts.items()):
+            if not isinstance(payload, dict):
+                continue
+            sc = payload.get('options_score')
+            grade = _options_grade(sc)
+            if grade:
+                payload['grade'] = grade
+            bid = payload.get('bid'); ask = payload.get('ask')
+            if bid is not None and ask is not None and ask > 0:
+                try:
+                    spread_pct = ((ask - bid)/ask)*100.0
+                    payload.setdefault('spread_pct', round(spread_pct, 2))
+                except Exception:
+                    pass
+            if sc is not None:
+                val = max(0.0, min(1.0, float(sc)/100.0))
+                if horizon in ('scalp','intraday'):
+                    weight = 1.05 if horizon == 'scalp' else 1.0
+                elif horizon == 'swing':
+                    weight = 0.9
+                else:  # leaps
+                    weight = 0.75
+                weighted = val * weight
+                if weighted > options_component:
+                    options_component = weighted
+                    option_best_note = f"{horizon} {grade or ''}".strip()
+                    option_grade_best = grade
+                if grade in {'A','B'}:
+                    horizon_hits.append(f"{horizon}:{grade}")
+                if weighted > preferred_weight:
+                    preferred_weight = weighted
+                    preferred_payload = {k: v for k, v in payload.items()}
+                    preferred_payload['horizon'] = horizon
+        if preferred_payload:
+            item['preferred_option'] = preferred_payload
+    else:
+        item['preferred_option'] = None
+
+    # Penalize if no tradable options and price is low
+    if options_component == 0.0 and price < 5:
+        options_component = 0.25
+
+    base_confidence = float(item.get('base_confidence') or 0.0)
+    final_confidence = (
+        min(1.0, alignment_score) * 0.40
+        + min(1.0, price_liq_score) * 0.20
+        + min(1.0, options_component) * 0.25
+        + min(1.0, rvol_score) * 0.1
+        + min(1.0, trend_score) * 0.05
+    )
 
-    await asyncio.gather(*[_worker(sym, next((m for m in movers if m.get("symbol") == sym), {})) for sym in unique_symbols])
-    # Enrich with options summaries if requested
-    if include_options and PolygonMarket is not None and _td_expirations is not None:
-        poly2 = PolygonMarket()
-        async def _enrich(item: Dict[str, Any]):
-            try:
-                sym = item.get('symbol')
-                last = item.get('price')
-                opts = await _options_summary(poly2, sym, last)
-                if opts:
-                    item['options'] = opts
-            except Exception:
-                return
-        await asyncio.gather(*[_enrich(r) for r in results])
+    # Adjust for penny risk
+    if price < 3:
+        final_confidence *= 0.65
+    elif price < 5:
+        final_confidence *= 0.8
+
+    confidence_pct = int(_clamp(round(final_confidence * 100)))
+    if confidence_pct >= 80:
+        grade = "High"
+    elif confidence_pct >= 65:
+        grade = "Moderate"
+    else:
+        grade = "Cautious"
 
-    processed: List[Dict[str, Any]] = []
-    for item in results:
-        price = _safe_float(item.get('price')) or 0.0
-        components = item.get('components') or {}
-        alignment_score = float(components.get('alignment') or 0.0)
-        price_liq_score = float(components.get('price_liquidity') or 0.0)
-        rvol_score = float(components.get('rvol') or 0.0)
-        trend_score = float(components.get('trend') or 0.0)
-
-        options_component = 0.0
-        option_best_note = None
-        option_grade_best = None
-        horizon_hits: List[str] = []
-
-        opts = item.get('options') if include_options else None
-        preferred_payload = None
-        preferred_weight = -1.0
+    # Build confidence note
+    notes: List[str] = []
+    if item.get('alignment_tags'):
+        notes.append(", ".join(item['alignment_tags']))
+    for entry in item.get('notes', {}).get('price', []):
+        notes.append(entry)
+    rv_note = item.get('notes', {}).get('rvol', [])
+    if rv_note:
+        notes.extend(rv_note)
+    tr_note = item.get('notes', {}).get('trend', [])
+    if tr_note:
+        notes.extend(tr_note)
+    if option_best_note:
+        notes.append(f"Options {option_best_note}")
+    notes = [n for n in notes if n]
+
+    # Apply guardrails for thin options
+    if include_options:
+        tradable = False
         if isinstance(opts, dict):
-            for horizon, payload in list(opts.items()):
-                if not isinstance(payload, dict):
-                    continue
-                sc = payload.get('options_score')
-                grade = _options_grade(sc)
-                if grade:
-                    payload['grade'] = grade
-                bid = payload.get('bid'); ask = payload.get('ask')
-                if bid is not None and ask is not None and ask > 0:
-                    try:
-                        spread_pct = ((ask - bid)/ask)*100.0
-                        payload.setdefault('spread_pct', round(spread_pct, 2))
-                    except Exception:
-                        pass
-                if sc is not None:
-                    val = max(0.0, min(1.0, float(sc)/100.0))
-                    if horizon in ('scalp','intraday'):
-                        weight = 1.05 if horizon == 'scalp' else 1.0
-                    elif horizon == 'swing':
-                        weight = 0.9
-                    else:  # leaps
-                        weight = 0.75
-                    weighted = val * weight
-                    if weighted > options_component:
-                        options_component = weighted
-                        option_best_note = f"{horizon} {grade or ''}".strip()
-                        option_grade_best = grade
-                    if grade in {'A','B'}:
-                        horizon_hits.append(f"{horizon}:{grade}")
-                    if weighted > preferred_weight:
-                        preferred_weight = weighted
-                        preferred_payload = {k: v for k, v in payload.items()}
-                        preferred_payload['horizon'] = horizon
-            if preferred_payload:
-                item['preferred_option'] = preferred_payload
-        else:
-            item['preferred_option'] = None
-
-        # Penalize if no tradable options and price is low
-        if options_component == 0.0 and price < 5:
-            options_component = 0.25
-
-        base_confidence = float(item.get('base_confidence') or 0.0)
-        final_confidence = (
-            min(1.0, alignment_score) * 0.40
-            + min(1.0, price_liq_score) * 0.20
-            + min(1.0, options_component) * 0.25
-            + min(1.0, rvol_score) * 0.1
-            + min(1.0, trend_score) * 0.05
-        )
-
-        # Adjust for penny risk
-        if price < 3:
-            final_confidence *= 0.65
-        elif price < 5:
-            final_confidence *= 0.8
-
-        confidence_pct = int(_clamp(round(final_confidence * 100)))
-        if confidence_pct >= 80:
-            grade = "High"
-        elif confidence_pct >= 65:
-            grade = "Moderate"
-        else:
-            grade = "Cautious"
-
-        # Build confidence note
-        notes: List[str] = []
-        if item.get('alignment_tags'):
-            notes.append(", ".join(item['alignment_tags']))
-        for entry in item.get('notes', {}).get('price', []):
-            notes.append(entry)
-        rv_note = item.get('notes', {}).get('rvol', [])
-        if rv_note:
-            notes.extend(rv_note)
-        tr_note = item.get('notes', {}).get('trend', [])
-        if tr_note:
-            notes.extend(tr_note)
-        if option_best_note:
-            notes.append(f"Options {option_best_note}")
-        notes = [n for n in notes if n]
-
-        # Apply guardrails for thin options
-        if include_options:
-            tradable = False
-            if isinstance(opts, dict):
-                for payload in opts.values():
-                    if isinstance(payload, dict):
-                        sc = payload.get('options_score')
-                        if sc and sc >= 60:
-                            tradable = True
-                            break
-            if not tradable and price < 5:
-                continue  # skip illiquid low price names
+            for payload in opts.values():
+                if isinstance(payload, dict):
+                    sc = payload.get('options_score')
+                    if sc and sc >= 60:
+                        tradable = True
+                        break
+        if not tradable and price < 5:
+            return None  # skip illiquid low price names
 
-        try:
-            note = quote(item.get('setup') or '')
-        except Exception:
-            note = ''
+    try:
+        note = quote(item.get('setup') or '')
+    except Exception:
+        note = ''
+    entry = sl = tp1 = tp2 = None
+    try:
+        tf = item.get('timeframes') or {}
+        h1 = tf.get('h1') or {}
+        h4 = tf.get('h4') or {}
+        daily = tf.get('daily') or {}
+        e = h1.get('prev_high') or h4.get('prev_high') or daily.get('prev_high')
+        s = h1.get('prev_low') or h4.get('prev_low') or daily.get('prev_low')
+        t1 = daily.get('last_high') or h4.get('last_high') or daily.get('prev_high')
+        t2 = daily.get('prev_high') or daily.get('last_close')
+        if isinstance(e, (int, float)):
+            entry = round(float(e), 2)
+        if isinstance(s, (int, float)):
+            sl = round(float(s), 2)
+        if isinstance(t1, (int, float)):
+            tp1 = round(float(t1), 2)
+        if isinstance(t2, (int, float)):
+            tp2 = round(float(t2), 2)
+    except Exception:
         entry = sl = tp1 = tp2 = None
-        try:
-            tf = item.get('timeframes') or {}
-            h1 = tf.get('h1') or {}
-            h4 = tf.get('h4') or {}
-            daily = tf.get('daily') or {}
-            e = h1.get('prev_high') or h4.get('prev_high') or daily.get('prev_high')
-            s = h1.get('prev_low') or h4.get('prev_low') or daily.get('prev_low')
-            t1 = daily.get('last_high') or h4.get('last_high') or daily.get('prev_high')
-            t2 = daily.get('prev_high') or daily.get('last_close')
-            if isinstance(e, (int, float)):
-                entry = round(float(e), 2)
-            if isinstance(s, (int, float)):
-                sl = round(float(s), 2)
-            if isinstance(t1, (int, float)):
-                tp1 = round(float(t1), 2)
-            if isinstance(t2, (int, float)):
-                tp2 = round(float(t2), 2)
-        except Exception:
-            entry = sl = tp1 = tp2 = None
 
-        item['chart_params'] = {
-            'entry': entry,
-            'stop': sl,
-            'tp1': tp1,
-            'tp2': tp2,
+    item['chart_params'] = {
+        'entry': entry,
+        'stop': sl,
+        'tp1': tp1,
+        'tp2': tp2,
+    }
+
+    preferred_hz = ((item.get('preferred_option') or {}).get('horizon') or '').lower()
+    chart_interval = '15'
+    if preferred_hz in ('swing',):
+        chart_interval = '60'
+    elif preferred_hz in ('leaps', 'leap', 'leaps '):
+        chart_interval = '1d'
+    # Map to proposal chart (intraday/swing -> 15m, leaps -> 1d)
+    prop_interval = '15m' if chart_interval in ('15', '60') else ('1d' if chart_interval == '1d' else '15m')
+    lookback = 160 if prop_interval == '15m' else 180
+
+    if item.get('symbol'):
+        from urllib.parse import urlencode
+        q = {
+            'symbol': item['symbol'],
+            'interval': prop_interval,
+            'lookback': lookback,
+            'overlays': 'vwap,ema20,ema50,pivots',
+            'plan': note,
+            'theme': 'dark',
         }
+        if entry is not None:
+            q['entry'] = entry
+        if sl is not None:
+            q['sl'] = sl
+        if tp1 is not None:
+            q['tp1'] = tp1
+        if tp2 is not None:
+            q['tp2'] = tp2
+        url = f"{_PUBLIC_BASE}/charts/proposal?" + urlencode({k: v for k, v in q.items() if v is not None})
+        item['chart_url'] = url
+        item['chart_link'] = f"[View This Plan]({url})"
+    else:
+        item['chart_url'] = None
+        item['chart_link'] = None
 
-        preferred_hz = ((item.get('preferred_option') or {}).get('horizon') or '').lower()
-        chart_interval = '15'
-        if preferred_hz in ('swing',):
-            chart_interval = '60'
-        elif preferred_hz in ('leaps', 'leap', 'leaps '):
-            chart_interval = '1d'
-        # Map to proposal chart (intraday/swing -> 15m, leaps -> 1d)
-        prop_interval = '15m' if chart_interval in ('15', '60') else ('1d' if chart_interval == '1d' else '15m')
-        lookback = 160 if prop_interval == '15m' else 180
-
-        if item.get('symbol'):
-            from urllib.parse import urlencode
-            q = {
-                'symbol': item['symbol'],
-                'interval': prop_interval,
-                'lookback': lookback,
-                'overlays': 'vwap,ema20,ema50,pivots',
-                'plan': note,
-                'theme': 'dark',
-            }
-            if entry is not None:
-                q['entry'] = entry
-            if sl is not None:
-                q['sl'] = sl
-            if tp1 is not None:
-                q['tp1'] = tp1
-            if tp2 is not None:
-                q['tp2'] = tp2
-            url = f"{_PUBLIC_BASE}/charts/proposal?" + urlencode({k: v for k, v in q.items() if v is not None})
-            item['chart_url'] = url
-            item['chart_link'] = f"[View This Plan]({url})"
-        else:
-            item['chart_url'] = None
-            item['chart_link'] = None
-
-        item['score'] = confidence_pct
-        item['confidence'] = confidence_pct
-        item['confidence_grade'] = grade
-        item['confidence_note'] = "; ".join(notes[:3]) if notes else None
-        item['options_summary'] = opts if isinstance(opts, dict) else None
-        item['highlights'] = horizon_hits
-
-        processed.append(item)
+    item['score'] = confidence_pct
+    item['confidence'] = confidence_pct
+    item['confidence_grade'] = grade
+    item['confidence_note'] = "; ".join(notes[:3]) if notes else None
+    item['options_summary'] = opts if isinstance(opts, dict) else None
+    item['highlights'] = horizon_hits
+
+    return item
 
+
+def _rank(processed: List[Dict[str, Any]], limit: int, include_options: bool, min_confidence: int, has_symbols: bool = False) -> List[Dict[str, Any]]:
+    """Quality gates and top-`limit` selection (relaxed fallback when nothing passes
+    and the caller asked for specific symbols)."""
     ranked_all = sorted(processed, key=lambda x: x.get("score", 0), reverse=True)
 
     filtered: List[Dict[str, Any]] = []
@@ -771,7 +870,7 @@ async def scan_top_setups(
 
     ranked = selected[:limit]
     # Fallback: if no items survived and caller specified symbols, return best-available with quality flags
-    if not ranked and symbols and ranked_all:
+    if not ranked and has_symbols and ranked_all:
         fallback: List[Dict[str, Any]] = []
         for item in ranked_all:
             gates_missed: List[str] = []
@@ -828,7 +927,214 @@ async def scan_top_setups(
             clone['quality_gate'] = False
             clone['gate_misses'] = gates_missed
             fallback.append(clone)
-        ranked = sorted(fallback, key=lambda x: x.get('score', 0), reverse=True)[:max(1, min(limit, 3))]
+        ranked = top_k(fallback, max(1, min(limit, 3)), key=lambda x: x.get('score', 0), reverse=True)
 
-    _CACHE[cache_key] = (now, ranked)
     return ranked
+
+
+async def _run_scan(
+    limit: int = 10,
+    include_options: bool = False,
+    symbols: Optional[List[str]] = None,
+    strict: bool = True,
+    min_confidence: int = 70,
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    poly = PolygonMarket()
+    unique_symbols, movers = await _candidates(poly, limit, symbols)
+
+    results: List[Dict[str, Any]] = []
+    timed_out: List[str] = []
+    options_timed_out: List[str] = []
+    sem = asyncio.Semaphore(5)
+
+    async def _worker(sym: str, meta: Dict[str, Any]):
+        async with sem:
+            try:
+                data = await asyncio.wait_for(_symbol_snapshot(poly, sym, meta), _SNAPSHOT_DEADLINE)
+                if data:
+                    results.append(data)
+            except asyncio.TimeoutError:
+                timed_out.append(sym)
+            except Exception:
+                return
+
+    await asyncio.gather(*[_worker(sym, next((m for m in movers if m.get("symbol") == sym), {})) for sym in unique_symbols])
+    _attach_intraday(results)
+    # Enrich with options summaries if requested
+    if include_options and PolygonMarket is not None and _td_expirations is not None:
+        poly2 = PolygonMarket()
+        async def _enrich(item: Dict[str, Any]):
+            sym = item.get('symbol')
+            try:
+                opts = await asyncio.wait_for(_options_summary(poly2, sym, item.get('price')), _OPTIONS_DEADLINE)
+                if opts:
+                    item['options'] = opts
+            except asyncio.TimeoutError:
+                item['options_pending'] = True
+                options_timed_out.append(sym)
+            except Exception:
+                return
+        await asyncio.gather(*[_enrich(r) for r in results])
+
+    processed = [r for r in (_score_item(item, include_options) for item in results) if r is not None]
+    report = {"timed_out": sorted(timed_out), "options_timed_out": sorted(options_timed_out)}
+    return _rank(processed, limit, include_options, min_confidence, has_symbols=bool(symbols)), report
+
+
+async def _analyse_symbol(poly: Any, sym: str, meta: Dict[str, Any], include_options: bool, sem: asyncio.Semaphore) -> Tuple[str, Optional[Dict[str, Any]], str]:
+    """Snapshot -> intraday -> options -> score for one symbol (streaming path).
+    Returns (symbol, item or None, status) with status ok | timeout | error."""
+    try:
+        async with sem:
+            item = await asyncio.wait_for(_symbol_snapshot(poly, sym, meta), _SNAPSHOT_DEADLINE)
+    except asyncio.TimeoutError:
+        return sym, None, "timeout"
+    except Exception:
+        return sym, None, "error"
+    if not item:
+        return sym, None, "ok"
+    _attach_intraday([item])
+    if include_options and _td_expirations is not None:
+        try:
+            opts = await asyncio.wait_for(_options_summary(poly, sym, item.get('price')), _OPTIONS_DEADLINE)
+            if opts:
+                item['options'] = opts
+        except asyncio.TimeoutError:
+            item['options_pending'] = True
+        except Exception:
+            pass
+    return sym, _score_item(item, include_options), "ok"
+
+
+def _replay(entry: Tuple[float, List[Dict[str, Any]], Dict[str, Any]], **flags: Any) -> List[Dict[str, Any]]:
+    """A cached scan as stream events: one "setup" per item, then the summary."""
+    as_of = datetime.fromtimestamp(entry[0], tz=timezone.utc).isoformat()
+    events = [{"event": "setup", "data": item} for item in entry[1]]
+    events.append({"event": "summary", "data": {"count": len(entry[1]), "setups": entry[1], "as_of": as_of, **flags, **entry[2]}})
+    return events
+
+
+async def stream_setups(
+    limit: int = 10,
+    include_options: bool = False,
+    symbols: Optional[List[str]] = None,
+    strict: bool = True,
+    min_confidence: int = 70,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Yield {"event": "setup", "data": item} as each symbol finishes scoring
+    ({"event": "timeout", "data": {"symbol"}} when it misses its deadline),
+    then one {"event": "summary"} with the ranked, gated list plus as_of and
+    the timeout report (also published to the shared cache). A fresh cached
+    result, or a scan with the same parameters already in flight, is replayed
+    instead of rescanning. A new scan needs a market.setups slot; when the gate
+    sheds it the last result is replayed with "shed": True, or Overloaded is
+    raised before the first event if there is none.
+    """
+    if PolygonMarket is None:
+        yield {"event": "summary", "data": {"count": 0, "setups": [], "as_of": None}}
+        return
+    params = dict(limit=limit, include_options=include_options, symbols=symbols, strict=strict, min_confidence=min_confidence)
+    key = _cache_key(**params)
+    cached = _CACHE.get(key)
+    if cached and time.time() - cached[0] < _fresh_ttl():
+        for ev in _replay(cached, cached=True):
+            yield ev
+        return
+
+    try:
+        if key in _INFLIGHT:
+            entry = await _scan_shared(key, params)
+            for ev in _replay(entry, cached=True):
+                yield ev
+            return
+        async with admit("market.setups"):
+            async for ev in _stream_scan(key, limit, include_options, symbols, min_confidence):
+                yield ev
+        return
+    except Overloaded:
+        if cached is None:
+            raise
+    # Saturated: serve the last result, however old, rather than nothing
+    for ev in _replay(cached, cached=True, shed=True):
+        yield ev
+
+
+async def _stream_scan(
+    key: str, limit: int, include_options: bool, symbols: Optional[List[str]], min_confidence: int,
+) -> AsyncIterator[Dict[str, Any]]:
+    poly = PolygonMarket()
+    unique_symbols, movers = await _candidates(poly, limit, symbols)
+    meta = {m.get("symbol"): m for m in movers if m.get("symbol")}
+    yield {"event": "start", "data": {"symbols": unique_symbols}}
+    sem = asyncio.Semaphore(5)
+    tasks = [
+        asyncio.create_task(_analyse_symbol(poly, sym, meta.get(sym, {}), include_options, sem))
+        for sym in unique_symbols
+    ]
+    processed: List[Dict[str, Any]] = []
+    timed_out: List[str] = []
+    try:
+        for fut in asyncio.as_completed(tasks):
+            sym, item, status = await fut
+            if status == "timeout":
+                timed_out.append(sym)
+                yield {"event": "timeout", "data": {"symbol": sym}}
+            elif item is not None:
+                processed.append(item)
+                yield {"event": "setup", "data": item}
+    finally:
+        for t in tasks:
+            t.cancel()
+    report = {
+        "timed_out": sorted(timed_out),
+        "options_timed_out": sorted(i.get("symbol") for i in processed if i.get("options_pending")),
+    }
+    ranked = _rank(processed, limit, include_options, min_confidence, has_symbols=bool(symbols))
+    now = time.time()
+    _CACHE[key] = (now, ranked, report)
+    as_of = datetime.fromtimestamp(now, tz=timezone.utc).isoformat()
+    yield {"event": "summary", "data": {"count": len(ranked), "setups": ranked, "as_of": as_of, **report}}
+
+
+# ---------- scheduled pre-computation ----------
+
+# Parameter sets the API serves by default: /market/setups and market.setups,
+# plus the relaxed second pass market.setups falls back to on an empty strict scan.
+DEFAULT_PROFILES: List[Dict[str, Any]] = [
+    {"limit": 10, "include_options": True, "symbols": None, "strict": True, "min_confidence": 70},
+    {"limit": 10, "include_options": True, "symbols": None, "strict": False, "min_confidence": 65},
+]
+
+
+async def refresh_default_setups() -> None:
+    """Rescan every default profile and publish to the shared cache."""
+    if PolygonMarket is None:
+        return
+    for params in DEFAULT_PROFILES:
+        try:
+            await _scan_shared(_cache_key(**params), dict(params))
+        except Exception:
+            continue
+
+
+async def run_scheduler_on_startup() -> None:
+    """Optional background loop refreshing DEFAULT_PROFILES on a market-phase cadence
+    (SETUP_SCAN_INTERVAL_RTH / _EXT / _CLOSED). Controlled by ENABLE_SETUP_SCAN_SCHEDULE
+    (default on when a Polygon key is configured). Non-fatal on errors."""
+    flag = os.getenv("ENABLE_SETUP_SCAN_SCHEDULE", "1" if os.getenv("POLYGON_API_KEY") else "0")
+    if not flag or flag == "0" or PolygonMarket is None:
+        return
+
+    async def _loop():
+        while True:
+            try:
+                await refresh_default_setups()
+                await asyncio.sleep(_SCHEDULE_INTERVALS.get(mcal.phase(), _CACHE_TTL))
+            except Exception:
+                await asyncio.sleep(60)
+
+    try:
+        asyncio.create_task(_loop())
+    except Exception:
+        pass
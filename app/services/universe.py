@@ -0,0 +1,218 @@
+"""
+Stage-one universe prefilter for the setup scanner.
+
+Scores every liquid US stock from market-wide data only: grouped daily bars
+for the last few sessions (one request per session date, kept for the day)
+plus one full-market snapshot for today's move and volume. The cheap scores
+pick which names get the expensive per-symbol analysis.
+
+The liquid universe is derived from the data itself (price and average
+dollar volume floors, common-stock tickers), so no constituent list has to be
+maintained; PREFILTER_UNIVERSE restricts it to an explicit comma list.
+"""
+from __future__ import annotations
+
+import asyncio
+import math
+import os
+import re
+import time
+import warnings
+from datetime import date
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.services import market_calendar as mcal
+from app.utils.topk import top_k
+
+try:
+    import numpy as np
+except Exception:  # pragma: no cover - optional dependency
+    np = None
+
+SESSIONS = 5
+MIN_PRICE = float(os.getenv("PREFILTER_MIN_PRICE", "5"))
+MIN_DOLLAR_VOL = float(os.getenv("PREFILTER_MIN_DOLLAR_VOL", "20000000"))
+_SNAP_TTL = 30.0
+# Plain 1-5 letter tickers: skips warrants, units, rights and preferreds.
+_COMMON = re.compile(r"^[A-Z]{1,5}$")
+
+# session date -> {ticker: (o, h, l, c, v)}; completed sessions never change
+_DAYS: Dict[date, Dict[str, Tuple[float, float, float, float, float]]] = {}
+# {"t": fetched_at, "rows": {ticker: (last, day_volume, change_pct)}}
+_SNAP: Dict[str, Any] = {}
+
+
+def _num(v: Any) -> float:
+    try:
+        return float(v) if v is not None else math.nan
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _universe_filter() -> Optional[set]:
+    raw = os.getenv("PREFILTER_UNIVERSE", "")
+    syms = {s.strip().upper() for s in raw.split(",") if s.strip()}
+    return syms or None
+
+
+async def _session_rows(poly: Any, d: date) -> Dict[str, Tuple[float, float, float, float, float]]:
+    rows = _DAYS.get(d)
+    if rows is None:
+        raw = await poly.grouped_daily(d)
+        rows = {
+            r["T"]: (_num(r.get("o")), _num(r.get("h")), _num(r.get("l")), _num(r.get("c")), _num(r.get("v")))
+            for r in raw if isinstance(r, dict) and _COMMON.match(str(r.get("T") or ""))
+        }
+        if rows:
+            _DAYS[d] = rows
+            for old in sorted(_DAYS)[:-(SESSIONS + 2)]:
+                _DAYS.pop(old, None)
+    return rows
+
+
+async def _today_rows(poly: Any) -> Dict[str, Tuple[float, float, float]]:
+    if _SNAP and time.time() - _SNAP.get("t", 0) < _SNAP_TTL:
+        return _SNAP["rows"]
+    try:
+        raw = await poly.all_tickers_snapshot()
+    except Exception:
+        raw = []
+    rows: Dict[str, Tuple[float, float, float]] = {}
+    for r in raw:
+        sym = str((r or {}).get("ticker") or "")
+        if not _COMMON.match(sym):
+            continue
+        day = r.get("day") or {}
+        last = _num((r.get("lastTrade") or {}).get("p"))
+        if math.isnan(last):
+            last = _num(day.get("c"))
+        rows[sym] = (last, _num(day.get("v")), _num(r.get("todaysChangePerc")))
+    _SNAP.update({"t": time.time(), "rows": rows})
+    return rows
+
+
+def _session_elapsed() -> float:
+    """Share of today's regular session already traded (1.0 outside RTH)."""
+    rem = mcal.rth_remaining_fraction()
+    return 1.0 if rem is None else max(0.05, 1.0 - rem)
+
+
+# ---------- scoring (vectorized across the universe) ----------
+
+def _score_np(C, H, L, V, last, tvol, tchg, elapsed: float):
+    c0 = C[:, -1]
+    # Rows with no bars are all-NaN: nanmean/nanmax warn on them on every scan
+    with np.errstate(invalid="ignore", divide="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        avg_vol = np.nanmean(V, axis=1)
+        px = np.where(np.isnan(last), c0, last)
+        rng = np.nanmean((H - L) / C, axis=1)
+        chg = np.where(np.isnan(tchg), (c0 / C[:, -2] - 1.0) * 100.0, tchg)
+        rvol = np.where(np.isnan(tvol), V[:, -1], tvol / elapsed) / avg_vol
+        trend = px / C[:, 0] - 1.0
+        brk = px / np.nanmax(H[:, :-1], axis=1) - 1.0
+        # Undefined terms (missing data, zero denominators) score 0, as in _score_py
+        clip = lambda x: np.clip(np.nan_to_num(x, nan=0.0, posinf=0.0, neginf=0.0), 0, 1)
+        score = (
+            40.0 * clip(np.abs(chg) / 100.0 / (2.0 * rng))
+            + 25.0 * clip(rvol / 3.0)
+            + 20.0 * clip(np.abs(trend) / 0.10)
+            + 15.0 * clip(1.0 - np.abs(brk) / 0.02)
+        )
+        liquid = (px >= MIN_PRICE) & (avg_vol * px >= MIN_DOLLAR_VOL) & (rng > 0) & np.isfinite(chg)
+    score = np.where(liquid, score, np.nan)
+    return score, px, chg, rvol, trend, avg_vol
+
+
+def _score_py(c, h, l, v, last, tvol, tchg, elapsed: float) -> Tuple[float, float, float, float, float, float]:
+    nan = math.nan
+    ok = lambda xs: [x for x in xs if not math.isnan(x)]
+    vols = ok(v)
+    avg_vol = sum(vols) / len(vols) if vols else nan
+    px = c[-1] if math.isnan(last) else last
+    rngs = ok([(hh - ll) / cc for hh, ll, cc in zip(h, l, c) if cc])
+    rng = sum(rngs) / len(rngs) if rngs else nan
+    chg = tchg if not math.isnan(tchg) else ((c[-1] / c[-2] - 1.0) * 100.0 if c[-2] else nan)
+    rvol = ((v[-1] if math.isnan(tvol) else tvol / elapsed) / avg_vol) if avg_vol else nan
+    trend = px / c[0] - 1.0 if c[0] else nan
+    highs = ok(h[:-1])
+    brk = px / max(highs) - 1.0 if highs and max(highs) else nan
+    clip = lambda x: 0.0 if math.isnan(x) else max(0.0, min(1.0, x))
+    if any(math.isnan(x) for x in (px, avg_vol, rng, chg)) or rng <= 0:
+        return nan, px, chg, rvol, trend, avg_vol
+    if px < MIN_PRICE or avg_vol * px < MIN_DOLLAR_VOL:
+        return nan, px, chg, rvol, trend, avg_vol
+    score = (
+        40.0 * clip(abs(chg) / 100.0 / (2.0 * rng))
+        + 25.0 * clip(rvol / 3.0)
+        + 20.0 * clip(abs(trend) / 0.10)
+        + 15.0 * clip(1.0 - abs(brk) / 0.02)
+    )
+    return score, px, chg, rvol, trend, avg_vol
+
+
+def prefilter_scores(
+    days: Sequence[Dict[str, Tuple[float, float, float, float, float]]],
+    today: Dict[str, Tuple[float, float, float]],
+    symbols: Optional[Sequence[str]] = None,
+    elapsed: float = 1.0,
+) -> List[Dict[str, Any]]:
+    """Score symbols present in every session of `days` (oldest first). Illiquid or incomplete rows are dropped."""
+    if len(days) < 2:
+        return []
+    common = set(days[-1])
+    for d in days[:-1]:
+        common &= d.keys()
+    if symbols is not None:
+        common &= set(symbols)
+    syms = sorted(common)
+    if not syms:
+        return []
+    nan3 = (math.nan, math.nan, math.nan)
+    out: List[Dict[str, Any]] = []
+    if np is not None:
+        arr = np.array([[d[s] for d in days] for s in syms], dtype=float)   # S × D × (o,h,l,c,v)
+        snap = np.array([today.get(s, nan3) for s in syms], dtype=float)
+        score, px, chg, rvol, trend, avg_vol = _score_np(
+            arr[:, :, 3], arr[:, :, 1], arr[:, :, 2], arr[:, :, 4], snap[:, 0], snap[:, 1], snap[:, 2], elapsed,
+        )
+        keep = np.flatnonzero(~np.isnan(score))
+        rows = [(syms[i], score[i], px[i], chg[i], rvol[i], trend[i], avg_vol[i]) for i in keep]
+    else:
+        rows = []
+        for s in syms:
+            series = [d[s] for d in days]
+            res = _score_py(
+                [b[3] for b in series], [b[1] for b in series], [b[2] for b in series], [b[4] for b in series],
+                *today.get(s, nan3), elapsed,
+            )
+            if not math.isnan(res[0]):
+                rows.append((s, *res))
+    nz = lambda x, n=4: None if x is None or math.isnan(x) else round(float(x), n)
+    for s, sc, px, chg, rvol, trend, avg_vol in rows:
+        tv = today.get(s, nan3)[1]
+        out.append({
+            "symbol": s,
+            "prefilter_score": nz(sc, 2),
+            "last": nz(px),
+            "change_pct": nz(chg, 2),
+            "rvol": nz(rvol, 2),
+            "trend_5d": nz(trend),
+            "volume": nz(avg_vol if math.isnan(tv) else tv, 0),
+        })
+    return out
+
+
+async def prefilter_candidates(poly: Any, n: int, symbols: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+    """Top `n` names of the liquid universe by prefilter score (mover-meta shaped dicts)."""
+    sessions = mcal.sessions_back(SESSIONS, include_ref=False)
+    days_and_today = await asyncio.gather(
+        *[_session_rows(poly, s.day) for s in sessions], _today_rows(poly), return_exceptions=True,
+    )
+    *days, today = days_and_today
+    days = [d for d in days if isinstance(d, dict) and d]
+    if isinstance(today, BaseException):
+        today = {}
+    universe = set(symbols) if symbols else _universe_filter()
+    scored = prefilter_scores(days, today, symbols=universe, elapsed=_session_elapsed())
+    return top_k(scored, max(1, n), key=lambda r: r["prefilter_score"], reverse=True)
@@ -0,0 +1,164 @@
+# compact OHLCV series: parallel typed arrays instead of one dict per bar
+import math
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Union
+
+FIELDS = ("t", "o", "h", "l", "c", "v")
+_NAN = float("nan")
+
+
+def _f(v: Any) -> float:
+    if v is None:
+        return _NAN
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return _NAN
+
+
+def _volume(v: float) -> Any:
+    """API-edge volume: int as before the typed arrays (fractional volumes stay float)."""
+    if math.isnan(v):
+        return None
+    return int(v) if v.is_integer() else v
+
+
+class Bar:
+    """Read-only view of one bar in a Bars series.
+
+    Quacks like the old per-bar dict (get/[]/keys, dict(bar)), so indicator,
+    regime and scanner code works on either. Missing values read as None.
+    """
+    __slots__ = ("_s", "_i")
+
+    def __init__(self, series: "Bars", i: int):
+        self._s = series
+        self._i = i
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key not in FIELDS:
+            return default
+        v = getattr(self._s, key)[self._i]
+        if key == "t":
+            return v
+        return default if math.isnan(v) else v
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in FIELDS:
+            raise KeyError(key)
+        return self.get(key)
+
+    def __contains__(self, key: object) -> bool:
+        return key in FIELDS
+
+    def keys(self):
+        return FIELDS
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(FIELDS)
+
+    def __len__(self) -> int:
+        return len(FIELDS)
+
+    def to_dict(self) -> Dict[str, Any]:
+        out = {k: self.get(k) for k in FIELDS}
+        out["v"] = _volume(self._s.v[self._i])
+        return out
+
+    def __repr__(self) -> str:
+        return f"Bar({self.to_dict()})"
+
+
+class Bars:
+    """OHLCV bars as typed arrays: t (int64 ms) and o/h/l/c/v (float64, NaN = missing).
+
+    Indexing returns a Bar view, slicing returns a Bars copy of just that
+    window. Call to_dicts() only at the API edge.
+    """
+    __slots__ = FIELDS
+
+    def __init__(self) -> None:
+        self.t = array("q")
+        self.o = array("d"); self.h = array("d"); self.l = array("d")
+        self.c = array("d"); self.v = array("d")
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Any]) -> "Bars":
+        """Build from dict-like bars (Polygon `results`, legacy dicts or Bar views); rows without t are dropped."""
+        out = cls()
+        t, o, h, l, c, v = out.t, out.o, out.h, out.l, out.c, out.v
+        for r in rows or ():
+            ts = r.get("t")
+            if ts is None:
+                continue
+            t.append(int(ts)); o.append(_f(r.get("o"))); h.append(_f(r.get("h")))
+            l.append(_f(r.get("l"))); c.append(_f(r.get("c"))); v.append(_f(r.get("v")))
+        return out
+
+    @classmethod
+    def from_columns(cls, **cols: Iterable[Any]) -> "Bars":
+        """Build from equal-length columns; NumPy arrays are copied as raw buffers."""
+        out = cls()
+        for k in FIELDS:
+            col, arr = cols.get(k, ()), getattr(out, k)
+            if hasattr(col, "astype"):
+                arr.frombytes(col.astype("<i8" if k == "t" else "<f8").tobytes())
+            elif k == "t":
+                arr.extend(int(x) for x in col)
+            else:
+                arr.extend(_f(x) for x in col)
+        return out
+
+    def append(self, t: int, o: Any, h: Any, l: Any, c: Any, v: Any) -> None:
+        self.t.append(int(t)); self.o.append(_f(o)); self.h.append(_f(h))
+        self.l.append(_f(l)); self.c.append(_f(c)); self.v.append(_f(v))
+
+    def extend(self, other: "Bars") -> None:
+        for k in FIELDS:
+            getattr(self, k).extend(getattr(other, k))
+
+    def __len__(self) -> int:
+        return len(self.t)
+
+    def __getitem__(self, idx: Union[int, slice]) -> Union[Bar, "Bars"]:
+        if isinstance(idx, slice):
+            out = Bars()
+            for k in FIELDS:
+                setattr(out, k, getattr(self, k)[idx])
+            return out
+        n = len(self.t)
+        if idx < 0:
+            idx += n
+        if not 0 <= idx < n:
+            raise IndexError("bar index out of range")
+        return Bar(self, idx)
+
+    def __iter__(self) -> Iterator[Bar]:
+        for i in range(len(self.t)):
+            yield Bar(self, i)
+
+    def since(self, t_ms: int) -> "Bars":
+        """Bars at or after t_ms (t is ascending)."""
+        from bisect import bisect_left
+        return self[bisect_left(self.t, t_ms):]
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        nz = lambda x: None if math.isnan(x) else x
+        return [
+            {"t": int(t), "o": nz(o), "h": nz(h), "l": nz(l), "c": nz(c), "v": _volume(v)}
+            for t, o, h, l, c, v in zip(self.t, self.o, self.h, self.l, self.c, self.v)
+        ]
+
+    def __repr__(self) -> str:
+        return f"Bars(n={len(self)})"
+
+
+def as_bars(rows: Any) -> Bars:
+    return rows if isinstance(rows, Bars) else Bars.from_rows(rows or ())
+
+
+def to_dicts(rows: Any) -> List[Dict[str, Any]]:
+    """API-edge conversion for either representation."""
+    if isinstance(rows, Bars):
+        return rows.to_dicts()
+    return [r.to_dict() if isinstance(r, Bar) else dict(r) for r in (rows or [])]
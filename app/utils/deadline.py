@@ -0,0 +1,77 @@
+# per-request deadline carried in a contextvar: provider calls and optional stages honour it
+import asyncio
+import inspect
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Dict, Iterator, Optional, Tuple
+
+# (absolute time.monotonic() deadline, report) for the innermost scope
+_DEADLINE: ContextVar[Optional[Tuple[float, Dict[str, Any]]]] = ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """The request's time budget ran out before this call could finish."""
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]) -> Iterator[Dict[str, Any]]:
+    """Bound the enclosed work to `seconds` (never beyond an outer scope). Yields a
+    report: {"timed_out": [labels of stages cut short]}."""
+    report: Dict[str, Any] = {"timed_out": []}
+    outer = _DEADLINE.get()
+    at = time.monotonic() + seconds if seconds else float("inf")
+    if outer is not None:
+        at = min(at, outer[0])
+    if at == float("inf"):
+        yield report
+        return
+    token = _DEADLINE.set((at, report))
+    try:
+        yield report
+    finally:
+        _DEADLINE.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current scope (may be <= 0), or None without a deadline."""
+    cur = _DEADLINE.get()
+    return None if cur is None else cur[0] - time.monotonic()
+
+
+def clamp(timeout: float) -> float:
+    """`timeout` shortened to the time left; raises DeadlineExceeded once it is gone."""
+    left = remaining()
+    if left is None:
+        return timeout
+    if left <= 0:
+        raise DeadlineExceeded("request deadline passed")
+    return min(timeout, left)
+
+
+def mark_timed_out(label: str) -> None:
+    cur = _DEADLINE.get()
+    if cur is not None and label not in cur[1]["timed_out"]:
+        cur[1]["timed_out"].append(label)
+
+
+async def within(aw: Awaitable[Any], label: str, default: Any = None, reserve: float = 0.0) -> Any:
+    """Await an optional stage inside the deadline (less `reserve` seconds kept for
+    assembling the response). When time runs out the stage is cancelled, recorded
+    under `label` and `default` is returned instead."""
+    left = remaining()
+    if left is None:
+        return await aw
+    left -= reserve
+    if left <= 0:
+        if inspect.iscoroutine(aw):
+            aw.close()
+        elif isinstance(aw, asyncio.Future):
+            aw.cancel()
+        mark_timed_out(label)
+        return default
+    try:
+        return await asyncio.wait_for(aw, left)
+    except (asyncio.TimeoutError, DeadlineExceeded):
+        mark_timed_out(label)
+        return default
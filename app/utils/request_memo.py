@@ -0,0 +1,83 @@
+# request-scoped memo: each distinct upstream fact is fetched at most once per request
+import asyncio
+import contextvars
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterator, Optional
+
+# key -> Future of the (first) call; tasks spawned inside the scope share the same dict
+_MEMO: ContextVar[Optional[Dict[Hashable, "asyncio.Future"]]] = ContextVar("request_memo", default=None)
+# context captured when the scope opened: shared fetches run under the scope's deadline,
+# not that of whichever caller happened to start them
+_SCOPE_CTX: ContextVar[Optional[contextvars.Context]] = ContextVar("request_memo_ctx", default=None)
+
+
+@contextmanager
+def request_scope() -> Iterator[Dict[Hashable, "asyncio.Future"]]:
+    """Open a memo scope for one request; nested scopes share the outer one. Open it
+    inside the request's deadline scope so shared fetches are bound by that deadline."""
+    memo = _MEMO.get()
+    if memo is not None:
+        yield memo
+        return
+    memo = {}
+    token = _MEMO.set(memo)
+    ctx = contextvars.copy_context()
+    ctx.run(_SCOPE_CTX.set, ctx)
+    ctx_token = _SCOPE_CTX.set(ctx)
+    try:
+        yield memo
+    finally:
+        _SCOPE_CTX.reset(ctx_token)
+        _MEMO.reset(token)
+        # The request is over: nobody is left to consume unfinished fetches
+        for fut in memo.values():
+            if not fut.done():
+                fut.cancel()
+
+
+def detached_task(coro: Awaitable[Any]) -> "asyncio.Task":
+    """Task for work shared across requests (caches, single-flight scans): it runs
+    outside the caller's memo scope and deadline, so it outlives that request."""
+    return asyncio.create_task(coro, context=contextvars.Context())
+
+
+def in_scope() -> bool:
+    return _MEMO.get() is not None
+
+
+async def memoized(key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+    """Await factory() once per key within the current scope; concurrent callers share
+    the in-flight call. Failures are not memoized. Outside a scope this is a plain call."""
+    memo = _MEMO.get()
+    if memo is None:
+        return await factory()
+    fut = memo.get(key)
+    if fut is None:
+        ctx = _SCOPE_CTX.get()
+        coro = factory()
+        fut = memo[key] = (
+            asyncio.get_running_loop().create_task(coro, context=ctx.copy()) if ctx is not None
+            else asyncio.ensure_future(coro)
+        )
+
+        def _forget_failure(f: "asyncio.Future") -> None:
+            if (f.cancelled() or f.exception() is not None) and memo.get(key) is f:
+                memo.pop(key, None)
+
+        fut.add_done_callback(_forget_failure)
+    # Shield: one caller giving up must not cancel the fetch for the others
+    return await asyncio.shield(fut)
+
+
+def request_memo(key_fn: Callable[..., Hashable]):
+    """Decorator for async helpers: key_fn(*args, **kwargs) names the fact."""
+    def deco(fn):
+        @functools.wraps(fn)
+        async def wrap(*a, **kw):
+            if _MEMO.get() is None:
+                return await fn(*a, **kw)
+            return await memoized((fn.__qualname__, key_fn(*a, **kw)), lambda: fn(*a, **kw))
+        return wrap
+    return deco
@@ -0,0 +1,65 @@
+# partial top-K selection over chain rows (heap-based, O(n log k))
+import heapq
+import math
+from typing import Any, Callable, Iterable, List, Optional, Sequence, Tuple
+
+Row = Any
+KeyFn = Callable[[Row], Any]
+
+
+def top_k(rows: Iterable[Row], k: int, key: KeyFn, reverse: bool = False) -> List[Row]:
+    """Return the first `k` rows of `sorted(rows, key=key, reverse=reverse)`.
+
+    Uses heapq partial selection so cost grows with k rather than the full
+    chain; ties keep input order, same as the sort it replaces.
+    """
+    k = max(0, int(k))
+    if k == 0:
+        return []
+    pick = heapq.nlargest if reverse else heapq.nsmallest
+    return pick(k, rows, key=key)
+
+
+def _num(v: Any) -> Optional[float]:
+    try:
+        if v is None:
+            return None
+        f = float(v)
+        return None if math.isnan(f) else f
+    except (TypeError, ValueError):
+        return None
+
+
+def multi_key(*specs: Tuple[KeyFn, bool]) -> KeyFn:
+    """Build an ascending composite key from (getter, descending) pairs.
+
+    Missing/non-numeric values always rank last for their component, so
+    e.g. `multi_key((dist, False), (score, True), (spread, False))` means
+    nearest to spot, then best score, then tightest spread.
+    """
+    def _key(row: Row) -> Tuple[float, ...]:
+        out: List[float] = []
+        for getter, descending in specs:
+            try:
+                v = _num(getter(row))
+            except Exception:
+                v = None
+            if v is None:
+                out.append(math.inf)
+            else:
+                out.append(-v if descending else v)
+        return tuple(out)
+    return _key
+
+
+def strike_distance(spot: float) -> KeyFn:
+    """Getter for |strike - spot| on normalized chain rows."""
+    def _get(row: Row) -> Optional[float]:
+        st = _num(row.get("strike"))
+        return None if st is None else abs(st - float(spot))
+    return _get
+
+
+def top_k_by(rows: Sequence[Row], k: int, *specs: Tuple[KeyFn, bool]) -> List[Row]:
+    """Multi-key top-K: `top_k(rows, k, multi_key(*specs))`."""
+    return top_k(rows, k, multi_key(*specs))
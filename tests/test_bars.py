@@ -0,0 +1,17 @@
+from app.utils.bars import Bars, to_dicts
+
+
+def test_to_dicts_restores_int_time_and_volume():
+    bars = Bars.from_rows([{"t": 1000, "o": 1, "h": 2, "l": 0.5, "c": 1.5, "v": 1200}, {"t": 2000, "c": 1.6}])
+    rows = bars.to_dicts()
+    assert rows[0] == {"t": 1000, "o": 1.0, "h": 2.0, "l": 0.5, "c": 1.5, "v": 1200}
+    assert type(rows[0]["t"]) is int and type(rows[0]["v"]) is int
+    assert rows[1]["v"] is None and rows[1]["o"] is None
+    assert to_dicts(list(bars)) == rows
+
+
+def test_slices_are_copies():
+    bars = Bars.from_rows([{"t": 1, "c": 1.0, "v": 5}])
+    view = bars[:]
+    view.append(2, 1, 1, 1, 1, 1)
+    assert len(bars) == 1
@@ -0,0 +1,29 @@
+import asyncio
+
+from app.routers import assistant_api as api
+
+
+def test_batch_waits_for_cancelled_ops_to_unwind(monkeypatch):
+    unwound = []
+
+    async def slow_op(payload):
+        if payload.op == "diag.health":
+            return {"ok": True, "op": payload.op, "data": {}}
+        try:
+            await asyncio.sleep(30)
+        finally:
+            await asyncio.sleep(0.05)  # cleanup that itself awaits
+            unwound.append(payload.op)
+
+    monkeypatch.setattr(api, "_exec_op", slow_op)
+    monkeypatch.setattr(api, "_DEADLINE_GRACE_S", 0.0)
+    req = api.ExecBatchRequest(ops=[{"op": "diag.health"}, {"op": "market.overview", "deadline_s": 30}], deadline_s=0.1)
+
+    async def main():
+        res = await api.assistant_exec_batch(req)
+        assert unwound == ["market.overview"]  # before the response, not after it
+        return res
+
+    res = asyncio.run(main())
+    assert res["results"]["0"]["ok"] is True
+    assert res["results"]["1"]["status"] == 504
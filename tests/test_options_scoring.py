@@ -0,0 +1,59 @@
+from app.engine.options_scoring import (
+    SCANNER_PROFILE, ChainArrays, _delta_fit, _iv_bucket, _liquidity, composite_scores, odte_profile,
+    tradeability_score,
+)
+
+# Quoted rows without spread_pct: scored with the neutral/default spread term, as before
+ROWS = [
+    {"delta": 0.42, "bid": 1.0, "ask": 1.4, "oi": 800, "volume": 1200, "iv": 0.3},
+    {"delta": -0.55, "bid": 2.0, "ask": 2.1, "oi": 50, "volume": 10, "iv_percentile": 70},
+    {"delta": 0.2, "bid": 0.1, "ask": 0.5, "spread_stability": 0.8, "oi": 3000, "volume": 9000},
+]
+
+
+def _tradeability_ref(r, horizon="intraday"):
+    oi, vol = r.get("oi") or 0, r.get("volume") or 0
+    ivp = r.get("iv_percentile")
+    comps = {
+        "delta_fit": _delta_fit(r.get("delta"), horizon),
+        "spread_stability": 0.5,
+        "liquidity": _liquidity(oi, vol, vol / float(oi) if oi else None),
+        "iv_percentile": (1.0 - min(1.0, abs(ivp - 50.0) / 50.0)) if ivp is not None else _iv_bucket(r.get("iv")),
+        "age": 0.5,
+    }
+    w = (0.40, 0.25, 0.20, 0.10, 0.05)
+    return int(round(sum(c * k for c, k in zip(comps.values(), w)) * 100)), comps
+
+
+def _scanner_ref(r):
+    st = r.get("spread_stability") or 0.5
+    d = abs(r.get("delta") or 0.45)
+    ivp = r.get("iv_percentile") or 50.0
+    liq = min(1.0, (r.get("oi") or 0.0) / 1500.0 + (r.get("volume") or 0.0) / 6000.0)
+    score = st * 0.30 + 0.0 * 0.20 + (1.0 - min(1.0, abs(d - 0.45))) * 0.25 + (1.0 - abs(ivp - 50.0) / 50.0) * 0.10 + liq * 0.15
+    return max(0.0, min(1.0, score))
+
+
+def _odte_ref(r, horizon="intraday"):
+    st = r.get("spread_stability") if isinstance(r.get("spread_stability"), (int, float)) else 0.5
+    d_s = 1.0 - min(1.0, abs(abs(r.get("delta") or 0.0) - 0.50))
+    iv_s = 1.0 - min(1.0, abs((r.get("iv_percentile") or 50.0) - 50.0) / 50.0)
+    liq = min(1.0, (r.get("oi") or 0.0) / 2000.0 + (r.get("volume") or 0.0) / 5000.0)
+    return max(0.0, min(1.0, st * 0.30 + d_s * 0.30 + iv_s * 0.15 + liq * 0.15 + 1.0 * 0.10))
+
+
+def test_tradeability_without_spread_pct_matches_row_scorer():
+    for r in ROWS:
+        score, comps = tradeability_score(r)
+        ref_score, ref_comps = _tradeability_ref(r)
+        assert score == ref_score
+        assert comps == ref_comps
+
+
+def test_composites_without_spread_pct_use_profile_default():
+    chain = ChainArrays.from_rows(ROWS)
+    assert chain.spread_pct == [None, None, None]
+    for got, r in zip(composite_scores(chain, SCANNER_PROFILE), ROWS):
+        assert abs(got - _scanner_ref(r)) < 1e-9
+    for got, r in zip(composite_scores(chain, odte_profile("intraday")), ROWS):
+        assert abs(got - _odte_ref(r)) < 1e-9
@@ -0,0 +1,53 @@
+import asyncio
+
+from app.utils.deadline import deadline_scope, remaining
+from app.utils.request_memo import memoized, request_scope
+
+
+def test_shared_fetch_uses_scope_deadline_not_first_caller():
+    calls = []
+
+    async def fetch():
+        calls.append(remaining())
+        await asyncio.sleep(0.05)
+        return 42
+
+    async def short_op():
+        with deadline_scope(0.01):
+            try:
+                return await asyncio.wait_for(memoized("k", fetch), 0.01)
+            except asyncio.TimeoutError:
+                return None
+
+    async def long_op():
+        with deadline_scope(5):
+            await asyncio.sleep(0)
+            return await memoized("k", fetch)
+
+    async def main():
+        with deadline_scope(10), request_scope():
+            return await asyncio.gather(short_op(), long_op())
+
+    assert asyncio.run(main()) == [None, 42]
+    assert len(calls) == 1 and calls[0] > 5
+
+
+def test_failures_are_not_memoized():
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("boom")
+        return "ok"
+
+    async def main():
+        with request_scope():
+            try:
+                await memoized("k", flaky)
+            except RuntimeError:
+                pass
+            return await memoized("k", flaky)
+
+    assert asyncio.run(main()) == "ok"
+    assert len(attempts) == 2
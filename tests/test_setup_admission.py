@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from app.services import admission, setup_scanner
+from app.services.admission import GATES
+
+
+def test_cancelled_caller_does_not_release_the_scan_slot(monkeypatch):
+    gate = GATES["market.setups"]
+    monkeypatch.setattr(setup_scanner, "PolygonMarket", object)
+    monkeypatch.setattr(setup_scanner, "_CACHE", {})
+
+    async def main():
+        finish = asyncio.Event()
+
+        async def fake_scan(**params):
+            await finish.wait()
+            return [], {}
+
+        monkeypatch.setattr(setup_scanner, "_run_scan", fake_scan)
+        caller = asyncio.ensure_future(setup_scanner.get_setups(limit=3, symbols=["ZZZ"]))
+        await asyncio.sleep(0.01)
+        assert gate.active == 1
+        caller.cancel()
+        await asyncio.sleep(0.01)
+        assert gate.active == 1  # the detached scan still runs and still holds it
+        finish.set()
+        await asyncio.sleep(0.01)
+        assert gate.active == 0
+
+    asyncio.run(main())
+
+
+def _collect(gen):
+    async def run():
+        return [ev async for ev in gen]
+    return run
+
+
+def test_stream_is_gated_and_replays_cache_when_shed(monkeypatch):
+    gate = admission.Gate("market.setups", 1, 0, 0.1)
+    monkeypatch.setitem(admission.GATES, "market.setups", gate)
+    monkeypatch.setattr(setup_scanner, "PolygonMarket", object)
+    cache = {}
+    monkeypatch.setattr(setup_scanner, "_CACHE", cache)
+    params = dict(limit=3, include_options=False, symbols=["ZZZ"], strict=True, min_confidence=70)
+
+    async def main():
+        async with gate.slot():
+            with pytest.raises(admission.Overloaded):
+                await _collect(setup_scanner.stream_setups(**params))()
+            cache[setup_scanner._cache_key(**params)] = (0.0, [{"symbol": "ZZZ"}], {"timed_out": []})
+            return await _collect(setup_scanner.stream_setups(**params))()
+
+    events = asyncio.run(main())
+    assert [e["event"] for e in events] == ["setup", "summary"]
+    assert events[-1]["data"]["shed"] is True
@@ -0,0 +1,20 @@
+from app.services.setup_scanner import _rank
+
+
+def _item(symbol, score, confidence, price=50.0):
+    return {"symbol": symbol, "score": score, "confidence": confidence, "price": price}
+
+
+def test_rank_empty_when_nothing_passes_gates():
+    assert _rank([_item("X", 10, 10)], 5, False, 70) == []
+
+
+def test_rank_fallback_for_requested_symbols():
+    ranked = _rank([_item("X", 10, 10), _item("Y", 20, 20)], 5, False, 70, has_symbols=True)
+    assert [r["symbol"] for r in ranked] == ["Y", "X"]
+    assert all(r["quality_gate"] is False and "confidence" in r["gate_misses"] for r in ranked)
+
+
+def test_rank_keeps_gated_items():
+    ranked = _rank([_item("X", 10, 90), _item("Y", 20, 10), _item("Z", 30, 95, price=1.0)], 5, False, 70)
+    assert [r["symbol"] for r in ranked] == ["X"]
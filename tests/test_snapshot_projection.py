@@ -0,0 +1,49 @@
+import asyncio
+
+from app.routers import assistant_api as api
+
+
+def _chain(expiry):
+    rows = []
+    for i, k in enumerate(range(90, 111)):
+        for typ in ("call", "put"):
+            rows.append({
+                "symbol": f"O:XYZ{expiry}{typ[0]}{k}", "type": typ, "strike": float(k), "expiry": expiry,
+                "bid": 1.0 + i * 0.01, "ask": 1.1 + i * 0.01,
+                "iv": 0.2 + 0.01 * abs(k - 100) + (0.005 if typ == "put" else 0.0),
+                "delta": 0.5 if typ == "call" else -0.5, "oi": 500 + i, "volume": 100 + i,
+            })
+    return rows
+
+
+class _FakePolygon:
+    async def snapshot_chain(self, sym, req):
+        rows = _chain(req["expiry"])
+        return {"top": rows[18:24], "rows": rows}
+
+    async def last_trade(self, sym):
+        return {"price": 100.0}
+
+    def __getattr__(self, name):
+        async def _none(*a, **k):
+            return None
+        return _none
+
+
+def test_projection_does_not_change_options_top(monkeypatch):
+    monkeypatch.setattr(api, "PolygonMarket", _FakePolygon)
+    monkeypatch.setattr(api, "TradierMarket", None)
+    monkeypatch.setattr(api, "TradierClient", None)
+    monkeypatch.setattr(api, "record_chain_aggregates", lambda *a, **k: None)
+
+    async def main():
+        # Projected first, so its IV percentiles cannot lean on a surface merged by the full run
+        proj = await api._handle_snapshot({"symbols": ["XYZ"], "fields": ["options.top"]})
+        full = await api._handle_snapshot({"symbols": ["XYZ"], "include": ["options"]})
+        return proj["snapshot"]["symbols"]["XYZ"], full["snapshot"]["symbols"]["XYZ"]
+
+    proj, full = asyncio.run(main())
+    top = full["options"]["top"]
+    assert top and all("iv_percentile" in r for r in top)
+    assert proj["options"]["top"] == top
+    assert "iv_surface" not in proj.get("context", {})
@@ -0,0 +1,25 @@
+from app.routers.assistant_api import _near_atm_pairs
+from app.utils.topk import top_k, top_k_by, strike_distance
+
+
+def test_top_k_matches_sorted_prefix():
+    rows = [5, 3, 9, 3, 1, 7]
+    assert top_k(rows, 3, key=lambda x: x) == sorted(rows)[:3]
+    assert top_k(rows, 2, key=lambda x: x, reverse=True) == sorted(rows, reverse=True)[:2]
+
+
+def test_top_k_by_breaks_distance_ties_and_ranks_missing_last():
+    rows = [{"strike": 101, "oi": 10}, {"strike": 99, "oi": 500}, {"strike": None, "oi": 9999}, {"strike": 100, "oi": None}]
+    got = top_k_by(rows, 4, (strike_distance(100), False), (lambda r: r.get("oi"), True))
+    assert [r["strike"] for r in got] == [100, 99, 101, None]
+
+
+def test_near_atm_pairs_prefers_deeper_oi_at_equal_distance():
+    chain = [
+        {"symbol": "C1", "type": "call", "strike": 100, "open_interest": 20},
+        {"symbol": "C2", "type": "call", "strike": 100, "open_interest": 900},
+        {"symbol": "C3", "type": "call", "strike": 105, "open_interest": 5000},
+        {"symbol": "P1", "type": "put", "strike": 100, "open_interest": 50},
+    ]
+    picks = _near_atm_pairs(chain, 100.0, topK=2)
+    assert [p["symbol"] for p in picks] == ["C2", "P1"]
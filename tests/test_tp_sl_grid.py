@@ -0,0 +1,13 @@
+from app.engine.options_scoring import ChainArrays, ev_grid
+from app.routers.assistant_api import _best_tp_sl
+
+
+def test_best_pair_comes_from_ev_grid():
+    contract = {"delta": 0.5, "bid": 1.0, "ask": 1.1}
+    tp, sl = _best_tp_sl(contract, 100.0, 2.0, [100.5, 101.0], [99.5, 99.0])
+    ti, si, _ = ev_grid(ChainArrays.from_rows([contract]), 2.0, [0.5, 1.0], [0.5, 1.0])["best"][0]
+    assert (tp, sl) == ([100.5, 101.0][ti], [99.5, 99.0][si])
+
+
+def test_unpriced_contract_keeps_first_candidates():
+    assert _best_tp_sl({"bid": 1.0, "ask": 1.1}, 100.0, 2.0, [101.0, 100.5], [99.0]) == (101.0, 99.0)
@@ -0,0 +1,57 @@
+import math
+import random
+
+import numpy as np
+import pytest
+
+from app.services import universe
+from app.services.universe import _score_np, _score_py
+
+
+def _random_days(n_syms, n_days, rng):
+    days = [dict() for _ in range(n_days)]
+    today = {}
+    for i in range(n_syms):
+        sym = f"S{i}"
+        base = rng.uniform(2, 300)
+        for d in days:
+            c = base * rng.uniform(0.9, 1.1)
+            h, l = c * rng.uniform(1.0, 1.05), c * rng.uniform(0.95, 1.0)
+            v = rng.choice([math.nan, 0.0, rng.uniform(1e4, 5e7)])
+            d[sym] = (c, h, l, c, v)
+        pick = lambda x: rng.choice([math.nan, x])
+        today[sym] = (pick(base * rng.uniform(0.9, 1.1)), pick(rng.uniform(0, 5e7)), pick(rng.uniform(-8, 8)))
+    return days, today
+
+
+def test_numpy_and_python_scores_agree_with_missing_data():
+    days, today = _random_days(400, universe.SESSIONS, random.Random(7))
+    syms = sorted(days[0])
+    nan3 = (math.nan, math.nan, math.nan)
+    arr = np.array([[d[s] for d in days] for s in syms], dtype=float)
+    snap = np.array([today.get(s, nan3) for s in syms], dtype=float)
+    np_scores = _score_np(
+        arr[:, :, 3], arr[:, :, 1], arr[:, :, 2], arr[:, :, 4], snap[:, 0], snap[:, 1], snap[:, 2], 0.5,
+    )[0]
+    kept = 0
+    for s, np_score in zip(syms, np_scores):
+        series = [d[s] for d in days]
+        py_score = _score_py(
+            [b[3] for b in series], [b[1] for b in series], [b[2] for b in series], [b[4] for b in series],
+            *today[s], 0.5,
+        )[0]
+        if math.isnan(py_score):
+            assert math.isnan(np_score), s
+        else:
+            kept += 1
+            assert np_score == pytest.approx(py_score), s
+    assert kept > 0
+
+
+def test_prefilter_scores_same_rows_without_numpy(monkeypatch):
+    days, today = _random_days(200, universe.SESSIONS, random.Random(11))
+    with_np = universe.prefilter_scores(days, today, elapsed=0.5)
+    monkeypatch.setattr(universe, "np", None)
+    without_np = universe.prefilter_scores(days, today, elapsed=0.5)
+    assert [r["symbol"] for r in with_np] == [r["symbol"] for r in without_np]
+    assert [r["prefilter_score"] for r in with_np] == [r["prefilter_score"] for r in without_np]